@@ -0,0 +1,35 @@
+"""index signal_amplitudes timestamp
+
+Revision ID: 39bb7aab3c18
+Revises: 46fb168b8a0f
+Create Date: 2026-10-18 15:20:00.000000
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = "39bb7aab3c18"
+down_revision: Union[str, None] = "46fb168b8a0f"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Time-range reads of the legacy per-sample table (and its backfill into signal_chunks, ordered by timestamp).
+    # signal_chunks is already indexed on start_time, which /api/signals pages through.
+    op.create_index(
+        op.f("ix_signal_amplitudes_timestamp"),
+        "signal_amplitudes",
+        ["timestamp"],
+        unique=False,
+    )
+
+
+def downgrade() -> None:
+    op.drop_index(
+        op.f("ix_signal_amplitudes_timestamp"), table_name="signal_amplitudes"
+    )
@@ -0,0 +1,160 @@
+"""create signal_chunks table
+
+Revision ID: 46fb168b8a0f
+Revises: 483588b7edd7
+Create Date: 2026-10-18 12:10:00.000000
+
+"""
+
+from datetime import datetime, timedelta, timezone
+from typing import Sequence, Union
+
+from alembic import op
+import numpy as np
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = "46fb168b8a0f"
+down_revision: Union[str, None] = "483588b7edd7"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# The backfill below is frozen as of this revision (the app code moves on, the migration must not).
+CHUNK_SIZE = 1000  # Samples per channel and chunk.
+signal_amplitudes = sa.table(
+    "signal_amplitudes",
+    sa.column("timestamp", sa.DateTime(timezone=True)),
+    sa.column("first_channel", sa.Float()),
+    sa.column("second_channel", sa.Float()),
+)
+signal_chunks = sa.table(
+    "signal_chunks",
+    sa.column("start_time", sa.DateTime(timezone=True)),
+    sa.column("end_time", sa.DateTime(timezone=True)),
+    sa.column("sampling_rate", sa.Float()),
+    sa.column("n_samples", sa.Integer()),
+    sa.column("samples", postgresql.ARRAY(sa.REAL(), dimensions=2)),
+)
+
+
+def split_regular_runs(timestamps, tolerance=0.5):
+    """
+    Splits sorted timestamps (microseconds since the epoch) into runs sampled at a constant rate. Returns the estimated
+    sampling rate and a list of (first, stop) index pairs, as Python ints (psycopg2 cannot bind NumPy integers).
+    """
+    if len(timestamps) == 1:
+        return 1.0, [(0, 1)]
+    steps = np.diff(timestamps).astype(np.float64)
+    period = np.median(steps)
+    sampling_rate = round(1e6 / period)
+    breaks = (
+        np.flatnonzero(
+            np.abs(steps - 1e6 / sampling_rate) > tolerance * period
+        )
+        + 1
+    )
+    bounds = np.concatenate([[0], breaks, [len(timestamps)]]).tolist()
+    return float(sampling_rate), list(zip(bounds[:-1], bounds[1:]))
+
+
+def backfill_legacy_samples(connection):
+    """
+    Converts the per-sample rows of signal_amplitudes into chunks of CHUNK_SIZE samples. The legacy rows are
+    kept.
+    """
+    rows = connection.execute(
+        sa.select(
+            signal_amplitudes.c.timestamp,
+            signal_amplitudes.c.first_channel,
+            signal_amplitudes.c.second_channel,
+        )
+        .where(signal_amplitudes.c.timestamp.is_not(None))
+        .order_by(signal_amplitudes.c.timestamp)
+    ).all()
+    if not rows:
+        return
+
+    epoch = datetime(1970, 1, 1, tzinfo=timezone.utc)
+    timestamps = np.array(
+        [(row.timestamp - epoch) // timedelta(microseconds=1) for row in rows],
+        dtype=np.int64,
+    )
+    samples = np.array(
+        [[row.first_channel, row.second_channel] for row in rows],
+        dtype=np.float64,  # Missing (NULL) values become NaN.
+    ).T.astype(np.float32)
+
+    sampling_rate, runs = split_regular_runs(timestamps)
+    for first, stop in runs:
+        # Sample times are rebuilt from the start of the run and the rate, as the app reads them.
+        offsets = np.round(
+            np.arange(stop - first) * (1e6 / sampling_rate)
+        ).astype(np.int64)
+        records = []
+        for chunk in range(0, stop - first, CHUNK_SIZE):
+            last = min(chunk + CHUNK_SIZE, stop - first) - 1
+            columns = slice(first + chunk, first + last + 1)
+            records.append(
+                {
+                    "start_time": epoch
+                    + timedelta(
+                        microseconds=int(timestamps[first] + offsets[chunk])
+                    ),
+                    "end_time": epoch
+                    + timedelta(
+                        microseconds=int(timestamps[first] + offsets[last])
+                    ),
+                    "sampling_rate": sampling_rate,
+                    "n_samples": last - chunk + 1,
+                    "samples": samples[:, columns].tolist(),
+                }
+            )
+        connection.execute(sa.insert(signal_chunks), records)
+
+
+def upgrade() -> None:
+    op.create_table(
+        "signal_chunks",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("start_time", sa.DateTime(timezone=True), nullable=False),
+        sa.Column("end_time", sa.DateTime(timezone=True), nullable=False),
+        sa.Column("sampling_rate", sa.Float(), nullable=False),
+        sa.Column("n_samples", sa.Integer(), nullable=False),
+        sa.Column(
+            "samples",
+            postgresql.ARRAY(sa.REAL(), dimensions=2),
+            nullable=False,
+        ),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index(
+        op.f("ix_signal_chunks_start_time"),
+        "signal_chunks",
+        ["start_time"],
+        unique=False,
+    )
+    # Per-sample view over the chunks with the same columns as signal_amplitudes.
+    op.execute(
+        """
+        CREATE OR REPLACE VIEW signal_samples AS
+        SELECT
+            c.id AS chunk_id,
+            c.start_time + make_interval(secs => (s.i - 1) / c.sampling_rate) AS timestamp,
+            c.samples[1][s.i] AS first_channel,
+            c.samples[2][s.i] AS second_channel
+        FROM signal_chunks AS c
+        CROSS JOIN LATERAL generate_series(1, c.n_samples) AS s(i)
+        """
+    )
+
+    backfill_legacy_samples(op.get_bind())
+
+
+def downgrade() -> None:
+    op.execute("DROP VIEW IF EXISTS signal_samples")
+    op.drop_index(
+        op.f("ix_signal_chunks_start_time"), table_name="signal_chunks"
+    )
+    op.drop_table("signal_chunks")
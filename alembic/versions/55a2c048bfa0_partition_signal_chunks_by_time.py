@@ -0,0 +1,169 @@
+"""partition signal_chunks by time
+
+Revision ID: 55a2c048bfa0
+Revises: bcbde6f9c8ff
+Create Date: 2026-10-18 18:30:00.000000
+
+"""
+
+from datetime import datetime, timedelta, timezone
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = "55a2c048bfa0"
+down_revision: Union[str, None] = "bcbde6f9c8ff"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+SIGNAL_SAMPLES_VIEW = """
+CREATE OR REPLACE VIEW signal_samples AS
+SELECT
+    c.id AS chunk_id,
+    c.start_time + make_interval(secs => (s.i - 1) / c.sampling_rate) AS timestamp,
+    c.samples[1][s.i] AS first_channel,
+    c.samples[2][s.i] AS second_channel
+FROM signal_chunks AS c
+CROSS JOIN LATERAL generate_series(1, c.n_samples) AS s(i)
+"""
+COLUMNS = (
+    "id, recording_id, start_time, end_time, sampling_rate, n_samples, samples"
+)
+# Partitioning as of this revision (the app code moves on, the migration must not): weekly periods counted
+# from a Monday, the current one and the next PARTITIONS_AHEAD created in advance.
+PARTITION_DAYS = 7
+PARTITIONS_AHEAD = 2
+PARTITION_ANCHOR = datetime(1970, 1, 5, tzinfo=timezone.utc)
+DEFAULT_PARTITION = "signal_chunks_default"
+
+
+def set_aside(table, suffix):
+    """
+    Renames signal_chunks, its foreign key and its indexes, so the new table can take their names. The id
+    sequence is kept.
+    """
+    op.execute("DROP VIEW IF EXISTS signal_samples")
+    op.rename_table(table, f"{table}_{suffix}")
+    op.execute(
+        f"ALTER TABLE {table}_{suffix} RENAME CONSTRAINT "
+        f"signal_chunks_recording_id_fkey TO signal_chunks_recording_id_fkey_{suffix}"
+    )
+    for index in (
+        "signal_chunks_pkey",
+        "ix_signal_chunks_start_time",
+        "ix_signal_chunks_recording_id_start_time",
+    ):
+        op.execute(f"ALTER INDEX {index} RENAME TO {index}_{suffix}")
+    op.execute("ALTER SEQUENCE signal_chunks_id_seq OWNED BY NONE")
+
+
+def create_signal_chunks(primary_key, **kwargs):
+    op.create_table(
+        "signal_chunks",
+        sa.Column(
+            "id",
+            sa.Integer(),
+            server_default=sa.text("nextval('signal_chunks_id_seq')"),
+            nullable=False,
+        ),
+        sa.Column("recording_id", sa.Integer(), nullable=True),
+        sa.Column("start_time", sa.DateTime(timezone=True), nullable=False),
+        sa.Column("end_time", sa.DateTime(timezone=True), nullable=False),
+        sa.Column("sampling_rate", sa.Float(), nullable=False),
+        sa.Column("n_samples", sa.Integer(), nullable=False),
+        sa.Column(
+            "samples",
+            postgresql.ARRAY(sa.REAL(), dimensions=2),
+            nullable=False,
+        ),
+        sa.ForeignKeyConstraint(
+            ["recording_id"],
+            ["recordings.id"],
+            name="signal_chunks_recording_id_fkey",
+            ondelete="CASCADE",
+        ),
+        sa.PrimaryKeyConstraint(*primary_key, name="signal_chunks_pkey"),
+        **kwargs,
+    )
+    op.execute("ALTER SEQUENCE signal_chunks_id_seq OWNED BY signal_chunks.id")
+    op.create_index(
+        "ix_signal_chunks_start_time", "signal_chunks", ["start_time"]
+    )
+    op.create_index(
+        "ix_signal_chunks_recording_id_start_time",
+        "signal_chunks",
+        ["recording_id", "start_time"],
+    )
+
+
+def period_starts(connection, table):
+    """
+    Starts of the periods holding rows of table, and of the current and next PARTITIONS_AHEAD periods.
+    """
+    indexes = set(
+        connection.execute(
+            sa.text(
+                f"""
+                SELECT DISTINCT floor(
+                    extract(epoch FROM start_time - CAST(:anchor AS timestamptz)) / CAST(:period AS float8)
+                )
+                FROM {table}
+                """
+            ),
+            {"anchor": PARTITION_ANCHOR, "period": PARTITION_DAYS * 86400},
+        ).scalars()
+    )
+    current = (
+        datetime.now(timezone.utc) - PARTITION_ANCHOR
+    ).days // PARTITION_DAYS
+    indexes.update(range(current, current + PARTITIONS_AHEAD + 1))
+    return [
+        PARTITION_ANCHOR + timedelta(days=int(index) * PARTITION_DAYS)
+        for index in sorted(indexes)
+    ]
+
+
+def create_partition(start):
+    end = start + timedelta(days=PARTITION_DAYS)
+    # Bounds are literals in DDL. Both are datetimes made here, never user input.
+    op.execute(
+        f"CREATE TABLE signal_chunks_p{start:%Y%m%d}_{end:%Y%m%d} "
+        f"PARTITION OF signal_chunks "
+        f"FOR VALUES FROM ('{start.isoformat()}') TO ('{end.isoformat()}')"
+    )
+
+
+def upgrade() -> None:
+    set_aside("signal_chunks", "unpartitioned")
+    create_signal_chunks(
+        ("id", "start_time"), postgresql_partition_by="RANGE (start_time)"
+    )
+    op.execute(
+        f"CREATE TABLE {DEFAULT_PARTITION} PARTITION OF signal_chunks DEFAULT"
+    )
+
+    # One partition per period holding data, and the current and next ones, before the rows are copied.
+    for start in period_starts(op.get_bind(), "signal_chunks_unpartitioned"):
+        create_partition(start)
+
+    op.execute(
+        f"INSERT INTO signal_chunks ({COLUMNS}) "
+        f"SELECT {COLUMNS} FROM signal_chunks_unpartitioned"
+    )
+    op.drop_table("signal_chunks_unpartitioned")
+    op.execute(SIGNAL_SAMPLES_VIEW)
+
+
+def downgrade() -> None:
+    set_aside("signal_chunks", "partitioned")
+    create_signal_chunks(("id",))
+    op.execute(
+        f"INSERT INTO signal_chunks ({COLUMNS}) "
+        f"SELECT {COLUMNS} FROM signal_chunks_partitioned"
+    )
+    op.drop_table("signal_chunks_partitioned")  # With its partitions.
+    op.execute(SIGNAL_SAMPLES_VIEW)
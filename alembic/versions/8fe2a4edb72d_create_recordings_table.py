@@ -0,0 +1,145 @@
+"""create recordings table
+
+Revision ID: 8fe2a4edb72d
+Revises: 39bb7aab3c18
+Create Date: 2026-10-18 17:10:00.000000
+
+"""
+
+from datetime import timedelta
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = "8fe2a4edb72d"
+down_revision: Union[str, None] = "39bb7aab3c18"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# The backfill below is frozen as of this revision (the app code moves on, the migration must not).
+RECORDING_GAP = timedelta(seconds=60)  # Silence separating two recordings.
+# CSV export the dashboard analyzed before recordings were stored, given to the latest recording.
+LATEST_CSV_FILE = "csv_output/eeg_data_a3_a4_utc.csv"
+recordings = sa.table(
+    "recordings",
+    sa.column("id", sa.Integer()),
+    sa.column("device", sa.String()),
+    sa.column("channels", postgresql.ARRAY(sa.Integer())),
+    sa.column("sampling_rate", sa.Float()),
+    sa.column("start_time", sa.DateTime(timezone=True)),
+    sa.column("end_time", sa.DateTime(timezone=True)),
+    sa.column("status", sa.String()),
+    sa.column("csv_file", sa.String()),
+)
+signal_chunks = sa.table(
+    "signal_chunks",
+    sa.column("recording_id", sa.Integer()),
+    sa.column("start_time", sa.DateTime(timezone=True)),
+    sa.column("end_time", sa.DateTime(timezone=True)),
+    sa.column("sampling_rate", sa.Float()),
+)
+
+
+def backfill_recordings(connection):
+    """
+    Assigns the stored chunks to recordings without an owner, one per stretch of continuous samples.
+    """
+    rows = connection.execute(
+        sa.select(
+            signal_chunks.c.start_time,
+            signal_chunks.c.end_time,
+            signal_chunks.c.sampling_rate,
+        ).order_by(signal_chunks.c.start_time)
+    ).all()
+
+    groups = []  # [start_time, end_time, sampling_rate] per recording.
+    for start_time, end_time, sampling_rate in rows:
+        if groups and start_time - groups[-1][1] <= RECORDING_GAP:
+            groups[-1][1] = max(groups[-1][1], end_time)
+        else:
+            groups.append([start_time, end_time, sampling_rate])
+
+    for index, (start_time, end_time, sampling_rate) in enumerate(groups):
+        recording_id = connection.execute(
+            sa.insert(recordings)
+            .values(
+                device="unknown",
+                channels=[2, 3],  # A3 and A4, the channels always stored.
+                sampling_rate=sampling_rate,
+                start_time=start_time,
+                end_time=end_time,
+                status="completed",
+                csv_file=(
+                    LATEST_CSV_FILE if index == len(groups) - 1 else None
+                ),
+            )
+            .returning(recordings.c.id)
+        ).scalar_one()
+        connection.execute(
+            sa.update(signal_chunks)
+            .where(
+                signal_chunks.c.recording_id.is_(None),
+                signal_chunks.c.start_time >= start_time,
+                signal_chunks.c.start_time <= end_time,
+            )
+            .values(recording_id=recording_id)
+        )
+
+
+def upgrade() -> None:
+    op.create_table(
+        "recordings",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("user_id", sa.Integer(), nullable=True),
+        sa.Column("device", sa.String(), nullable=False),
+        sa.Column("channels", postgresql.ARRAY(sa.Integer()), nullable=False),
+        sa.Column("sampling_rate", sa.Float(), nullable=False),
+        sa.Column("start_time", sa.DateTime(timezone=True), nullable=False),
+        sa.Column("end_time", sa.DateTime(timezone=True), nullable=True),
+        sa.Column("status", sa.String(), nullable=False),
+        sa.Column("csv_file", sa.String(), nullable=True),
+        sa.ForeignKeyConstraint(
+            ["user_id"], ["users.id"], ondelete="SET NULL"
+        ),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index(
+        "ix_recordings_user_id_start_time",
+        "recordings",
+        ["user_id", "start_time"],
+    )
+    op.add_column(
+        "signal_chunks",
+        sa.Column("recording_id", sa.Integer(), nullable=True),
+    )
+    op.create_foreign_key(
+        "signal_chunks_recording_id_fkey",
+        "signal_chunks",
+        "recordings",
+        ["recording_id"],
+        ["id"],
+        ondelete="CASCADE",
+    )
+    op.create_index(
+        "ix_signal_chunks_recording_id_start_time",
+        "signal_chunks",
+        ["recording_id", "start_time"],
+    )
+
+    backfill_recordings(op.get_bind())
+
+
+def downgrade() -> None:
+    op.drop_index(
+        "ix_signal_chunks_recording_id_start_time", table_name="signal_chunks"
+    )
+    op.drop_constraint(
+        "signal_chunks_recording_id_fkey", "signal_chunks", type_="foreignkey"
+    )
+    op.drop_column("signal_chunks", "recording_id")
+    op.drop_index("ix_recordings_user_id_start_time", table_name="recordings")
+    op.drop_table("recordings")
@@ -0,0 +1,86 @@
+"""create signal_rollups table
+
+Revision ID: bcbde6f9c8ff
+Revises: 8fe2a4edb72d
+Create Date: 2026-10-18 17:40:00.000000
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "bcbde6f9c8ff"
+down_revision: Union[str, None] = "8fe2a4edb72d"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Bucket lengths (seconds) of the rollups at this revision.
+ROLLUP_RESOLUTIONS = (1, 10, 60)
+
+# Rollups of the samples already stored in signal_chunks, per recording, at one resolution. Chunks without a
+# recording have none.
+BACKFILL_ROLLUPS = sa.text(
+    """
+    INSERT INTO signal_rollups (
+        resolution, recording_id, bucket_start, n_samples,
+        first_min, first_max, first_sum, first_sum_squares,
+        second_min, second_max, second_sum, second_sum_squares
+    )
+    SELECT
+        resolution,
+        recording_id,
+        to_timestamp(floor(extract(epoch FROM timestamp) / resolution) * resolution) AS bucket_start,
+        count(*),
+        min(first_channel), max(first_channel),
+        sum(first_channel::float8), sum(first_channel::float8 ^ 2),
+        min(second_channel), max(second_channel),
+        sum(second_channel::float8), sum(second_channel::float8 ^ 2)
+    FROM (
+        SELECT
+            c.recording_id,
+            c.start_time + make_interval(secs => (s.i - 1) / c.sampling_rate) AS timestamp,
+            s.first_channel,
+            s.second_channel
+        FROM signal_chunks AS c
+        CROSS JOIN LATERAL unnest(c.samples[1:1], c.samples[2:2])
+            WITH ORDINALITY AS s(first_channel, second_channel, i)
+        WHERE c.recording_id IS NOT NULL
+    ) AS samples, CAST(:resolution AS integer) AS resolution
+    WHERE first_channel <> 'NaN' AND second_channel <> 'NaN'
+    GROUP BY resolution, recording_id, bucket_start
+    """
+)
+
+
+def upgrade() -> None:
+    op.create_table(
+        "signal_rollups",
+        sa.Column("resolution", sa.Integer(), nullable=False),
+        sa.Column("recording_id", sa.Integer(), nullable=False),
+        sa.Column("bucket_start", sa.DateTime(timezone=True), nullable=False),
+        sa.Column("n_samples", sa.Integer(), nullable=False),
+        sa.Column("first_min", sa.REAL(), nullable=False),
+        sa.Column("first_max", sa.REAL(), nullable=False),
+        sa.Column("first_sum", sa.Float(), nullable=False),
+        sa.Column("first_sum_squares", sa.Float(), nullable=False),
+        sa.Column("second_min", sa.REAL(), nullable=False),
+        sa.Column("second_max", sa.REAL(), nullable=False),
+        sa.Column("second_sum", sa.Float(), nullable=False),
+        sa.Column("second_sum_squares", sa.Float(), nullable=False),
+        sa.ForeignKeyConstraint(
+            ["recording_id"], ["recordings.id"], ondelete="CASCADE"
+        ),
+        sa.PrimaryKeyConstraint("resolution", "recording_id", "bucket_start"),
+    )
+
+    connection = op.get_bind()
+    for resolution in ROLLUP_RESOLUTIONS:
+        connection.execute(BACKFILL_ROLLUPS, {"resolution": resolution})
+
+
+def downgrade() -> None:
+    op.drop_table("signal_rollups")
@@ -0,0 +1,244 @@
+import os
+import csv
+import json
+import time
+import asyncio
+import logging
+import threading
+import concurrent.futures
+from datetime import datetime, timezone
+import numpy as np
+from app.chunks import CHUNK_SIZE, ChunkWriter, to_datetime64
+from app.ingestion import SampleIngestor
+from app.socket import manager
+from app.metrics import acquisition_read_jitter, acquisition_samples
+from app.cache import analysis_cache
+from app.detector import DETECTOR_MIN_RATE, ClosedEyesDetector
+from app.streaming import SampleBlock
+from app.recordings import (
+    CSV_HEADER,
+    RecordingWriter,
+    recording_path_for,
+    recording_to_csv,
+    write_csv_rows,
+)
+
+
+# Maximum number of blocks waiting between the device thread and the event loop. When full the device thread waits.
+ACQUISITION_QUEUE_SIZE = int(os.getenv("ACQUISITION_QUEUE_SIZE", "64"))
+CSV_FOLDER = "csv_output"
+CSV_FILE = os.path.join(CSV_FOLDER, "eeg_data_a3_a4_utc.csv")
+
+
+def block_size_for(sampling_rate):
+    """
+    Samples requested per device.read call: about 100 ms of data, so the thread wakes up ten times a second.
+    """
+    return max(1, int(sampling_rate) // 10)
+
+
+def analog_channels(frames, n_channels):
+    """
+    BITalino frames are [sequence, I1, I2, O1, O2, A...]. Returns the analog channels as a (channels, n) array.
+    """
+    frames = np.asarray(frames, dtype=np.float64)
+    first_analog = frames.shape[1] - n_channels
+    return frames[:, first_analog:].T
+
+
+class AcquisitionWorker:
+    """
+    Runs a (blocking) device in a dedicated thread and hands the acquired SampleBlocks to the event loop
+    through a bounded asyncio queue. Consume them with `async for block in worker.blocks()`.
+    """
+
+    def __init__(
+        self,
+        device_factory,
+        sampling_rate,
+        channels,
+        duration,
+        queue_size=ACQUISITION_QUEUE_SIZE,
+    ):
+        self.device_factory = device_factory
+        self.sampling_rate = sampling_rate
+        self.channels = channels
+        self.duration = duration
+        self.block_size = block_size_for(sampling_rate)
+        self.samples_captured = 0
+
+        self._queue = asyncio.Queue(maxsize=queue_size)
+        self._stop = threading.Event()
+        self._loop = None
+        self._thread = None
+
+    def start(self):
+        """
+        Starts the device thread. Must be called from the event loop that consumes the blocks.
+        """
+        self._loop = asyncio.get_running_loop()
+        self._thread = threading.Thread(
+            target=self._run, name="acquisition", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self):
+        """
+        Asks the device thread to stop after the current read.
+        """
+        self._stop.set()
+
+    async def blocks(self):
+        while True:
+            item = await self._queue.get()
+            if item is None:  # End of the acquisition.
+                return
+            if isinstance(item, BaseException):
+                raise item
+            yield item
+
+    def _put(self, item):
+        # Blocks the device thread (not the event loop) while the queue is full.
+        # Once stopped nobody consumes the queue any more (the loop may even be closed), so items are dropped.
+        if self._stop.is_set() or self._loop.is_closed():
+            return
+        future = asyncio.run_coroutine_threadsafe(
+            self._queue.put(item), self._loop
+        )
+        while True:
+            try:
+                return future.result(timeout=0.5)
+            except concurrent.futures.TimeoutError:
+                if self._stop.is_set():
+                    future.cancel()
+                    return
+
+    def _run(self):
+        device = None
+        try:
+            device = self.device_factory()
+            device.start(self.sampling_rate, self.channels)
+            start_time = to_datetime64(datetime.now(timezone.utc))
+
+            total = int(self.sampling_rate * self.duration)
+            sequence = 0
+            last_read = None
+            while self.samples_captured < total and not self._stop.is_set():
+                count = min(self.block_size, total - self.samples_captured)
+                data = device.read(count)
+                now = time.perf_counter()
+                # Jitter between consecutive reads. The first one includes the device start-up.
+                if last_read is not None:
+                    acquisition_read_jitter.observe(
+                        abs(now - last_read - count / self.sampling_rate)
+                    )
+                last_read = now
+                acquisition_samples.inc(count)
+                block_start = start_time + np.timedelta64(
+                    round(self.samples_captured * 1e6 / self.sampling_rate),
+                    "us",
+                )
+                self._put(
+                    SampleBlock(
+                        sequence,
+                        block_start,
+                        self.sampling_rate,
+                        analog_channels(data, len(self.channels)),
+                    )
+                )
+                self.samples_captured += count
+                sequence += 1
+
+            device.stop()
+        except Exception as e:
+            logging.error(f"Acquisition failed: {str(e)}", exc_info=True)
+            self._put(e)
+        finally:
+            if device is not None:
+                try:
+                    device.close()
+                except Exception as cleanup_error:
+                    logging.error(
+                        f"Failed to close BITalino device: {cleanup_error}",
+                        exc_info=True,
+                    )
+            self._put(None)
+
+
+def write_csv(csv_file, timestamps, eeg_signal_a3, eeg_signal_a4):
+    """
+    Exports an acquisition to CSV (same layout as before: UTC timestamp, A3, A4).
+    """
+    os.makedirs(os.path.dirname(csv_file), exist_ok=True)
+    with open(csv_file, "w", newline="") as file:
+        csv.writer(file).writerow(CSV_HEADER)
+        write_csv_rows(file, timestamps, (eeg_signal_a3, eeg_signal_a4))
+
+
+async def capture(worker, csv_file=CSV_FILE, recording_id=None, user_id=None):
+    """
+    Consumes the blocks of a started worker: stores them (batched COPY into signal_chunks as samples of the
+    recording recording_id, and a binary recording next to csv_file), runs the online closed-eyes detector,
+    exports the CSV and notifies the websocket clients allowed to open the recording of user_id. Runs as a
+    background task so the HTTP request can return immediately.
+    """
+    recording_file = recording_path_for(csv_file)
+    recording = None
+    detector = None
+    try:
+        async with SampleIngestor(
+            writer=ChunkWriter(worker.sampling_rate, recording_id),
+            batch_size=CHUNK_SIZE,
+        ) as ingestor:
+            async for block in worker.blocks():
+                samples = block.samples[-2:]  # A3 and A4.
+                await ingestor.add(block.timestamps(), *samples)
+                if recording is None:
+                    recording = RecordingWriter(
+                        recording_file,
+                        block.sampling_rate,
+                        len(samples),
+                        block.start_time,
+                    )
+                recording.append(
+                    samples
+                )  # Written as it arrives, so nothing accumulates in memory during long captures.
+                await manager.broadcast_block(
+                    block._replace(recording_id=recording_id), user_id
+                )  # Live update for the dashboards streaming the samples.
+
+                if (
+                    detector is None
+                    and block.sampling_rate >= DETECTOR_MIN_RATE
+                ):
+                    detector = ClosedEyesDetector(
+                        block.sampling_rate, len(samples), block.start_time
+                    )
+                if detector is not None:
+                    for result in detector.update(samples):
+                        await manager.broadcast(
+                            json.dumps(
+                                {**result, "recording_id": recording_id}
+                            ),
+                            user_id,
+                        )
+
+        if recording is not None:
+            recording.close()
+            await asyncio.to_thread(recording_to_csv, recording_file, csv_file)
+            # Newer than its CSV export, so recording_for uses it as is instead of converting the CSV again.
+            os.utime(recording_file)
+            # Results of the previous recording in these files are stale.
+            analysis_cache.invalidate(csv_file)
+            analysis_cache.invalidate(recording_file)
+
+        await manager.broadcast(
+            "Acquisition completed! Please refresh the page.", user_id
+        )
+    except Exception as e:
+        worker.stop()
+        await manager.broadcast(f"Acquisition failed: {str(e)}", user_id)
+        raise
+    finally:
+        if recording is not None:
+            recording.close()  # Samples captured before a failure or cancellation stay readable.
@@ -0,0 +1,224 @@
+import os
+from typing import NamedTuple
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+from scipy.signal import get_window
+
+# Relative power in the band around target_freq above which the eyes are considered closed.
+CLOSED_EYES_THRESHOLD = 0.065
+ALPHA_FREQUENCY = 10
+# Closed-eyes timeline over a whole recording: windows of TIMELINE_WINDOW seconds (the length of the 20 s
+# segments analysed in the notebooks) every TIMELINE_HOP seconds.
+TIMELINE_WINDOW = float(os.getenv("TIMELINE_WINDOW", "20"))
+TIMELINE_HOP = float(os.getenv("TIMELINE_HOP", "1"))
+TIMELINE_BATCH_SEGMENTS = 1024  # Welch segments transformed per FFT call, bounds the memory of long recordings.
+
+
+def simps(y, x):
+    """
+    local version of simps without need for scipy.integrate. Integrates along the last axis of y.
+    """
+    if len(x) < 3 or len(x) % 2 == 0:
+        raise ValueError("Simpson's rule requires an odd number of samples.")
+
+    h = (x[-1] - x[0]) / (len(x) - 1)
+    integral = (
+        y[..., 0]
+        + y[..., -1]
+        + 4 * np.sum(y[..., 1:-1:2], axis=-1)
+        + 2 * np.sum(y[..., 2:-2:2], axis=-1)
+    )
+    return integral * h / 3
+
+
+def find_minima_around(frequencies, psd, target_freq, search_range=2):
+    """
+    Finds two minima around the target frequency within the specified search range.
+    psd may hold several spectra (..., frequencies), the result then has shape (..., 2).
+    """
+    range_indices = (frequencies >= target_freq - search_range) & (
+        frequencies <= target_freq + search_range
+    )
+    freqs_in_range = frequencies[range_indices]
+    psd_in_range = psd[..., range_indices]
+    fallback = np.array(
+        [target_freq - search_range, target_freq + search_range]
+    )
+    if len(freqs_in_range) < 3:
+        return np.broadcast_to(fallback, psd.shape[:-1] + (2,))
+
+    # Strict local minima, as argrelextrema(psd_in_range, np.less) finds them, for every spectrum at once.
+    inner = psd_in_range[..., 1:-1]
+    is_minimum = (inner < psd_in_range[..., :-2]) & (
+        inner < psd_in_range[..., 2:]
+    )
+    distance = np.where(
+        is_minimum, np.abs(freqs_in_range[1:-1] - target_freq), np.inf
+    )
+    closest = np.argsort(distance, axis=-1, kind="stable")[..., :2]
+    found = np.isfinite(np.take_along_axis(distance, closest, axis=-1)).all(
+        axis=-1, keepdims=True
+    )
+    return np.where(found, freqs_in_range[1:-1][closest], fallback)
+
+
+def band_power(frequencies, psd, low, high):
+    """
+    Simpson integral of psd (..., frequencies) between low and high (one bound per spectrum).
+    """
+    low = np.asarray(low)[..., np.newaxis]
+    high = np.asarray(high)[..., np.newaxis]
+    in_band = (frequencies >= low) & (frequencies <= high)
+    count = in_band.sum(axis=-1, keepdims=True)
+    if np.any(count < 3) or np.any(count % 2 == 0):
+        raise ValueError("Simpson's rule requires an odd number of samples.")
+
+    # Simpson weights 1, 4, 2, 4, ..., 4, 1 counted from the first frequency of each band.
+    position = np.cumsum(in_band, axis=-1) - 1
+    weights = np.where(position % 2 == 1, 4.0, 2.0)
+    weights[(position == 0) | (position == count - 1)] = 1.0
+    first = np.where(in_band, frequencies, np.inf).min(axis=-1)
+    last = np.where(in_band, frequencies, -np.inf).max(axis=-1)
+    h = (last - first) / (count[..., 0] - 1)
+    return np.sum(np.where(in_band, weights * psd, 0), axis=-1) * h / 3
+
+
+def relative_alpha_power(frequencies, psd, target_freq=ALPHA_FREQUENCY):
+    """
+    Power of the band delimited by the minima around target_freq, relative to the total power of the PSD.
+    Vectorized over the leading axes of psd (e.g. channels or windows).
+    """
+    minima_freqs = find_minima_around(frequencies, psd, target_freq)
+
+    total_power = simps(psd, frequencies)
+
+    band = band_power(
+        frequencies,
+        psd,
+        minima_freqs.min(axis=-1),
+        minima_freqs.max(axis=-1),
+    )
+
+    return band / total_power
+
+
+class ClosedEyesResult(NamedTuple):
+    """
+    Closed-eyes analysis of one channel.
+    """
+
+    channel: int
+    relative_power: float
+    closed_eyes: bool
+
+    @property
+    def message(self):
+        if self.closed_eyes:
+            return f"Warning: Closed eyes! Relative power = {self.relative_power:.2%}"
+        return f"No closed eyes!. Relative power = {self.relative_power:.2%}"
+
+
+# Function to detect closed eyes using minima-based integration. Used by the /display analysis and the online detector.
+def detect_closed_eyes_minima(
+    frequencies,
+    psd,
+    target_freq=ALPHA_FREQUENCY,
+    threshold=CLOSED_EYES_THRESHOLD,
+):
+    """
+    Analyses every channel of a (channels, frequencies) PSD (a 1-D PSD is one channel) in one vectorized pass
+    and returns a ClosedEyesResult per channel.
+    """
+    relative_power = np.atleast_1d(
+        relative_alpha_power(frequencies, psd, target_freq)
+    )
+
+    # Compration with threshhold. The threshhold was concluded as result of experiments.
+    closed = relative_power > threshold
+    return [
+        ClosedEyesResult(channel, float(power), bool(is_closed))
+        for channel, (power, is_closed) in enumerate(
+            zip(relative_power, closed)
+        )
+    ]
+
+
+def welch_segments(samples, sampling_rate, batch_segments=None):
+    """
+    Periodograms of the Welch segments of samples (..., n): one second long (nperseg = sampling rate, as in the
+    analysis), Hann window, 50% overlap. Returns the frequencies and a (..., segments, frequencies) array.
+    The mean of consecutive periodograms is scipy.signal.welch(nperseg=sampling_rate) of the samples they cover.
+    """
+    nperseg = int(sampling_rate)
+    step = nperseg - nperseg // 2
+    frequencies = np.fft.rfftfreq(nperseg, 1 / sampling_rate)
+    taper = get_window("hann", nperseg)
+    scale = np.full(frequencies.size, 2.0) / (sampling_rate * np.sum(taper**2))
+    scale[0] /= 2
+    if nperseg % 2 == 0:
+        scale[-1] /= 2  # The Nyquist bin is not doubled either.
+
+    if samples.shape[-1] < nperseg:
+        return frequencies, np.empty(
+            samples.shape[:-1] + (0, frequencies.size)
+        )
+    segments = sliding_window_view(samples, nperseg, axis=-1)[..., ::step, :]
+    periodograms = np.empty(segments.shape[:-1] + (frequencies.size,))
+    batch = batch_segments or segments.shape[-2]
+    for start in range(0, segments.shape[-2], batch):
+        stop = start + batch
+        segment = segments[..., start:stop, :]
+        segment = segment - segment.mean(axis=-1, keepdims=True)
+        spectrum = np.fft.rfft(segment * taper, axis=-1)
+        periodograms[..., start:stop, :] = (
+            spectrum.real**2 + spectrum.imag**2
+        ) * scale
+    return frequencies, periodograms
+
+
+def closed_eyes_timeline(
+    samples,
+    sampling_rate,
+    window=TIMELINE_WINDOW,
+    hop=TIMELINE_HOP,
+    target_freq=ALPHA_FREQUENCY,
+    threshold=CLOSED_EYES_THRESHOLD,
+):
+    """
+    Relative alpha power and closed-eyes label of every window of a (channels, n) recording. All Welch segments
+    are transformed in batched FFTs and every window PSD is a difference of cumulative sums, so the cost does not
+    depend on how much the windows overlap. hop is rounded to a multiple of half a second (the segment step).
+    Returns the window start offsets in seconds and two (channels, windows) arrays: relative power and closed.
+    """
+    nperseg = int(sampling_rate)
+    step = nperseg - nperseg // 2
+    window_segments = max(
+        1, (int(window * sampling_rate) - nperseg) // step + 1
+    )
+    hop_segments = max(1, round(hop * sampling_rate / step))
+
+    frequencies, periodograms = welch_segments(
+        samples, sampling_rate, TIMELINE_BATCH_SEGMENTS
+    )
+    cumulative = np.cumsum(periodograms, axis=-2)
+    cumulative = np.concatenate(
+        [np.zeros_like(cumulative[..., :1, :]), cumulative], axis=-2
+    )
+    starts = np.arange(
+        0, periodograms.shape[-2] - window_segments + 1, hop_segments
+    )
+    psd = (
+        cumulative[..., starts + window_segments, :]
+        - cumulative[..., starts, :]
+    ) / window_segments
+
+    relative_power = (
+        relative_alpha_power(frequencies, psd, target_freq)
+        if starts.size
+        else np.empty(psd.shape[:-1])
+    )
+    return (
+        starts * step / sampling_rate,
+        relative_power,
+        relative_power > threshold,
+    )
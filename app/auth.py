@@ -0,0 +1,217 @@
+import os
+import hmac
+import time
+import base64
+import asyncio
+import hashlib
+import logging
+import secrets
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import NamedTuple
+from fastapi import Depends, HTTPException, Request, WebSocket
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from werkzeug.security import check_password_hash, generate_password_hash
+from app.dependencies import SessionLocal, get_db
+from app.metrics import Gauge
+from app.models import User
+
+# Threads hashing passwords (werkzeug's scrypt/PBKDF2 run in hashlib, which releases the GIL, so they run in
+# parallel with the event loop). More threads than cores only makes every login slower.
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", "2"))
+# Hashes running or waiting for a thread at most. Further logins are refused (503) rather than queued without bound.
+PASSWORD_HASH_MAX_PENDING = int(os.getenv("PASSWORD_HASH_MAX_PENDING", "32"))
+
+# Key signing the session tokens. Set it in production: the random default ends the sessions on every restart
+# and is not shared by the workers.
+SESSION_SECRET = os.getenv("SESSION_SECRET", "")
+SESSION_TTL = int(os.getenv("SESSION_TTL", "3600"))  # Seconds.
+SESSION_COOKIE = "session"
+
+# Users of the sessions kept in memory, so the authenticated requests do not query the users table.
+USER_CACHE_TTL = float(os.getenv("USER_CACHE_TTL", "300"))  # Seconds.
+USER_CACHE_SIZE = int(os.getenv("USER_CACHE_SIZE", "1024"))
+
+if not SESSION_SECRET:
+    logging.warning(
+        "SESSION_SECRET is not set: sessions are signed with a random key and end when the app restarts."
+    )
+    SESSION_SECRET = secrets.token_hex(32)
+
+
+class HasherBusy(Exception):
+    pass
+
+
+class PasswordHasher:
+    """
+    Hashes and checks passwords in a bounded thread pool, so a login never blocks the event loop.
+    """
+
+    def __init__(
+        self,
+        workers=PASSWORD_HASH_WORKERS,
+        max_pending=PASSWORD_HASH_MAX_PENDING,
+    ):
+        self.max_pending = max_pending
+        self.pending = 0  # Only changed on the event loop.
+        self._executor = ThreadPoolExecutor(
+            max_workers=workers, thread_name_prefix="password-hash"
+        )
+
+    async def _run(self, function, *args):
+        if self.pending >= self.max_pending:
+            raise HasherBusy("Too many logins at once. Please try again.")
+        self.pending += 1
+        try:
+            return await asyncio.get_running_loop().run_in_executor(
+                self._executor, function, *args
+            )
+        finally:
+            self.pending -= 1
+
+    async def hash(self, password):
+        return await self._run(generate_password_hash, password)
+
+    async def verify(self, password_hash, password):
+        return await self._run(check_password_hash, password_hash, password)
+
+
+def session_signature(payload, secret):
+    digest = hmac.new(
+        secret.encode(), payload.encode(), hashlib.sha256
+    ).digest()
+    return base64.urlsafe_b64encode(digest).rstrip(b"=").decode()
+
+
+def create_session_token(user_id, ttl=SESSION_TTL, secret=None, now=None):
+    """
+    "<user id>.<expiry (unix time)>.<HMAC-SHA256 of both>": the server only needs its key to check it.
+    """
+    expires = int((time.time() if now is None else now) + ttl)
+    payload = f"{user_id}.{expires}"
+    return f"{payload}.{session_signature(payload, secret or SESSION_SECRET)}"
+
+
+def read_session_token(token, secret=None, now=None):
+    """
+    User id of a valid, unexpired session token, else None.
+    """
+    try:
+        user_id, expires, signature = (token or "").split(".")
+        payload = f"{user_id}.{expires}"
+        valid = hmac.compare_digest(
+            signature, session_signature(payload, secret or SESSION_SECRET)
+        )
+        if valid and int(expires) > (time.time() if now is None else now):
+            return int(user_id)
+    except ValueError:
+        pass
+    return None
+
+
+def set_session_cookie(response, user_id):
+    response.set_cookie(
+        key=SESSION_COOKIE,
+        value=create_session_token(user_id),
+        max_age=SESSION_TTL,
+        httponly=True,
+        samesite="lax",
+    )
+
+
+class SessionUser(NamedTuple):
+    id: int
+    email: str
+    first_name: str
+    last_name: str
+    role: str
+
+
+class UserCache:
+    """
+    TTL cache of the users of the sessions (LRU beyond max_size). Only used on the event loop.
+    """
+
+    def __init__(self, ttl=USER_CACHE_TTL, max_size=USER_CACHE_SIZE):
+        self.ttl = ttl
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self._users = OrderedDict()  # id: (expiry, SessionUser)
+
+    def add(self, user):
+        user = SessionUser(
+            user.id, user.email, user.first_name, user.last_name, user.role
+        )
+        self._users[user.id] = (time.monotonic() + self.ttl, user)
+        self._users.move_to_end(user.id)
+        if len(self._users) > self.max_size:
+            self._users.popitem(last=False)
+        return user
+
+    async def get(self, db, user_id):
+        """
+        The user user_id (None if it does not exist), from the users table only on a miss.
+        """
+        entry = self._users.get(user_id)
+        if entry is not None and entry[0] > time.monotonic():
+            self.hits += 1
+            self._users.move_to_end(user_id)
+            return entry[1]
+        self.misses += 1
+        user = (
+            await db.execute(select(User).where(User.id == user_id))
+        ).scalar_one_or_none()
+        if user is None:
+            self._users.pop(user_id, None)
+            return None
+        return self.add(user)
+
+    def invalidate(self, user_id=None):
+        if user_id is None:
+            self._users.clear()
+        else:
+            self._users.pop(user_id, None)
+
+
+async def current_user(request: Request, db: AsyncSession = Depends(get_db)):
+    """
+    Dependency: the user of the session cookie, or None when not logged in.
+    """
+    user_id = read_session_token(request.cookies.get(SESSION_COOKIE))
+    if user_id is None:
+        return None
+    return await user_cache.get(db, user_id)
+
+
+async def websocket_user(websocket: WebSocket):
+    """
+    The user of the session cookie of a websocket, or None. The session used for a cache miss is closed right away
+    rather than held (as get_db would) for the whole connection.
+    """
+    user_id = read_session_token(websocket.cookies.get(SESSION_COOKIE))
+    if user_id is None:
+        return None
+    async with SessionLocal() as db:
+        return await user_cache.get(db, user_id)
+
+
+async def require_user(user=Depends(current_user)):
+    """
+    Dependency: the user of the session cookie, 401 when not logged in.
+    """
+    if user is None:
+        raise HTTPException(status_code=401, detail="Not logged in.")
+    return user
+
+
+password_hasher = PasswordHasher()
+user_cache = UserCache()
+
+Gauge(
+    "password_hash_pending",
+    "Password hashes running or waiting for a thread.",
+    function=lambda: password_hasher.pending,
+)
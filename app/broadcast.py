@@ -0,0 +1,174 @@
+import os
+import json
+import uuid
+import base64
+import asyncio
+import logging
+import asyncpg
+from app.dependencies import DATABASE_URL
+from app.streaming import decode_block, encode_block
+
+# How broadcasts reach clients connected to other uvicorn workers (or hosts):
+# "memory" keeps them in the current process, "postgres" relays them through LISTEN/NOTIFY on the application database.
+BROADCAST_BACKEND = os.getenv("BROADCAST_BACKEND", "memory")
+BROADCAST_CHANNEL = os.getenv("BROADCAST_CHANNEL", "ws_broadcast")
+BROADCAST_RECONNECT_DELAY = float(
+    os.getenv("BROADCAST_RECONNECT_DELAY", "1")
+)  # Seconds between attempts to reopen a lost LISTEN connection.
+MAX_NOTIFY_PAYLOAD = (
+    7999  # Postgres rejects NOTIFY payloads of 8000 bytes or more.
+)
+
+MESSAGE = "message"
+BLOCK = "block"
+
+
+def dump_event(origin, kind, payload, owner_id=None):
+    """
+    Serializes a broadcast (about a recording of owner_id) for NOTIFY. Binary payloads (bytes messages and
+    SampleBlocks) are base64 encoded.
+    """
+    event = {"origin": origin, "kind": kind, "owner_id": owner_id}
+    if kind == BLOCK:
+        event["frame"] = base64.b64encode(encode_block(payload)).decode()
+    elif isinstance(payload, bytes):
+        event["bytes"] = base64.b64encode(payload).decode()
+    else:
+        event["text"] = payload
+    return json.dumps(event)
+
+
+def load_event(data):
+    """
+    Inverse of dump_event: returns (origin, kind, payload, owner_id).
+    """
+    event = json.loads(data)
+    if event["kind"] == BLOCK:
+        payload = decode_block(base64.b64decode(event["frame"]))
+    elif "bytes" in event:
+        payload = base64.b64decode(event["bytes"])
+    else:
+        payload = event["text"]
+    return event["origin"], event["kind"], payload, event["owner_id"]
+
+
+class InProcessBroadcast:
+    """
+    Single process backend: the ConnectionManager already delivers to its own clients, so there is nobody else to tell.
+    """
+
+    async def start(self, deliver):
+        pass
+
+    async def publish(self, kind, payload, owner_id=None):
+        pass
+
+    async def stop(self):
+        pass
+
+
+class PostgresBroadcast:
+    """
+    Relays broadcasts to the other workers through Postgres LISTEN/NOTIFY. Every worker listens on the same
+    channel and ignores its own notifications (its clients were served locally already).
+    """
+
+    def __init__(
+        self,
+        dsn=DATABASE_URL.replace("postgresql+asyncpg://", "postgresql://"),
+        channel=BROADCAST_CHANNEL,
+        reconnect_delay=BROADCAST_RECONNECT_DELAY,
+    ):
+        self.dsn = dsn
+        self.channel = channel
+        self.reconnect_delay = reconnect_delay
+        self.origin = uuid.uuid4().hex
+        self.published = 0
+        self.received = 0
+        self._deliver = None
+        self._connection = None
+        self._lock = (
+            asyncio.Lock()
+        )  # An asyncpg connection runs one query at a time.
+        self._reconnect = None
+
+    async def start(self, deliver):
+        self._deliver = deliver
+        await self._connect()
+
+    async def publish(self, kind, payload, owner_id=None):
+        data = dump_event(self.origin, kind, payload, owner_id)
+        size = len(data.encode())
+        if size > MAX_NOTIFY_PAYLOAD:
+            logging.warning(
+                f"Broadcast of {size} bytes is too large for NOTIFY, other workers will not receive it."
+            )
+            return
+        try:
+            async with self._lock:
+                if self._connection is None:
+                    raise ConnectionError("not connected")
+                await self._connection.execute(
+                    "SELECT pg_notify($1, $2)", self.channel, data
+                )
+            self.published += 1
+        except (
+            Exception
+        ) as e:  # A broadcast is best effort, it must never fail the acquisition that sent it.
+            logging.error(f"Failed to publish broadcast: {str(e)}")
+            self._schedule_reconnect()
+
+    async def stop(self):
+        self._deliver = (
+            None  # Closing the connection below must not trigger a reconnect.
+        )
+        if self._reconnect is not None:
+            self._reconnect.cancel()
+        connection, self._connection = self._connection, None
+        if connection is not None and not connection.is_closed():
+            await connection.close()
+
+    async def _connect(self):
+        connection = await asyncpg.connect(self.dsn)
+        await connection.add_listener(self.channel, self._on_notification)
+        connection.add_termination_listener(
+            lambda _: self._schedule_reconnect()
+        )
+        self._connection = connection
+
+    def _schedule_reconnect(self):
+        if self._deliver is None or (
+            self._reconnect is not None and not self._reconnect.done()
+        ):
+            return
+        self._connection = None
+        self._reconnect = asyncio.create_task(self._reconnect_loop())
+
+    async def _reconnect_loop(self):
+        while True:
+            await asyncio.sleep(self.reconnect_delay)
+            try:
+                await self._connect()
+                logging.info("Broadcast listener reconnected.")
+                return
+            except Exception as e:
+                logging.error(f"Broadcast listener reconnect failed: {str(e)}")
+
+    def _on_notification(self, connection, pid, channel, data):
+        try:
+            origin, kind, payload, owner_id = load_event(data)
+        except Exception as e:
+            logging.error(f"Ignoring malformed broadcast: {str(e)}")
+            return
+        if origin == self.origin:
+            return
+        self.received += 1
+        self._deliver(kind, payload, owner_id)
+
+
+def create_backend(name=BROADCAST_BACKEND):
+    if name == "memory":
+        return InProcessBroadcast()
+    if name == "postgres":
+        return PostgresBroadcast()
+    raise ValueError(f"Unknown broadcast backend {name!r}.")
@@ -0,0 +1,70 @@
+import os
+import threading
+from collections import OrderedDict
+
+# Analysis results kept in memory. The least recently used result is evicted first.
+ANALYSIS_CACHE_SIZE = int(os.getenv("ANALYSIS_CACHE_SIZE", "32"))
+
+
+def file_identity(path):
+    """
+    Identifies the content of a recording file without reading it: a rewrite changes its mtime or size.
+    """
+    stat = os.stat(path)
+    return os.path.abspath(path), stat.st_mtime_ns, stat.st_size
+
+
+class AnalysisCache:
+    """
+    LRU cache of analysis results keyed by recording identity and analysis parameters.
+    """
+
+    def __init__(self, max_size=ANALYSIS_CACHE_SIZE):
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self._results = OrderedDict()
+        # Analyses may run in worker threads (asyncio.to_thread).
+        self._lock = threading.Lock()
+
+    def get_or_compute(self, path, params, compute):
+        """
+        Returns the cached result of compute() for this version of the file and these params, computing it on a miss.
+        """
+        key = (file_identity(path), tuple(sorted(params.items())))
+        with self._lock:
+            if key in self._results:
+                self.hits += 1
+                self._results.move_to_end(key)
+                return self._results[key]
+            self.misses += 1
+
+        # Computed outside the lock, so cached results stay available meanwhile.
+        result = compute()
+        with self._lock:
+            self._results[key] = result
+            if len(self._results) > self.max_size:
+                self._results.popitem(last=False)
+        return result
+
+    def invalidate(self, path=None):
+        """
+        Forgets the results of one recording (all of them when path is None), e.g. after it was rewritten.
+        """
+        with self._lock:
+            if path is None:
+                self._results.clear()
+                return
+            path = os.path.abspath(path)
+            for key in [key for key in self._results if key[0][0] == path]:
+                del self._results[key]
+
+    def stats(self):
+        return {
+            "entries": len(self._results),
+            "hits": self.hits,
+            "misses": self.misses,
+        }
+
+
+analysis_cache = AnalysisCache()
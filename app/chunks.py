@@ -0,0 +1,424 @@
+import os
+from datetime import datetime, timedelta, timezone
+import numpy as np
+from sqlalchemy import func, insert, select, true, tuple_
+from app.dependencies import engine
+from app.metrics import db_query_duration
+from app.models import SignalAmplitude, SignalChunk, SignalRollup
+from app.rollups import (
+    OVERVIEW_MAX_POINTS,
+    ROLLUP_RESOLUTIONS,
+    Overview,
+    pick_resolution,
+    rollup_statistics,
+    write_rollups,
+)
+
+
+# Maximum number of samples (per channel) stored in one signal_chunks row.
+CHUNK_SIZE = int(os.getenv("SIGNAL_CHUNK_SIZE", "1000"))
+# Longest time a chunk can cover (CHUNK_SIZE samples at 1 Hz, the lowest BITalino rate). Bounding start_time by
+# it lets Postgres skip the partitions (app/partitions.py) before a time range.
+CHUNK_MAX_SPAN = timedelta(seconds=CHUNK_SIZE)
+
+CHUNK_COLUMNS = [
+    "recording_id",
+    "start_time",
+    "end_time",
+    "sampling_rate",
+    "n_samples",
+    "samples",
+]
+
+
+def to_datetime(timestamp):
+    """
+    Converts a naive UTC datetime64 back to a timezone aware datetime.
+    """
+    return (
+        timestamp.astype("datetime64[us]")
+        .tolist()
+        .replace(tzinfo=timezone.utc)
+    )
+
+
+def to_datetime64(timestamp):
+    """
+    Converts a datetime (naive UTC or timezone aware) or datetime64 to a naive UTC datetime64[us].
+    """
+    if isinstance(timestamp, datetime) and timestamp.tzinfo is not None:
+        timestamp = timestamp.astimezone(timezone.utc).replace(tzinfo=None)
+    return np.datetime64(timestamp, "us")
+
+
+def sample_offsets(sampling_rate, n_samples):
+    """
+    Offsets of each sample from the start of its chunk, as timedelta64[us].
+    """
+    return np.round(np.arange(n_samples) * (1e6 / sampling_rate)).astype(
+        "timedelta64[us]"
+    )
+
+
+def pack_chunks(
+    start_time,
+    sampling_rate,
+    samples,
+    chunk_size=CHUNK_SIZE,
+    recording_id=None,
+):
+    """
+    Splits a (channels, n_samples) block into signal_chunks records (tuples ordered as CHUNK_COLUMNS) of the
+    recording recording_id.
+    """
+    start_time = to_datetime64(start_time)
+    samples = np.atleast_2d(np.asarray(samples, dtype=np.float32))
+    offsets = sample_offsets(sampling_rate, samples.shape[1])
+
+    records = []
+    for first in range(0, samples.shape[1], chunk_size):
+        stop = min(first + chunk_size, samples.shape[1])
+        block = samples[:, first:stop]
+        records.append(
+            (
+                recording_id,
+                to_datetime(start_time + offsets[first]),
+                to_datetime(start_time + offsets[stop - 1]),
+                float(sampling_rate),
+                block.shape[1],
+                block.tolist(),
+            )
+        )
+    return records
+
+
+async def write_chunks(start_time, sampling_rate, samples, recording_id=None):
+    """
+    Writes a (channels, n_samples) block of consecutive samples as signal_chunks rows with a single COPY.
+    """
+    records = pack_chunks(
+        start_time, sampling_rate, samples, recording_id=recording_id
+    )
+    if not records:
+        return
+
+    async with engine.connect() as conn:
+        await copy_chunks(conn, records)
+
+
+async def copy_chunks(conn, records):
+    """
+    COPY of signal_chunks records (see pack_chunks) on the connection conn, inside its transaction when a
+    statement already started one.
+    """
+    raw_connection = await conn.get_raw_connection()
+    # COPY bypasses the SQLAlchemy cursor events that time the other statements.
+    with db_query_duration.time(statement="COPY"):
+        await raw_connection.driver_connection.copy_records_to_table(
+            "signal_chunks", records=records, columns=CHUNK_COLUMNS
+        )
+
+
+class ChunkWriter:
+    """
+    Writer for SampleIngestor (app/ingestion.py). Every flushed batch is stored as chunks of the recording
+    recording_id starting at its first timestamp, and added to the rollups of the recording (app/rollups.py)
+    in the same transaction, so the rollups never count samples that were not stored.
+    """
+
+    def __init__(self, sampling_rate, recording_id=None):
+        self.sampling_rate = sampling_rate
+        self.recording_id = recording_id
+
+    async def __call__(self, timestamps, first_channel, second_channel):
+        samples = np.vstack([first_channel, second_channel])
+        records = pack_chunks(
+            timestamps[0],
+            self.sampling_rate,
+            samples,
+            recording_id=self.recording_id,
+        )
+        async with engine.begin() as conn:
+            # The upsert goes first: the transaction only starts with the first statement, and the COPY joins it.
+            await write_rollups(conn, timestamps, samples, self.recording_id)
+            await copy_chunks(conn, records)
+
+
+def unpack_chunks(rows):
+    """
+    Concatenates (start_time, sampling_rate, samples) rows into timestamps (datetime64[us]) and a (channels, n) float32 array.
+    """
+    timestamps = []
+    samples = []
+    for start_time, sampling_rate, chunk_samples in rows:
+        chunk_samples = np.asarray(chunk_samples, dtype=np.float32)
+        timestamps.append(
+            to_datetime64(start_time)
+            + sample_offsets(sampling_rate, chunk_samples.shape[1])
+        )
+        samples.append(chunk_samples)
+
+    if not samples:
+        return np.empty(0, dtype="datetime64[us]"), np.empty(
+            (2, 0), dtype=np.float32
+        )
+    return np.concatenate(timestamps), np.concatenate(samples, axis=1)
+
+
+async def read_samples(db, start=None, end=None, recording_id=None):
+    """
+    Reads the samples between start and end (both inclusive and optional) from signal_chunks, only those of
+    the recording recording_id when given (a range scan of its (recording_id, start_time) index).
+    Returns timestamps (datetime64[us], UTC) and a (channels, n) float32 array.
+    """
+    query = select(
+        SignalChunk.start_time, SignalChunk.sampling_rate, SignalChunk.samples
+    ).order_by(SignalChunk.start_time)
+    if recording_id is not None:
+        query = query.where(SignalChunk.recording_id == recording_id)
+    if start is not None:
+        query = query.where(
+            SignalChunk.end_time >= start,
+            SignalChunk.start_time >= start - CHUNK_MAX_SPAN,
+        )
+    if end is not None:
+        query = query.where(SignalChunk.start_time <= end)
+
+    result = await db.execute(query)
+    timestamps, samples = unpack_chunks(result.all())
+
+    mask = np.ones(len(timestamps), dtype=bool)
+    if start is not None:
+        mask &= timestamps >= to_datetime64(start)
+    if end is not None:
+        mask &= timestamps <= to_datetime64(end)
+    return timestamps[mask], samples[:, mask]
+
+
+async def read_page(
+    db,
+    start=None,
+    end=None,
+    after=None,
+    limit=10_000,
+    recording_id=None,
+):
+    """
+    One page of at most limit samples between start and end (inclusive, optional), strictly after the cursor
+    `after` (the last timestamp of the previous page), of the recording recording_id when given. Returns
+    timestamps, a (channels, n) float32 array and the cursor of the next page (None on the last page).
+
+    Keyset pagination: every page is an index range scan on (recording_id, start_time) beginning at the chunk
+    holding the cursor, so its cost does not depend on how many pages came before. Chunks are read in start
+    time order, which is the sample order within a recording; recordings may overlap in time, so a timestamp
+    cursor only identifies a position within one of them.
+    """
+    lower = after if after is not None else start
+    recording = true()
+    if recording_id is not None:
+        recording = SignalChunk.recording_id == recording_id
+    position = None  # (start_time, id) of the last chunk read.
+    if lower is not None:
+        # The chunk holding the first sample of the page starts at or before the cursor, by at most
+        # CHUNK_MAX_SPAN. Without one, the page starts with a chunk starting after the cursor.
+        first = (
+            await db.execute(
+                select(SignalChunk.start_time, SignalChunk.id)
+                .where(
+                    SignalChunk.start_time <= lower,
+                    SignalChunk.start_time >= lower - CHUNK_MAX_SPAN,
+                    recording,
+                )
+                .order_by(SignalChunk.start_time.desc(), SignalChunk.id.desc())
+                .limit(1)
+            )
+        ).first()
+        position = (
+            first.start_time if first is not None else lower,
+            0,
+        )  # Ids start at 1.
+
+    timestamps = []
+    samples = []
+    collected = 0
+    batch = (
+        limit // CHUNK_SIZE + 2
+    )  # Chunks hold at most CHUNK_SIZE samples, often exactly that many.
+    while (
+        collected <= limit
+    ):  # One sample more than the page tells whether there is a next page.
+        query = (
+            select(
+                SignalChunk.id,
+                SignalChunk.start_time,
+                SignalChunk.sampling_rate,
+                SignalChunk.samples,
+            )
+            .where(recording)
+            .order_by(SignalChunk.start_time, SignalChunk.id)
+            .limit(batch)
+        )
+        if position is not None:
+            query = query.where(
+                tuple_(SignalChunk.start_time, SignalChunk.id) > position,
+                # The row comparison does not prune partitions, this bound does.
+                SignalChunk.start_time >= position[0],
+            )
+        if end is not None:
+            query = query.where(SignalChunk.start_time <= end)
+
+        rows = (await db.execute(query)).all()
+        if not rows:
+            break
+        position = (rows[-1].start_time, rows[-1].id)
+        chunk_timestamps, chunk_samples = unpack_chunks(
+            [row[1:] for row in rows]
+        )
+        mask = np.ones(len(chunk_timestamps), dtype=bool)
+        if after is not None:
+            mask &= chunk_timestamps > to_datetime64(after)
+        elif start is not None:
+            mask &= chunk_timestamps >= to_datetime64(start)
+        if end is not None:
+            mask &= chunk_timestamps <= to_datetime64(end)
+        timestamps.append(chunk_timestamps[mask])
+        samples.append(chunk_samples[:, mask])
+        collected += int(mask.sum())
+        if len(rows) < batch:
+            break
+
+    if not samples:
+        return (
+            np.empty(0, dtype="datetime64[us]"),
+            np.empty((2, 0), dtype=np.float32),
+            None,
+        )
+    timestamps = np.concatenate(timestamps)[:limit]
+    samples = np.concatenate(samples, axis=1)[:, :limit]
+    next_after = to_datetime(timestamps[-1]) if collected > limit else None
+    return timestamps, samples, next_after
+
+
+def rollup_range(query, recording_id, start, end, resolution):
+    query = query.where(
+        SignalRollup.resolution == resolution,
+        SignalRollup.recording_id == recording_id,
+    )
+    if start is not None:
+        # From the bucket holding start.
+        bucket = to_datetime64(start).astype(f"datetime64[{resolution}s]")
+        query = query.where(SignalRollup.bucket_start >= to_datetime(bucket))
+    if end is not None:
+        query = query.where(SignalRollup.bucket_start <= end)
+    return query
+
+
+async def read_overview(
+    db, recording_id, start=None, end=None, max_points=OVERVIEW_MAX_POINTS
+):
+    """
+    The samples of the recording recording_id between start and end at the finest resolution giving at most
+    about max_points points per channel: the raw samples when they fit, else rollup buckets. The size of the range is estimated from the
+    coarsest rollup (one row per minute of data), so even days of data cost thousands of rows, not millions.
+    """
+    coarsest = ROLLUP_RESOLUTIONS[-1]
+    buckets, n_samples = (
+        await db.execute(
+            rollup_range(
+                select(func.count(), func.sum(SignalRollup.n_samples)),
+                recording_id,
+                start,
+                end,
+                coarsest,
+            )
+        )
+    ).one()
+    resolution = pick_resolution(
+        n_samples or 0, buckets * coarsest, max_points
+    )
+
+    if resolution == 0:
+        timestamps, samples = await read_samples(
+            db, start, end, recording_id=recording_id
+        )
+        return Overview(
+            0, timestamps, samples, samples, samples, np.zeros_like(samples)
+        )
+
+    rows = (
+        (
+            await db.execute(
+                rollup_range(
+                    select(SignalRollup), recording_id, start, end, resolution
+                ).order_by(SignalRollup.bucket_start)
+            )
+        )
+        .scalars()
+        .all()
+    )
+    timestamps = np.array(
+        [to_datetime64(row.bucket_start) for row in rows],
+        dtype="datetime64[us]",
+    )
+    return Overview(resolution, timestamps, *rollup_statistics(rows))
+
+
+def split_regular_runs(timestamps, tolerance=0.5):
+    """
+    Splits sorted timestamps (datetime64) into runs sampled at a constant rate.
+    Returns the estimated sampling rate and a list of (first, stop) index pairs, as Python ints.
+    """
+    if len(timestamps) == 0:
+        return 1.0, []
+    if len(timestamps) == 1:
+        return 1.0, [(0, 1)]
+
+    steps = np.diff(timestamps).astype("timedelta64[us]").astype(np.float64)
+    period = np.median(steps)
+    sampling_rate = round(1e6 / period)
+    breaks = (
+        np.flatnonzero(
+            np.abs(steps - 1e6 / sampling_rate) > tolerance * period
+        )
+        + 1
+    )
+    bounds = np.concatenate([[0], breaks, [len(timestamps)]]).tolist()
+    return float(sampling_rate), list(zip(bounds[:-1], bounds[1:]))
+
+
+def backfill_legacy_samples(connection):
+    """
+    Converts the per-sample rows of signal_amplitudes into signal_chunks (sync connection, used by the migration and init_db).
+    Does nothing once signal_chunks holds data, so it is safe to run on every startup. The legacy rows are kept.
+    """
+    if connection.execute(select(func.count(SignalChunk.id))).scalar():
+        return
+
+    rows = connection.execute(
+        select(
+            SignalAmplitude.timestamp,
+            SignalAmplitude.first_channel,
+            SignalAmplitude.second_channel,
+        ).order_by(SignalAmplitude.timestamp)
+    ).all()
+    rows = [row for row in rows if row.timestamp is not None]
+    if not rows:
+        return
+
+    timestamps = np.array(
+        [to_datetime64(row.timestamp) for row in rows], dtype="datetime64[us]"
+    )
+    samples = np.array(
+        [[row.first_channel, row.second_channel] for row in rows],
+        dtype=np.float64,  # Missing (NULL) values become NaN.
+    ).T
+
+    sampling_rate, runs = split_regular_runs(timestamps)
+    for first, stop in runs:
+        records = pack_chunks(
+            timestamps[first], sampling_rate, samples[:, first:stop]
+        )
+        connection.execute(
+            insert(SignalChunk),
+            [dict(zip(CHUNK_COLUMNS, record)) for record in records],
+        )
@@ -0,0 +1,92 @@
+import numpy as np
+
+
+DECIMATION_METHODS = ("minmax", "lttb")
+
+
+def minmax_indices(y, n_out):
+    """
+    Min/max envelope: splits the last axis into n_out // 2 buckets and keeps the minimum and maximum of each.
+    Works on (n,) or (channels, n) arrays and returns the kept indices (sorted, at most n_out per channel).
+    """
+    y = np.asarray(y)
+    n = y.shape[-1]
+    if n <= n_out:
+        return np.broadcast_to(np.arange(n), y.shape).copy()
+
+    n_buckets = max(n_out // 2, 1)
+    bucket_size = -(-n // n_buckets)  # Ceiling division.
+    padding = n_buckets * bucket_size - n
+    padded = np.pad(
+        y, [(0, 0)] * (y.ndim - 1) + [(0, padding)], mode="edge"
+    )  # Repeating the last value keeps the padded tail out of the extremes of the last bucket.
+    buckets = padded.reshape(y.shape[:-1] + (n_buckets, bucket_size))
+
+    offsets = np.arange(n_buckets) * bucket_size
+    indices = np.concatenate(
+        [
+            offsets + np.argmin(buckets, axis=-1),
+            offsets + np.argmax(buckets, axis=-1),
+        ],
+        axis=-1,
+    )
+    return np.sort(np.minimum(indices, n - 1), axis=-1)
+
+
+def lttb_indices(x, y, n_out):
+    """
+    Largest-Triangle-Three-Buckets on a 1-D series. Keeps the first and last point and, per bucket, the point forming
+    the largest triangle with the previously kept point and the mean of the next bucket. Returns the kept indices.
+    """
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    n = len(y)
+    if n <= n_out:
+        return np.arange(n)
+    if n_out < 3:
+        raise ValueError("LTTB needs at least 3 output points.")
+
+    # Bucket edges of the n - 2 inner points and the mean of every bucket (the "third" vertex of each triangle).
+    edges = np.linspace(1, n - 1, n_out - 1).astype(np.int64)
+    counts = np.diff(edges)
+    mean_x = np.add.reduceat(x[1:-1], edges[:-1] - 1) / counts
+    mean_y = np.add.reduceat(y[1:-1], edges[:-1] - 1) / counts
+    mean_x = np.append(mean_x[1:], x[-1])
+    mean_y = np.append(mean_y[1:], y[-1])
+
+    indices = np.empty(n_out, dtype=np.int64)
+    indices[0] = 0
+    indices[-1] = n - 1
+    previous = 0
+    for bucket in range(n_out - 2):
+        first, stop = edges[bucket], edges[bucket + 1]
+        areas = np.abs(
+            (x[previous] - mean_x[bucket]) * (y[first:stop] - y[previous])
+            - (x[previous] - x[first:stop]) * (mean_y[bucket] - y[previous])
+        )
+        previous = first + int(np.argmax(areas))
+        indices[bucket + 1] = previous
+    return indices
+
+
+def decimate(timestamps, samples, max_points, method="minmax"):
+    """
+    Reduces each channel of a (channels, n) block to at most max_points points.
+    Returns one (timestamps, values) pair per channel, as the kept points differ between channels.
+    """
+    if method not in DECIMATION_METHODS:
+        raise ValueError(
+            f"Unknown decimation method {method!r}. Use one of {DECIMATION_METHODS}."
+        )
+
+    samples = np.atleast_2d(samples)
+    if method == "minmax":
+        indices = minmax_indices(samples, max_points)
+    else:
+        x = timestamps.astype("datetime64[us]").astype(np.int64)
+        indices = [lttb_indices(x, channel, max_points) for channel in samples]
+
+    return [
+        (timestamps[channel_indices], channel[channel_indices])
+        for channel, channel_indices in zip(samples, indices)
+    ]
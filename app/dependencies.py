@@ -1,8 +1,12 @@
 import os
+import time
 from dotenv import load_dotenv
+from sqlalchemy import event
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import sessionmaker
 from sqlalchemy.ext.asyncio import create_async_engine
+from app.metrics import db_query_duration
+from app.profiling import profiler
 
 
 load_dotenv()  # Loading the environment variables from .env
@@ -10,13 +14,31 @@ load_dotenv()  # Loading the environment variables from .env
 # Database url whose configration is read from .env
 DATABASE_URL = f"postgresql+asyncpg://{os.getenv('POSTGRES_USER')}:{os.getenv('POSTGRES_PASSWORD')}@{os.getenv('POSTGRES_HOST')}:{os.getenv('POSTGRES_PORT')}/{os.getenv('POSTGRES_DB')}"
 
+# Logs every statement. Too verbose under load: use the profiler (app/profiling.py) to find slow queries.
+DB_ECHO = os.getenv("DB_ECHO", "0") == "1"
+
 # Setup SQLAlchemy Async Engine and Session. This session is then used below in get_db function and it can be used to interact with database (populate, etc.)
-engine = create_async_engine(DATABASE_URL, echo=True)
+engine = create_async_engine(DATABASE_URL, echo=DB_ECHO)
 SessionLocal = sessionmaker(
     bind=engine, class_=AsyncSession, expire_on_commit=False
 )
 
 
+@event.listens_for(engine.sync_engine, "before_cursor_execute")
+def start_query_timer(conn, cursor, statement, parameters, context, many):
+    context.query_started = time.perf_counter()
+
+
+@event.listens_for(engine.sync_engine, "after_cursor_execute")
+def record_query_time(conn, cursor, statement, parameters, context, many):
+    duration = time.perf_counter() - context.query_started
+    db_query_duration.observe(
+        duration,
+        statement=statement.lstrip().split(None, 1)[0].upper(),
+    )  # Labelled by statement type (SELECT, INSERT, ...), not by statement, to keep the series few.
+    profiler.record(statement, parameters, many, duration, cursor.rowcount)
+
+
 async def get_db():  # Dependency to get the async database session
     async with SessionLocal() as db:
         yield db
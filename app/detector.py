@@ -0,0 +1,134 @@
+import os
+import time
+import numpy as np
+from app.analysis import (
+    ALPHA_FREQUENCY,
+    CLOSED_EYES_THRESHOLD,
+    detect_closed_eyes_minima,
+    welch_segments,
+)
+from app.chunks import to_datetime
+from app.features import band_powers
+from app.metrics import analysis_duration
+
+# Online closed-eyes detection during acquisition: the relative alpha power of the last DETECTOR_WINDOW seconds,
+# recomputed every DETECTOR_HOP seconds.
+DETECTOR_WINDOW = float(os.getenv("DETECTOR_WINDOW", "4"))
+DETECTOR_HOP = float(os.getenv("DETECTOR_HOP", "1"))
+# The alpha band (and the minima around it) must lie well below the Nyquist frequency.
+# Of the BITalino rates, 1 and 10 Hz are too low.
+DETECTOR_MIN_RATE = 100
+
+
+class ClosedEyesDetector:
+    """
+    Sliding-window closed-eyes detector fed with the acquired blocks.
+
+    The window PSD is the same as scipy.signal.welch(window, fs, nperseg=fs) (Hann, 50% overlap), but computed
+    incrementally: the periodogram of every Welch segment is computed once, when its last sample arrives, and
+    kept in a ring buffer, so each update only transforms the new segments and averages the stored ones.
+    """
+
+    def __init__(
+        self,
+        sampling_rate,
+        n_channels,
+        start_time,
+        window=DETECTOR_WINDOW,
+        hop=DETECTOR_HOP,
+        target_freq=ALPHA_FREQUENCY,
+        threshold=CLOSED_EYES_THRESHOLD,
+    ):
+        if sampling_rate < DETECTOR_MIN_RATE:
+            raise ValueError(
+                f"Closed-eyes detection needs at least {DETECTOR_MIN_RATE} Hz."
+            )
+
+        self.sampling_rate = sampling_rate
+        self.start_time = np.datetime64(start_time, "us")
+        self.target_freq = target_freq
+        self.threshold = threshold
+
+        # Segments of one second, as in the /display analysis.
+        self.nperseg = int(sampling_rate)
+        self.step = self.nperseg - self.nperseg // 2
+        self.window_segments = max(
+            1, (int(window * sampling_rate) - self.nperseg) // self.step + 1
+        )
+        self.hop_segments = max(1, round(hop * sampling_rate / self.step))
+
+        self.frequencies, _ = welch_segments(
+            np.empty((n_channels, 0)), sampling_rate
+        )
+        self._pending = np.empty((n_channels, 0))
+        self._consumed = 0  # Samples dropped from the front of _pending.
+        self._periodograms = np.zeros(
+            (self.window_segments, n_channels, self.frequencies.size)
+        )
+        self._segments = 0
+        self.updates = 0
+        self.last_latency = 0.0
+        self.max_latency = 0.0
+
+    def update(self, samples):
+        """
+        Adds a (channels, n) block and returns the detections completed by it (usually none or one).
+        """
+        started = time.perf_counter()
+        self._pending = np.concatenate([self._pending, samples], axis=1)
+        results = []
+        _, periodograms = welch_segments(
+            self._pending, self.sampling_rate
+        )  # Only the segments completed by this block.
+        n_segments = periodograms.shape[1]
+        done = n_segments * self.step
+        self._pending = self._pending[:, done:]
+        for index in range(n_segments):
+            self._periodograms[self._segments % self.window_segments] = (
+                periodograms[:, index]
+            )
+            self._segments += 1
+            self._consumed += self.step
+
+            if (
+                self._segments >= self.window_segments
+                and (self._segments - self.window_segments) % self.hop_segments
+                == 0
+            ):
+                results.append(self._detect())
+
+        latency = time.perf_counter() - started
+        analysis_duration.observe(latency, analysis="detector")
+        self.last_latency = latency
+        self.max_latency = max(self.max_latency, latency)
+        for result in results:
+            result["latency_ms"] = latency * 1000
+        return results
+
+    def psd(self):
+        """
+        Welch PSD (channels, frequencies) of the current window.
+        """
+        return self._periodograms.mean(axis=0)
+
+    def _detect(self):
+        self.updates += 1
+        window_end = self._consumed + self.nperseg - self.step
+        psd = self.psd()
+        results = detect_closed_eyes_minima(
+            self.frequencies, psd, self.target_freq, self.threshold
+        )
+        return {
+            "type": "closed_eyes",
+            "time": to_datetime(
+                self.start_time
+                + np.timedelta64(
+                    round(window_end * 1e6 / self.sampling_rate), "us"
+                )
+            ).isoformat(),
+            "relative_power": [result.relative_power for result in results],
+            "closed_eyes": [result.closed_eyes for result in results],
+            "bands": band_powers(
+                psd, self.sampling_rate, self.nperseg
+            ).to_dict(),
+        }
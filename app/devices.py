@@ -0,0 +1,171 @@
+import os
+import time
+from urllib.parse import parse_qs, urlsplit
+import numpy as np
+from scipy.signal import lfilter, lfilter_zi
+from bitalino import BITalino
+
+# Device used by /start-device and the default of POST /jobs. "simulated" (optionally with options, see
+# SimulatedBITalino.from_address) replaces the hardware, e.g. on CI machines.
+BITALINO_ADDRESS = os.getenv("BITALINO_ADDRESS", "98:D3:11:FD:1F:3A")
+SIMULATED_ADDRESS = "simulated"
+
+SAMPLING_RATES = (1, 10, 100, 1000)  # The rates BITalino supports.
+ANALOG_CHANNELS = 6
+
+
+def open_device(address):
+    """
+    Device factory of the acquisition jobs: a SimulatedBITalino for "simulated[?options]", else the real device.
+    """
+    if urlsplit(address).path == SIMULATED_ADDRESS:
+        return SimulatedBITalino.from_address(address)
+    return BITalino(address)
+
+
+class SimulatedBITalino:
+    """
+    Drop-in replacement of bitalino.BITalino (start/read/stop/close) producing EEG-like frames.
+
+    Frames have the BITalino layout: 4-bit sequence number, 4 digital channels, then the analog channels
+    (10-bit, except the 5th and 6th which are 6-bit as on the device). The analog signal is low-pass filtered
+    noise with optional bursts of 10 Hz alpha. drop_rate is the probability that a frame is lost, which shows
+    up as a gap in the sequence numbers. With realtime the reads block until the frames are due (like the
+    hardware); without it frames are produced as fast as they are read, to load-test the pipeline.
+    """
+
+    def __init__(
+        self,
+        address=SIMULATED_ADDRESS,
+        alpha=True,
+        drop_rate=0.0,
+        realtime=True,
+        seed=None,
+    ):
+        self.address = address
+        self.alpha = alpha
+        self.drop_rate = drop_rate
+        self.realtime = realtime
+        self.started = False
+        self.frames_dropped = 0
+        self._rng = np.random.default_rng(seed)
+
+    @classmethod
+    def from_address(cls, address):
+        """
+        Parses options from the address, e.g. "simulated?alpha=0&drop_rate=0.01&realtime=0&seed=1".
+        """
+        options = {
+            name: values[-1]
+            for name, values in parse_qs(urlsplit(address).query).items()
+        }
+        return cls(
+            address,
+            alpha=options.get("alpha", "1") != "0",
+            drop_rate=float(options.get("drop_rate", 0)),
+            realtime=options.get("realtime", "1") != "0",
+            seed=int(options["seed"]) if "seed" in options else None,
+        )
+
+    def start(self, SamplingRate=1000, analogChannels=[0, 1, 2, 3, 4, 5]):
+        if self.started:
+            raise Exception("The device is already acquiring.")
+        if int(SamplingRate) not in SAMPLING_RATES:
+            raise Exception(f"Invalid sampling rate {SamplingRate}.")
+        channels = list(analogChannels)
+        if (
+            not 1 <= len(channels) <= ANALOG_CHANNELS
+            or len(set(channels)) != len(channels)
+            or not set(channels) <= set(range(ANALOG_CHANNELS))
+        ):
+            raise Exception(f"Invalid analog channels {analogChannels}.")
+
+        self.sampling_rate = int(SamplingRate)
+        self.analog_channels = channels
+        self.started = True
+        self._position = 0  # Frames generated so far, dropped ones included.
+        self._started_at = time.monotonic()
+        # Pink-ish background: white noise through a one-pole low-pass, with its state kept between reads.
+        self._filter = ([0.1], [1, -0.9])
+        self._filter_state = np.outer(
+            np.zeros(len(channels)), lfilter_zi(*self._filter)
+        )
+        self._burst_on = False
+        self._burst_end = 0
+
+    def read(self, nSamples=100):
+        if not self.started:
+            raise Exception("The device is not acquiring.")
+
+        dropped = self._rng.random(nSamples * 2) < self.drop_rate
+        kept = np.flatnonzero(~dropped)[:nSamples]
+        while kept.size < nSamples:  # Extremely high drop rates only.
+            kept = np.append(kept, kept[-1] + 1)
+        span = (
+            int(kept[-1]) + 1
+        )  # Frames that elapse on the device, the dropped ones included.
+        self.frames_dropped += span - nSamples
+
+        if self.realtime:
+            due = (
+                self._started_at + (self._position + span) / self.sampling_rate
+            )
+            delay = due - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+
+        index = self._position + kept
+        analog = self._signal(span)[:, kept]
+        self._position += span
+
+        frames = np.zeros((nSamples, 5 + len(self.analog_channels)), dtype=int)
+        frames[:, 0] = index % 16
+        frames[:, 1:3] = 1  # Digital inputs idle high.
+        frames[:, 5:] = analog.T
+        return frames
+
+    def stop(self):
+        self.started = False
+
+    def close(self):
+        self.started = False
+
+    def _signal(self, n):
+        """
+        (channels, n) ADC values of the next n frames.
+        """
+        noise, self._filter_state = lfilter(
+            *self._filter,
+            self._rng.normal(size=(len(self.analog_channels), n)),
+            axis=1,
+            zi=self._filter_state,
+        )
+        signal = 512 + 180 * noise
+
+        if self.alpha and self.sampling_rate >= 100:
+            t = (self._position + np.arange(n)) / self.sampling_rate
+            signal += 30 * self._bursts(n) * np.sin(2 * np.pi * 10 * t)
+
+        signal = np.clip(np.round(signal), 0, 1023)
+        # A5 and A6 are sampled with 6 bits, wherever they are in the selection.
+        signal[np.asarray(self.analog_channels) >= 4] //= 16
+        return signal.astype(int)
+
+    def _bursts(self, n):
+        """
+        On/off envelope of the alpha rhythm: alternating periods of 2 to 10 s.
+        """
+        envelope = np.zeros(n)
+        position = 0
+        while position < n:
+            if self._position + position >= self._burst_end:
+                self._burst_on = not self._burst_on
+                self._burst_end = (
+                    self._position
+                    + position
+                    + int(self._rng.uniform(2, 10) * self.sampling_rate)
+                )
+            length = min(self._burst_end - self._position - position, n)
+            envelope[position:][:length] = self._burst_on
+            position += length
+        return envelope
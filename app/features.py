@@ -0,0 +1,86 @@
+from functools import lru_cache
+from typing import NamedTuple
+import numpy as np
+
+# Classical EEG bands: (name, low Hz, high Hz).
+EEG_BANDS = (
+    ("delta", 0.5, 4),
+    ("theta", 4, 8),
+    ("alpha", 8, 13),
+    ("beta", 13, 30),
+    ("gamma", 30, 45),
+)
+
+
+class BandPowers(NamedTuple):
+    """
+    Absolute and relative (to the total PSD power) power of each band, both shaped (..., bands).
+    """
+
+    bands: tuple
+    absolute: np.ndarray
+    relative: np.ndarray
+
+    def to_dict(self):
+        return {
+            name: {
+                "absolute": self.absolute[..., index].tolist(),
+                "relative": self.relative[..., index].tolist(),
+            }
+            for index, name in enumerate(self.bands)
+        }
+
+
+@lru_cache(maxsize=64)
+def band_bins(sampling_rate, nperseg, bands=EEG_BANDS):
+    """
+    First and last PSD bin of every band, for the one-sided Welch frequencies of (sampling_rate, nperseg).
+    Computed once per configuration instead of building frequency masks on every call.
+    """
+    resolution = sampling_rate / nperseg
+    last_bin = nperseg // 2
+    lows = np.array([low for _, low, _ in bands], dtype=float)
+    highs = np.array([high for _, _, high in bands], dtype=float)
+    starts = np.clip(np.ceil(lows / resolution - 1e-9), 0, last_bin)
+    stops = np.clip(np.floor(highs / resolution + 1e-9), 0, last_bin)
+    starts = starts.astype(int)
+    stops = np.maximum(stops.astype(int), starts)  # Empty band: zero power.
+    # Shared by every caller through the cache.
+    starts.flags.writeable = stops.flags.writeable = False
+    return starts, stops
+
+
+def cumulative_power(psd, resolution):
+    """
+    Running trapezoidal integral of psd (..., frequencies) from the first bin, starting at 0.
+    """
+    cumulative = np.zeros_like(psd, dtype=float)
+    np.cumsum(
+        (psd[..., 1:] + psd[..., :-1]) * (resolution / 2),
+        axis=-1,
+        out=cumulative[..., 1:],
+    )
+    return cumulative
+
+
+def band_powers(psd, sampling_rate, nperseg=None, bands=EEG_BANDS):
+    """
+    Power of every band of a Welch PSD in one pass. psd is (..., frequencies): a single spectrum, channels,
+    windows or channels x windows. After one cumulative integration each band is the difference of two values.
+    nperseg defaults to the sampling rate, as in the analysis (one-second segments).
+    """
+    nperseg = int(nperseg or sampling_rate)
+    if psd.shape[-1] != nperseg // 2 + 1:
+        raise ValueError(
+            f"Expected {nperseg // 2 + 1} frequencies, got {psd.shape[-1]}."
+        )
+
+    bands = tuple(tuple(band) for band in bands)
+    starts, stops = band_bins(float(sampling_rate), nperseg, bands)
+    cumulative = cumulative_power(psd, sampling_rate / nperseg)
+    absolute = cumulative[..., stops] - cumulative[..., starts]
+    total = cumulative[..., -1:]
+    relative = np.divide(
+        absolute, total, out=np.zeros_like(absolute), where=total > 0
+    )
+    return BandPowers(tuple(name for name, _, _ in bands), absolute, relative)
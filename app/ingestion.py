@@ -0,0 +1,113 @@
+import os
+import time
+from datetime import timezone
+import numpy as np
+from app.dependencies import engine
+from app.metrics import ingestion_batch_duration, ingestion_rows
+
+
+# Batch size (rows) and flush interval (seconds) of the ingestion buffer. Both can be tuned from .env.
+INGEST_BATCH_SIZE = int(os.getenv("INGEST_BATCH_SIZE", "1000"))
+INGEST_FLUSH_INTERVAL = float(os.getenv("INGEST_FLUSH_INTERVAL", "1.0"))
+
+
+async def copy_signal_amplitudes(timestamps, first_channel, second_channel):
+    """
+    Writes one batch of samples to signal_amplitudes with a single COPY (asyncpg) instead of one INSERT per row.
+    """
+    records = zip(
+        [
+            timestamp.replace(tzinfo=timezone.utc)
+            for timestamp in timestamps.astype("datetime64[us]").tolist()
+        ],
+        first_channel.tolist(),
+        second_channel.tolist(),
+    )
+    async with engine.connect() as conn:
+        raw_connection = await conn.get_raw_connection()
+        await raw_connection.driver_connection.copy_records_to_table(
+            "signal_amplitudes",
+            records=records,
+            columns=["timestamp", "first_channel", "second_channel"],
+        )
+
+
+class SampleIngestor:
+    """
+    Buffers acquired samples into preallocated column arrays and hands them to the writer in batches.
+    A batch is flushed once batch_size rows are buffered or flush_interval seconds passed since the last flush.
+    """
+
+    def __init__(
+        self,
+        writer=copy_signal_amplitudes,
+        batch_size=INGEST_BATCH_SIZE,
+        flush_interval=INGEST_FLUSH_INTERVAL,
+    ):
+        if batch_size < 1:
+            raise ValueError("batch_size must be at least 1.")
+
+        self.writer = writer
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.rows_written = 0
+
+        self._timestamps = np.empty(batch_size, dtype="datetime64[us]")
+        self._first_channel = np.empty(batch_size, dtype=np.float64)
+        self._second_channel = np.empty(batch_size, dtype=np.float64)
+        self._buffered = 0
+        self._last_flush = time.monotonic()
+
+    async def add(self, timestamps, first_channel, second_channel):
+        """
+        Adds a block of samples (or a single sample) to the buffer, flushing whenever a batch is full.
+        """
+        timestamps = np.atleast_1d(
+            np.asarray(timestamps, dtype="datetime64[us]")
+        )
+        first_channel = np.atleast_1d(first_channel)
+        second_channel = np.atleast_1d(second_channel)
+
+        offset = 0
+        while offset < len(timestamps):
+            count = min(
+                self.batch_size - self._buffered, len(timestamps) - offset
+            )
+            window = slice(self._buffered, self._buffered + count)
+            block = slice(offset, offset + count)
+            self._timestamps[window] = timestamps[block]
+            self._first_channel[window] = first_channel[block]
+            self._second_channel[window] = second_channel[block]
+            self._buffered += count
+            offset += count
+
+            if self._buffered == self.batch_size:
+                await self.flush()
+
+        if time.monotonic() - self._last_flush >= self.flush_interval:
+            await self.flush()
+
+    async def flush(self):
+        """
+        Writes whatever is buffered. The buffers are copied so they can be refilled while the writer runs.
+        """
+        self._last_flush = time.monotonic()
+        if not self._buffered:
+            return
+
+        count = self._buffered
+        self._buffered = 0
+        with ingestion_batch_duration.time():
+            await self.writer(
+                self._timestamps[:count].copy(),
+                self._first_channel[:count].copy(),
+                self._second_channel[:count].copy(),
+            )
+        self.rows_written += count
+        ingestion_rows.inc(count)
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.flush()  # The last (partial) batch is written even if the acquisition stopped early.
@@ -0,0 +1,198 @@
+import os
+import uuid
+import asyncio
+import logging
+from collections import OrderedDict
+from datetime import datetime, timezone
+from functools import partial
+from app.acquisition import AcquisitionWorker, CSV_FOLDER, capture
+from app.devices import open_device
+from app.recording_sessions import recording_store
+
+
+# Number of acquisitions that may run at the same time. Further jobs wait in the queue.
+ACQUISITION_MAX_JOBS = int(os.getenv("ACQUISITION_MAX_JOBS", "2"))
+# Finished jobs kept for status polling before the oldest are forgotten.
+JOB_HISTORY = int(os.getenv("ACQUISITION_JOB_HISTORY", "100"))
+
+QUEUED = "queued"
+RUNNING = "running"
+COMPLETED = "completed"
+FAILED = "failed"
+CANCELLED = "cancelled"
+FINISHED = (COMPLETED, FAILED, CANCELLED)
+
+
+class AcquisitionJob:
+    def __init__(
+        self, device, channels, sampling_rate, duration, csv_file, user_id=None
+    ):
+        self.id = uuid.uuid4().hex
+        self.user_id = user_id
+        self.device = device
+        self.channels = channels
+        self.sampling_rate = sampling_rate
+        self.duration = duration
+        self.csv_file = csv_file
+        self.recording_id = None  # Row in recordings, once started.
+        self.status = QUEUED
+        self.error = None
+        self.created_at = datetime.now(timezone.utc)
+        self.started_at = None
+        self.finished_at = None
+        self.worker = None
+        self.task = None
+
+    @property
+    def samples_total(self):
+        return int(self.sampling_rate * self.duration)
+
+    @property
+    def samples_captured(self):
+        return self.worker.samples_captured if self.worker else 0
+
+    def to_dict(self):
+        return {
+            "id": self.id,
+            "status": self.status,
+            "device": self.device,
+            "channels": self.channels,
+            "sampling_rate": self.sampling_rate,
+            "duration": self.duration,
+            "samples_captured": self.samples_captured,
+            "samples_total": self.samples_total,
+            "progress": self.samples_captured / self.samples_total,
+            "csv_file": self.csv_file,
+            "recording_id": self.recording_id,
+            "error": self.error,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+        }
+
+
+class JobManager:
+    """
+    Runs acquisitions as background jobs (at most max_jobs at a time) and keeps their status for polling.
+    Each started job is stored as a recording through recording_store (None: not stored).
+    """
+
+    def __init__(
+        self,
+        max_jobs=ACQUISITION_MAX_JOBS,
+        device_factory=open_device,
+        history=JOB_HISTORY,
+        recording_store=recording_store,
+    ):
+        self.device_factory = device_factory
+        self.recording_store = recording_store
+        self.history = history
+        self._slots = asyncio.Semaphore(max_jobs)
+        self._jobs = OrderedDict()
+
+    def submit(
+        self,
+        device,
+        channels,
+        sampling_rate,
+        duration,
+        csv_file=None,
+        user_id=None,
+    ):
+        """
+        Queues an acquisition of user_id (None without a session) and returns its job right away. The job starts as
+        soon as a slot is free.
+        """
+        job = AcquisitionJob(
+            device,
+            list(channels),
+            sampling_rate,
+            duration,
+            csv_file,
+            user_id,
+        )
+        if job.csv_file is None:
+            job.csv_file = os.path.join(CSV_FOLDER, f"eeg_data_{job.id}.csv")
+
+        self._jobs[job.id] = job
+        self._forget_finished()
+        job.task = asyncio.create_task(self._run(job))
+        return job
+
+    def get(self, job_id):
+        return self._jobs.get(job_id)
+
+    def list(self):
+        return list(self._jobs.values())
+
+    def cancel(self, job_id):
+        """
+        Cancels a queued or running job. Samples captured so far are still stored.
+        """
+        job = self._jobs.get(job_id)
+        if job is not None and job.status not in FINISHED:
+            if job.worker is not None:
+                job.worker.stop()
+            job.task.cancel()
+        return job
+
+    async def shutdown(self):
+        for job in self.list():
+            self.cancel(job.id)
+        await asyncio.gather(
+            *(job.task for job in self.list()), return_exceptions=True
+        )
+
+    async def _run(self, job):
+        try:
+            async with self._slots:
+                job.status = RUNNING
+                job.started_at = datetime.now(timezone.utc)
+                if self.recording_store is not None:
+                    job.recording_id = await self.recording_store.create(job)
+                job.worker = AcquisitionWorker(
+                    partial(self.device_factory, job.device),
+                    job.sampling_rate,
+                    job.channels,
+                    job.duration,
+                )
+                job.worker.start()
+                try:
+                    await capture(
+                        job.worker,
+                        job.csv_file,
+                        job.recording_id,
+                        job.user_id,
+                    )
+                finally:
+                    job.worker.stop()
+            job.status = COMPLETED
+        except asyncio.CancelledError:
+            job.status = CANCELLED
+        except Exception as e:
+            logging.error(
+                f"Acquisition job {job.id} failed: {str(e)}", exc_info=True
+            )
+            job.status = FAILED
+            job.error = str(e)
+        finally:
+            job.finished_at = datetime.now(timezone.utc)
+            if job.recording_id is not None:
+                try:
+                    await self.recording_store.finish(job)
+                except Exception as e:
+                    logging.error(
+                        f"Could not store the end of recording {job.recording_id}: {str(e)}"
+                    )
+
+    def _forget_finished(self):
+        finished = [
+            job_id
+            for job_id, job in self._jobs.items()
+            if job.status in FINISHED
+        ]
+        for job_id in finished[: max(len(finished) - self.history, 0)]:
+            del self._jobs[job_id]
+
+
+jobs = JobManager()
@@ -1,18 +1,34 @@
+import time
+import logging
 import uvicorn
-from fastapi import FastAPI
+from fastapi import FastAPI, Request
 from fastapi.staticfiles import StaticFiles
+from fastapi.middleware.gzip import GZipMiddleware
 
 # from alembic import command
 # from alembic.config import Config
 
 from app.models import Base
 from app.dependencies import engine
+from app.chunks import backfill_legacy_samples
+from app.rollups import backfill_rollups
+from app.recording_sessions import backfill_recordings
+from app.acquisition import CSV_FILE
 from app.routes.health_check import router as health_check_router
 from app.routes.register import router as register_router
 from app.routes.display import router as display_router
 from app.routes.login import router as login_router
 from app.routes.verify import router as verify_router
-from app.socket import router as websocket_router
+from app.routes.jobs import router as jobs_router
+from app.routes.timeline import router as timeline_router
+from app.routes.metrics import router as metrics_router
+from app.routes.profiling import router as profiling_router
+from app.routes.signals import router as signals_router
+from app.metrics import http_request_duration
+from app.profiling import profiler
+from app.partitions import partition_maintenance
+from app.jobs import jobs
+from app.socket import manager, router as websocket_router
 
 
 async def init_db():
@@ -21,6 +37,15 @@ async def init_db():
     """
     async with engine.begin() as conn:
         await conn.run_sync(Base.metadata.create_all)
+        await conn.run_sync(
+            backfill_legacy_samples
+        )  # Moves samples recorded before chunked storage into signal_chunks (only while signal_chunks is empty).
+        await conn.run_sync(
+            backfill_recordings, latest_csv_file=CSV_FILE
+        )  # Samples stored without a recording are grouped into recordings.
+        await conn.run_sync(
+            backfill_rollups
+        )  # Rollups of the recordings stored before they existed (only while signal_rollups is empty).
 
 
 async def close_db():
@@ -30,6 +55,42 @@ async def close_db():
 app = FastAPI()
 ALEMBIC_CONFIG = "alembic.ini"
 app.mount("/static", StaticFiles(directory="app/static"), name="static")
+app.add_middleware(
+    GZipMiddleware, minimum_size=1024
+)  # For the clients sending Accept-Encoding: gzip. Smaller responses are not worth compressing.
+
+
+@app.middleware("http")
+async def record_request_latency(request: Request, call_next):
+    started = time.perf_counter()
+    response = await call_next(request)
+    route = request.scope.get("route")
+    http_request_duration.observe(
+        time.perf_counter() - started,
+        method=request.method,
+        # The route template (/jobs/{job_id}), not the path, so ids do not create new series.
+        route=route.path if route is not None else "unmatched",
+        status=response.status_code,
+    )
+    return response
+
+
+@app.middleware("http")
+async def profile_database(request: Request, call_next):
+    if not profiler.enabled:
+        return await call_next(request)
+    token, profile = profiler.start_request(request.method, request.url.path)
+    try:
+        response = await call_next(request)
+    finally:
+        profiler.end_request(token)
+    if profile.queries:
+        response.headers["Server-Timing"] = profile.server_timing()
+        logging.debug(
+            f"{request.method} {request.url.path}: {profile.queries} queries, "
+            f"{profile.rows} rows, {profile.duration * 1000:.1f} ms in the database"
+        )
+    return response
 
 
 @app.on_event("startup")
@@ -39,6 +100,8 @@ async def startup_event_on_database():
     """
 
     await init_db()
+    partition_maintenance.start()  # Creates the coming signal_chunks partitions and applies the retention.
+    await manager.start()  # Joins the cross-worker broadcast channel (BROADCAST_BACKEND).
 
     # alembic_cfg = Config(ALEMBIC_CONFIG)  # Uncomment these (two imports above as well) when a new change to datbase is added and run the app. Not needed for users on Docker.
     # command.upgrade(
@@ -51,6 +114,9 @@ async def shutdown_event_on_database():
     """
     In order to clean up database connections when the app shuts down.
     """
+    await jobs.shutdown()  # Running acquisitions are stopped (and their captured samples stored) first.
+    await partition_maintenance.stop()
+    await manager.stop()
     await close_db()
 
 
@@ -61,6 +127,11 @@ app.include_router(display_router)
 app.include_router(login_router)
 app.include_router(verify_router)
 app.include_router(websocket_router)
+app.include_router(jobs_router)
+app.include_router(timeline_router)
+app.include_router(metrics_router)
+app.include_router(profiling_router)
+app.include_router(signals_router)
 
 if __name__ == "__main__":
     uvicorn.run(app, host="0.0.0.0", port=8000)
@@ -0,0 +1,248 @@
+import math
+import time
+import bisect
+import threading
+from abc import ABC, abstractmethod
+from contextlib import contextmanager
+
+# Metrics in the Prometheus text format, served by GET /metrics (app/routes/metrics.py).
+# Hot paths record once per request, query, block or batch, never per sample. Each metric has its own lock, held
+# only for an increment, because the acquisition thread records too.
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+# Seconds, from sub-millisecond queries to multi-second analyses.
+LATENCY_BUCKETS = (
+    0.0005,
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1,
+    2.5,
+    5,
+    10,
+)
+
+
+class Metric(ABC):
+    type = None
+
+    def __init__(self, name, documentation, labels=(), registry=None):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = tuple(labels)
+        self._values = {}
+        self._lock = threading.Lock()
+        (REGISTRY if registry is None else registry).register(self)
+
+    def _key(self, labels):
+        if set(labels) != set(self.label_names):
+            raise ValueError(
+                f"{self.name} expects the labels {self.label_names}."
+            )
+        return tuple(str(labels[name]) for name in self.label_names)
+
+    def _labels(self, key, **extra):
+        pairs = list(zip(self.label_names, key)) + list(extra.items())
+        if not pairs:
+            return ""
+        return (
+            "{"
+            + ",".join(f'{name}="{escape(value)}"' for name, value in pairs)
+            + "}"
+        )
+
+    @abstractmethod
+    def samples(self):
+        """
+        (name, labels, value) lines of the exposition.
+        """
+
+    def render(self):
+        lines = [
+            f"# HELP {self.name} {self.documentation}",
+            f"# TYPE {self.name} {self.type}",
+        ]
+        lines += [
+            f"{name}{labels} {format_value(value)}"
+            for name, labels, value in self.samples()
+        ]
+        return "\n".join(lines)
+
+
+class Counter(Metric):
+    type = "counter"
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels):
+        return self._values.get(self._key(labels), 0)
+
+    def samples(self):
+        with self._lock:
+            values = list(self._values.items())
+        return [(self.name, self._labels(key), value) for key, value in values]
+
+
+class Gauge(Metric):
+    """
+    Gauge set explicitly, or read from function at scrape time (then it costs nothing between scrapes).
+    """
+
+    type = "gauge"
+
+    def __init__(self, name, documentation, function=None, **kwargs):
+        super().__init__(name, documentation, **kwargs)
+        self.function = function
+
+    def set(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def value(self, **labels):
+        return self._values.get(self._key(labels), 0)
+
+    def samples(self):
+        if self.function is not None:
+            return [(self.name, "", self.function())]
+        with self._lock:
+            values = list(self._values.items())
+        return [(self.name, self._labels(key), value) for key, value in values]
+
+
+class Histogram(Metric):
+    type = "histogram"
+
+    def __init__(self, name, documentation, buckets=LATENCY_BUCKETS, **kwargs):
+        super().__init__(name, documentation, **kwargs)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._values.get(key)
+            if series is None:
+                # Per-bucket counts (the last one is +Inf), sum.
+                series = self._values[key] = [
+                    [0] * (len(self.buckets) + 1),
+                    0.0,
+                ]
+            series[0][index] += 1
+            series[1] += value
+
+    @contextmanager
+    def time(self, **labels):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, **labels)
+
+    def count(self, **labels):
+        series = self._values.get(self._key(labels))
+        return sum(series[0]) if series else 0
+
+    def samples(self):
+        with self._lock:
+            values = [
+                (key, list(counts), total)
+                for key, (counts, total) in self._values.items()
+            ]
+        samples = []
+        for key, counts, total in values:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (math.inf,), counts):
+                cumulative += count
+                samples.append(
+                    (
+                        f"{self.name}_bucket",
+                        self._labels(key, le=format_value(bound)),
+                        cumulative,
+                    )
+                )
+            samples.append((f"{self.name}_sum", self._labels(key), total))
+            samples.append(
+                (f"{self.name}_count", self._labels(key), cumulative)
+            )
+        return samples
+
+
+class Registry:
+    def __init__(self):
+        self.metrics = []
+
+    def register(self, metric):
+        self.metrics.append(metric)
+
+    def render(self):
+        return "\n".join(metric.render() for metric in self.metrics) + "\n"
+
+
+def escape(value):
+    return (
+        str(value)
+        .replace("\\", "\\\\")
+        .replace("\n", "\\n")
+        .replace('"', '\\"')
+    )
+
+
+def format_value(value):
+    if value == math.inf:
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+REGISTRY = Registry()
+
+http_request_duration = Histogram(
+    "http_request_duration_seconds",
+    "HTTP request latency by route template.",
+    labels=("method", "route", "status"),
+)
+db_query_duration = Histogram(
+    "db_query_duration_seconds",
+    "Database statement execution time by statement type.",
+    labels=("statement",),
+)
+acquisition_samples = Counter(
+    "acquisition_samples_total",
+    "Frames read from the acquisition devices (rate() gives samples per second).",
+)
+acquisition_read_jitter = Histogram(
+    "acquisition_read_jitter_seconds",
+    "Absolute deviation of each device read from its expected duration.",
+    buckets=(0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1),
+)
+ingestion_batch_duration = Histogram(
+    "ingestion_batch_duration_seconds",
+    "Time to write one ingestion batch to the database.",
+)
+ingestion_rows = Counter(
+    "ingestion_rows_total", "Samples written to the database."
+)
+analysis_duration = Histogram(
+    "analysis_duration_seconds",
+    "Signal analysis compute time (cached analyses count their misses only).",
+    labels=("analysis",),
+)
+websocket_send_duration = Histogram(
+    "websocket_send_duration_seconds",
+    "Time to send one message to one websocket client.",
+)
+websocket_dropped_messages = Counter(
+    "websocket_dropped_messages_total",
+    "Messages dropped for slow websocket clients.",
+)
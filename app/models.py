@@ -1,4 +1,7 @@
-from sqlalchemy import Column, Integer, String, Float, DateTime
+from sqlalchemy import Column, Integer, String, Float, DateTime, REAL, DDL
+from sqlalchemy import ForeignKey, Index
+from sqlalchemy import event
+from sqlalchemy.dialects.postgresql import ARRAY
 from sqlalchemy.ext.declarative import declarative_base
 
 Base = (
@@ -12,7 +15,116 @@ class SignalAmplitude(Base):
     id = Column(Integer, primary_key=True)
     first_channel = Column(Float)
     second_channel = Column(Float)
-    timestamp = Column(DateTime(timezone=True))
+    timestamp = Column(DateTime(timezone=True), index=True)
+
+
+class Recording(
+    Base
+):  # One acquisition: who captured what, when, and how it ended (see app/recording_sessions.py).
+    __tablename__ = "recordings"
+
+    id = Column(Integer, primary_key=True)
+    user_id = Column(
+        Integer, ForeignKey("users.id", ondelete="SET NULL")
+    )  # None for recordings started through the API or made before recordings were stored.
+    device = Column(String, nullable=False)
+    channels = Column(ARRAY(Integer), nullable=False)
+    sampling_rate = Column(Float, nullable=False)
+    start_time = Column(DateTime(timezone=True), nullable=False)
+    end_time = Column(DateTime(timezone=True))  # None while running.
+    status = Column(
+        String, nullable=False
+    )  # running, completed, failed or cancelled (the job statuses).
+    csv_file = Column(String)  # CSV export, used by the analysis.
+
+    __table_args__ = (
+        Index("ix_recordings_user_id_start_time", "user_id", "start_time"),
+    )
+
+
+class SignalChunk(
+    Base
+):  # One row per block of consecutive samples instead of one row per sample (see app/chunks.py for writing and reading).
+    __tablename__ = "signal_chunks"
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    recording_id = Column(
+        Integer, ForeignKey("recordings.id", ondelete="CASCADE")
+    )
+    start_time = Column(
+        DateTime(timezone=True), primary_key=True, index=True
+    )  # Partition key, so part of the primary key.
+    end_time = Column(
+        DateTime(timezone=True), nullable=False
+    )  # Timestamp of the last sample. Sample timestamps are start_time + index / sampling_rate and are not stored.
+    sampling_rate = Column(Float, nullable=False)
+    n_samples = Column(Integer, nullable=False)
+    samples = Column(
+        ARRAY(REAL, dimensions=2), nullable=False
+    )  # float32 array of shape (channels, n_samples). Row 1 is A3 (first_channel), row 2 is A4 (second_channel).
+
+    __table_args__ = (
+        # The samples of one recording in a time range are an index range scan.
+        Index(
+            "ix_signal_chunks_recording_id_start_time",
+            "recording_id",
+            "start_time",
+        ),
+        # Range partitioned by start time, one partition per period (see app/partitions.py). Queries on a time
+        # range only scan the partitions overlapping it, and old data is dropped a partition at a time.
+        {"postgresql_partition_by": "RANGE (start_time)"},
+    )
+
+
+# Compatibility view exposing the chunks in the same per-sample shape as signal_amplitudes, so existing queries only need the table name changed.
+SIGNAL_SAMPLES_VIEW = """
+CREATE OR REPLACE VIEW signal_samples AS
+SELECT
+    c.id AS chunk_id,
+    c.start_time + make_interval(secs => (s.i - 1) / c.sampling_rate) AS timestamp,
+    c.samples[1][s.i] AS first_channel,
+    c.samples[2][s.i] AS second_channel
+FROM signal_chunks AS c
+CROSS JOIN LATERAL generate_series(1, c.n_samples) AS s(i)
+"""
+
+event.listen(
+    SignalChunk.__table__,
+    "after_create",
+    DDL(
+        "CREATE TABLE signal_chunks_default PARTITION OF signal_chunks DEFAULT"
+    ),
+)  # Holds the rows of periods without a partition until the maintenance moves them to one.
+event.listen(SignalChunk.__table__, "after_create", DDL(SIGNAL_SAMPLES_VIEW))
+event.listen(
+    SignalChunk.__table__,
+    "before_drop",
+    DDL("DROP VIEW IF EXISTS signal_samples"),
+)
+
+
+class SignalRollup(
+    Base
+):  # Per-bucket aggregates of the samples at several resolutions, for overviews of long time ranges (see app/rollups.py).
+    __tablename__ = "signal_rollups"
+
+    resolution = Column(Integer, primary_key=True)  # Bucket length, seconds.
+    recording_id = Column(
+        Integer,
+        ForeignKey("recordings.id", ondelete="CASCADE"),
+        primary_key=True,
+    )
+    bucket_start = Column(DateTime(timezone=True), primary_key=True)
+    n_samples = Column(Integer, nullable=False)
+    # Sums instead of mean and std, so buckets filled by several ingestion batches can be merged.
+    first_min = Column(REAL, nullable=False)
+    first_max = Column(REAL, nullable=False)
+    first_sum = Column(Float, nullable=False)
+    first_sum_squares = Column(Float, nullable=False)
+    second_min = Column(REAL, nullable=False)
+    second_max = Column(REAL, nullable=False)
+    second_sum = Column(Float, nullable=False)
+    second_sum_squares = Column(Float, nullable=False)
 
 
 class User(Base):  # User model for SQLAlchemy (table)
@@ -0,0 +1,386 @@
+import os
+import re
+import asyncio
+import logging
+import argparse
+from datetime import datetime, timedelta, timezone
+import numpy as np
+from sqlalchemy import create_engine, text
+from sqlalchemy.pool import NullPool
+from app.chunks import to_datetime64
+from app.dependencies import DATABASE_URL
+from app.recordings import RECORDING_SUFFIX, RecordingWriter
+
+# signal_chunks is range partitioned on start_time (see app/models.py), one partition per period of
+# SIGNAL_PARTITION_DAYS days. Weekly periods start on Mondays, daily ones at midnight UTC.
+SIGNAL_PARTITION_DAYS = int(os.getenv("SIGNAL_PARTITION_DAYS", "7"))
+# Periods created in advance, so the acquisitions never write into the default partition.
+SIGNAL_PARTITIONS_AHEAD = int(os.getenv("SIGNAL_PARTITIONS_AHEAD", "2"))
+# Partitions entirely older than this many days are dropped (0 keeps everything).
+SIGNAL_RETENTION_DAYS = int(os.getenv("SIGNAL_RETENTION_DAYS", "0"))
+# Dropped partitions are exported to binary recordings under this folder first (empty: not archived).
+SIGNAL_ARCHIVE_FOLDER = os.getenv("SIGNAL_ARCHIVE_FOLDER", "")
+# Rollup buckets older than this many days are deleted (0 keeps everything). They are small, so they may
+# outlive the samples to keep the overviews of old data.
+ROLLUP_RETENTION_DAYS = int(os.getenv("ROLLUP_RETENTION_DAYS", "0"))
+# Chunks read per query when archiving a partition.
+ARCHIVE_PAGE = 100
+# Seconds between two maintenance runs.
+PARTITION_MAINTENANCE_INTERVAL = float(
+    os.getenv("PARTITION_MAINTENANCE_INTERVAL", "3600")
+)
+
+PARENT_TABLE = "signal_chunks"
+DEFAULT_PARTITION = "signal_chunks_default"
+PARTITION_ANCHOR = datetime(
+    1970, 1, 5, tzinfo=timezone.utc
+)  # A Monday: periods are counted from it.
+PARTITION_NAME = re.compile(r"^signal_chunks_p(\d{8})_(\d{8})$")
+# Advisory lock held during a maintenance run, so the workers of a deployment do not run it twice at once.
+MAINTENANCE_LOCK = 0x5167_4348
+# The maintenance is synchronous (archives are written while the chunks are read), so it runs in a worker
+# thread through psycopg2, as the migrations do, instead of on the event loop through asyncpg.
+SYNC_DATABASE_URL = DATABASE_URL.replace("+asyncpg", "")
+
+logger = logging.getLogger("app.partitions")
+
+
+def partition_start(timestamp, days=SIGNAL_PARTITION_DAYS):
+    """
+    Start (UTC midnight) of the period holding timestamp.
+    """
+    elapsed = timestamp.astimezone(timezone.utc) - PARTITION_ANCHOR
+    return PARTITION_ANCHOR + timedelta(days=elapsed.days // days * days)
+
+
+def partition_name(start, end):
+    return f"{PARENT_TABLE}_p{start:%Y%m%d}_{end:%Y%m%d}"
+
+
+def partition_bounds(name):
+    """
+    (start, end) of a partition named by partition_name, None for other tables (the default partition).
+    """
+    match = PARTITION_NAME.match(name)
+    if match is None:
+        return None
+    return tuple(
+        datetime.strptime(day, "%Y%m%d").replace(tzinfo=timezone.utc)
+        for day in match.groups()
+    )
+
+
+def list_partitions(connection):
+    """
+    (name, start, end) of the period partitions of signal_chunks, oldest first.
+    """
+    names = connection.execute(
+        text(
+            """
+            SELECT c.relname
+            FROM pg_inherits AS i
+            JOIN pg_class AS c ON c.oid = i.inhrelid
+            WHERE i.inhparent = CAST(:parent AS regclass)
+            """
+        ),
+        {"parent": PARENT_TABLE},
+    ).scalars()
+    partitions = [
+        (name, *partition_bounds(name))
+        for name in names
+        if partition_bounds(name) is not None
+    ]
+    return sorted(partitions, key=lambda partition: partition[1])
+
+
+def data_periods(connection, table, days=SIGNAL_PARTITION_DAYS):
+    """
+    Starts of the periods holding rows of table (signal_chunks or one of its partitions).
+    """
+    indexes = connection.execute(
+        text(
+            f"""
+            SELECT DISTINCT floor(
+                extract(epoch FROM start_time - CAST(:anchor AS timestamptz)) / CAST(:period AS float8)
+            )
+            FROM {table}
+            """
+        ),
+        {"anchor": PARTITION_ANCHOR, "period": days * 86400},
+    ).scalars()
+    return sorted(
+        PARTITION_ANCHOR + timedelta(days=int(index) * days)
+        for index in indexes
+    )
+
+
+def create_partition(connection, start, end):
+    """
+    Adds the partition of [start, end). Rows of that period waiting in the default partition are moved into it
+    before it is attached (a CREATE TABLE ... PARTITION OF would fail on them). ATTACH PARTITION only locks
+    signal_chunks against schema changes, so the acquisitions keep writing meanwhile.
+    """
+    name = partition_name(start, end)
+    connection.execute(
+        text(
+            f"CREATE TABLE {name} (LIKE {PARENT_TABLE} INCLUDING DEFAULTS INCLUDING CONSTRAINTS)"
+        )
+    )
+    connection.execute(
+        text(
+            f"""
+            WITH moved AS (
+                DELETE FROM {DEFAULT_PARTITION}
+                WHERE start_time >= :start AND start_time < :end
+                RETURNING *
+            )
+            INSERT INTO {name} SELECT * FROM moved
+            """
+        ),
+        {"start": start, "end": end},
+    )
+    # Bounds are literals in DDL. Both are datetimes made here, never user input.
+    connection.execute(
+        text(
+            f"ALTER TABLE {PARENT_TABLE} ATTACH PARTITION {name} "
+            f"FOR VALUES FROM ('{start.isoformat()}') TO ('{end.isoformat()}')"
+        )
+    )
+    return name
+
+
+def ensure_partitions(
+    connection,
+    now=None,
+    days=SIGNAL_PARTITION_DAYS,
+    ahead=SIGNAL_PARTITIONS_AHEAD,
+):
+    """
+    Creates the partitions of the current period and of the ahead next ones, and of the periods of the rows
+    that ended up in the default partition. Periods overlapping an existing partition (made with another
+    SIGNAL_PARTITION_DAYS) are left alone. Returns the names of the new partitions.
+    """
+    now = now or datetime.now(timezone.utc)
+    current = partition_start(now, days)
+    starts = {current + timedelta(days=i * days) for i in range(ahead + 1)}
+    starts.update(data_periods(connection, DEFAULT_PARTITION, days))
+
+    existing = list_partitions(connection)
+    created = []
+    for start in sorted(starts):
+        end = start + timedelta(days=days)
+        if any(lower < end and start < upper for _, lower, upper in existing):
+            continue
+        created.append(create_partition(connection, start, end))
+    return created
+
+
+def chunks_by_recording(connection, table, before=None, page=ARCHIVE_PAGE):
+    """
+    (recording_id, start_time, sampling_rate, samples) of the chunks of table (ending before before, if given)
+    by recording and start time, read page rows at a time with keyset pagination. A server-side cursor would
+    stay open until the end of the transaction, and keep the partition from being dropped in it.
+    """
+    query = text(
+        f"""
+        SELECT id, coalesce(recording_id, 0) AS recording, recording_id, start_time, sampling_rate, samples
+        FROM {table}
+        WHERE (coalesce(recording_id, 0), start_time, id) > (:recording, :start_time, :id)
+        {"AND end_time < :before" if before is not None else ""}
+        ORDER BY coalesce(recording_id, 0), start_time, id
+        LIMIT :page
+        """
+    )
+    # Before every row: recording ids start at 1, unassigned chunks count as 0.
+    position = {
+        "recording": -1,
+        "start_time": datetime(1, 1, 1, tzinfo=timezone.utc),
+        "id": 0,
+    }
+    while True:
+        parameters = {**position, "page": page}
+        if before is not None:
+            parameters["before"] = before
+        rows = connection.execute(query, parameters).all()
+        for row in rows:
+            yield row.recording_id, row.start_time, row.sampling_rate, row.samples
+        if len(rows) < page:
+            return
+        last = rows[-1]
+        position = {
+            "recording": last.recording,
+            "start_time": last.start_time,
+            "id": last.id,
+        }
+
+
+def archive_chunks(connection, table, folder, before=None):
+    """
+    Exports the chunks of table (a partition) to binary recordings under folder/table: one file per stretch of
+    continuous samples of a recording. With before, only the chunks ending before it. The chunks are read a
+    page at a time, so a partition is never held in memory. Returns the paths written.
+    """
+    paths = []
+    writer = None
+    stretch = None  # (recording_id, sampling_rate) of the file being written.
+    expected = None  # Timestamp of the sample following the last one written.
+    try:
+        for (
+            recording_id,
+            start_time,
+            sampling_rate,
+            samples,
+        ) in chunks_by_recording(connection, table, before):
+            start_time = to_datetime64(start_time)
+            samples = np.asarray(samples, dtype=np.float32)
+            period = np.timedelta64(round(1e6 / sampling_rate), "us")
+            if (
+                stretch != (recording_id, sampling_rate)
+                or abs(start_time - expected) > period / 2
+            ):
+                if writer is not None:
+                    writer.close()
+                name = f"recording_{recording_id}_{start_time.item():%Y%m%dT%H%M%S}"
+                path = os.path.join(folder, table, name + RECORDING_SUFFIX)
+                writer = RecordingWriter(
+                    path, sampling_rate, samples.shape[0], start_time
+                )
+                stretch = (recording_id, sampling_rate)
+                paths.append(path)
+            writer.append(samples)
+            expected = start_time + np.round(
+                samples.shape[1] * 1e6 / sampling_rate
+            ).astype("timedelta64[us]")
+    finally:
+        if writer is not None:
+            writer.close()
+    return paths
+
+
+def apply_retention(
+    connection,
+    now=None,
+    retention_days=SIGNAL_RETENTION_DAYS,
+    archive_folder=SIGNAL_ARCHIVE_FOLDER,
+    rollup_retention_days=ROLLUP_RETENTION_DAYS,
+):
+    """
+    Detaches and drops the partitions older than retention_days (archived first when archive_folder is set):
+    removing a period costs the same whatever its size, unlike a DELETE of its rows. Old rows left in the
+    default partition are deleted. Returns the names of the dropped partitions.
+    """
+    now = now or datetime.now(timezone.utc)
+    if rollup_retention_days > 0:
+        connection.execute(
+            text("DELETE FROM signal_rollups WHERE bucket_start < :cutoff"),
+            {"cutoff": now - timedelta(days=rollup_retention_days)},
+        )
+    if retention_days <= 0:
+        return []
+
+    cutoff = now - timedelta(days=retention_days)
+    dropped = []
+    for name, _, end in list_partitions(connection):
+        if end > cutoff:
+            continue
+        if archive_folder:
+            archive_chunks(connection, name, archive_folder)
+        connection.execute(
+            text(f"ALTER TABLE {PARENT_TABLE} DETACH PARTITION {name}")
+        )
+        connection.execute(text(f"DROP TABLE {name}"))
+        dropped.append(name)
+
+    if archive_folder:
+        archive_chunks(
+            connection, DEFAULT_PARTITION, archive_folder, before=cutoff
+        )
+    connection.execute(
+        text(f"DELETE FROM {DEFAULT_PARTITION} WHERE end_time < :cutoff"),
+        {"cutoff": cutoff},
+    )
+    return dropped
+
+
+def maintain_partitions(connection, now=None):
+    """
+    One maintenance run (sync connection, in a transaction): retention, then the partitions to come. Returns
+    the dropped and created partitions, or None when another worker is running it.
+    """
+    if not connection.execute(
+        text("SELECT pg_try_advisory_xact_lock(:key)"),
+        {"key": MAINTENANCE_LOCK},
+    ).scalar():
+        return None
+    dropped = apply_retention(connection, now)
+    created = ensure_partitions(connection, now)
+    return {"dropped": dropped, "created": created}
+
+
+class PartitionMaintenance:
+    """
+    Runs maintain_partitions every interval seconds in the background, from the application startup on. Each
+    run takes a worker thread and a connection of its own, so archiving a partition neither blocks the event
+    loop nor holds a connection of the application pool.
+    """
+
+    def __init__(
+        self,
+        interval=PARTITION_MAINTENANCE_INTERVAL,
+        database_url=SYNC_DATABASE_URL,
+    ):
+        self.interval = interval
+        self.database_url = database_url
+        self._engine = None
+        self._task = None
+
+    def start(self):
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    def maintain(self, now=None):
+        """
+        One maintain_partitions run in its own transaction (blocking). The connection is closed afterwards: runs
+        are an interval apart.
+        """
+        if self._engine is None:
+            self._engine = create_engine(self.database_url, poolclass=NullPool)
+        with self._engine.begin() as connection:
+            return maintain_partitions(connection, now)
+
+    async def run_once(self, now=None):
+        summary = await asyncio.to_thread(self.maintain, now)
+        if summary and (summary["dropped"] or summary["created"]):
+            logger.info(
+                f"Partitions dropped: {summary['dropped']}, created: {summary['created']}"
+            )
+        return summary
+
+    async def _run(self):
+        while True:
+            try:
+                await self.run_once()
+            except Exception as e:
+                logger.error(
+                    f"Partition maintenance failed: {str(e)}", exc_info=True
+                )
+            await asyncio.sleep(self.interval)
+
+
+partition_maintenance = PartitionMaintenance()
+
+
+async def main():
+    print(await partition_maintenance.run_once())
+
+
+if __name__ == "__main__":
+    argparse.ArgumentParser(
+        description="Runs the signal_chunks partition maintenance once (python -m app.partitions)."
+    ).parse_args()
+    asyncio.run(main())
@@ -0,0 +1,157 @@
+import os
+import logging
+from contextvars import ContextVar
+
+# Per-statement database profiling, fed by the query timing hook of the engine (app/dependencies.py). Off by
+# default: set DB_PROFILING=1, or switch it on and off at runtime (POST /debug/db-profile).
+DB_PROFILING = os.getenv("DB_PROFILING", "0") == "1"
+# Serves /debug/db-profile. Off by default: the report shows the statements run against the database.
+DB_PROFILE_ENDPOINT = os.getenv("DB_PROFILE_ENDPOINT", "0") == "1"
+# Statements slower than this (milliseconds) are logged with the shape of their parameters.
+DB_SLOW_QUERY_MS = float(os.getenv("DB_SLOW_QUERY_MS", "100"))
+# Distinct statements aggregated in the profile. Statements are parametrized, so this is only a safety net.
+DB_PROFILE_MAX_STATEMENTS = 1000
+
+logger = logging.getLogger("app.profiling")
+
+# Profile of the HTTP request being handled, set by the middleware in app/main.py.
+current_request = ContextVar("current_request", default=None)
+
+
+def parameters_shape(parameters, many=False):
+    """
+    Describes the bound parameters without their values (which may be passwords or tokens),
+    e.g. "(str, int)" or "250 x (datetime, float, float)".
+    """
+    if many:
+        first = parameters[0] if parameters else ()
+        return f"{len(parameters)} x {parameters_shape(first)}"
+    if isinstance(parameters, dict):
+        parameters = parameters.values()
+    return "(" + ", ".join(type(value).__name__ for value in parameters) + ")"
+
+
+class StatementStats:
+    def __init__(self):
+        self.calls = 0
+        self.total_time = 0.0
+        self.max_time = 0.0
+        self.rows = 0
+
+    def add(self, duration, rows):
+        self.calls += 1
+        self.total_time += duration
+        self.max_time = max(self.max_time, duration)
+        self.rows += rows
+
+    def to_dict(self):
+        return {
+            "calls": self.calls,
+            "total_ms": self.total_time * 1000,
+            "mean_ms": self.total_time * 1000 / self.calls,
+            "max_ms": self.max_time * 1000,
+            "rows": self.rows,
+        }
+
+
+class RequestProfile:
+    """
+    Database work done while handling one request.
+    """
+
+    def __init__(self, method, path):
+        self.method = method
+        self.path = path
+        self.queries = 0
+        self.rows = 0
+        self.duration = 0.0
+
+    def add(self, duration, rows):
+        self.queries += 1
+        self.rows += rows
+        self.duration += duration
+
+    def server_timing(self):
+        """
+        Server-Timing header value, shown per request by the browser developer tools.
+        """
+        return (
+            f'db;dur={self.duration * 1000:.1f};desc="{self.queries} queries"'
+        )
+
+
+class QueryProfiler:
+    """
+    Records the duration and row count of every statement, aggregated per statement and per request.
+    """
+
+    def __init__(self, enabled=DB_PROFILING, slow_query_ms=DB_SLOW_QUERY_MS):
+        self.enabled = enabled
+        self.slow_query_ms = slow_query_ms
+        self.statements = {}
+
+    def start_request(self, method, path):
+        """
+        Starts the profile of a request in the current context. Returns the reset token and the profile.
+        """
+        profile = RequestProfile(method, path)
+        return current_request.set(profile), profile
+
+    def end_request(self, token):
+        current_request.reset(token)
+
+    def report(self, limit=20):
+        """
+        The statements that took the most time in total.
+        """
+        slowest = sorted(
+            self.statements.items(),
+            key=lambda item: item[1].total_time,
+            reverse=True,
+        )[:limit]
+        return [
+            {"statement": statement, **stats.to_dict()}
+            for statement, stats in slowest
+        ]
+
+    def reset(self):
+        self.statements = {}
+
+    def record(self, statement, parameters, many, duration, rows):
+        """
+        Adds a statement that took duration seconds and returned or changed rows (cursor.rowcount).
+        """
+        if not self.enabled:
+            return
+        # asyncpg reports -1 for executemany.
+        if rows < 0:
+            rows = len(parameters) if many else 0
+
+        stats = self.statements.get(statement)
+        if stats is None:
+            if len(self.statements) >= DB_PROFILE_MAX_STATEMENTS:
+                stats = StatementStats()  # Not kept.
+            else:
+                stats = self.statements[statement] = StatementStats()
+        stats.add(duration, rows)
+
+        profile = current_request.get()
+        if profile is not None:
+            profile.add(duration, rows)
+
+        if duration * 1000 >= self.slow_query_ms:
+            logger.warning(
+                "Slow query (%.1f ms, %d rows, parameters %s%s): %s",
+                duration * 1000,
+                rows,
+                parameters_shape(parameters, many),
+                (
+                    f", during {profile.method} {profile.path}"
+                    if profile is not None
+                    else ""
+                ),
+                " ".join(statement.split()),
+            )
+
+
+profiler = QueryProfiler()
@@ -0,0 +1,178 @@
+import os
+from datetime import timedelta
+from sqlalchemy import func, insert, or_, select, update
+from app.dependencies import SessionLocal
+from app.models import Recording, SignalChunk
+
+# Recordings offered in the dashboard selector, newest first.
+RECORDINGS_LISTED = int(os.getenv("RECORDINGS_LISTED", "50"))
+# Silence (seconds) between stored chunks that separates two recordings when grouping the samples stored
+# before recordings existed.
+RECORDING_GAP = float(os.getenv("RECORDING_GAP", "60"))
+
+
+class RecordingStore:
+    """
+    Keeps the recordings row of each acquisition job (app/jobs.py) in step with the job.
+    """
+
+    def __init__(self, session_factory=SessionLocal):
+        self.session_factory = session_factory
+
+    async def create(self, job):
+        """
+        Inserts the recording of a job that is starting and returns its id.
+        """
+        async with self.session_factory() as db:
+            recording = Recording(
+                user_id=job.user_id,
+                device=job.device,
+                channels=job.channels,
+                sampling_rate=job.sampling_rate,
+                start_time=job.started_at,
+                status=job.status,
+                csv_file=job.csv_file,
+            )
+            db.add(recording)
+            await db.commit()
+            return recording.id
+
+    async def finish(self, job):
+        async with self.session_factory() as db:
+            await db.execute(
+                update(Recording)
+                .where(Recording.id == job.recording_id)
+                .values(status=job.status, end_time=job.finished_at)
+            )
+            await db.commit()
+
+
+def visible_to(user_id):
+    """
+    Condition of the recordings a user may open: their own, and those without an owner (started through the
+    API or stored before recordings existed).
+    """
+    owned = Recording.user_id.is_(None)
+    if user_id is not None:
+        owned = or_(owned, Recording.user_id == user_id)
+    return owned
+
+
+def may_open(owner_id, user_id):
+    """
+    visible_to for a recording whose owner (owner_id, None without one) is known already, e.g. one being captured.
+    """
+    return owner_id is None or owner_id == user_id
+
+
+async def visible_recordings(db, user_id, limit=RECORDINGS_LISTED):
+    """
+    The latest recordings a user may open, newest first (a range scan of the (user_id, start_time) index).
+    """
+    result = await db.execute(
+        select(Recording)
+        .where(visible_to(user_id))
+        .order_by(Recording.start_time.desc(), Recording.id.desc())
+        .limit(limit)
+    )
+    return result.scalars().all()
+
+
+async def select_recording(db, user_id, recording_id=None):
+    """
+    The recording recording_id if the user may open it, else None. Without an id, the user's latest recording.
+    """
+    query = select(Recording).where(visible_to(user_id))
+    if recording_id is not None:
+        query = query.where(Recording.id == recording_id)
+    else:
+        query = query.order_by(
+            Recording.start_time.desc(), Recording.id.desc()
+        ).limit(1)
+    return (await db.execute(query)).scalar_one_or_none()
+
+
+async def recording_version(db, recording):
+    """
+    Changes whenever samples of the recording are added or removed (by the retention) or its status changes:
+    its id, status, number of chunks and the start times of its first and latest chunks.
+    """
+    chunks, first, latest = (
+        await db.execute(
+            select(
+                func.count(),
+                func.min(SignalChunk.start_time),
+                func.max(SignalChunk.start_time),
+            ).where(SignalChunk.recording_id == recording.id)
+        )
+    ).one()
+    first, latest = (
+        time.isoformat() if time is not None else ""
+        for time in (first, latest)
+    )
+    return f"{recording.id}:{recording.status}:{chunks}:{first}:{latest}"
+
+
+def group_chunks(rows, gap=RECORDING_GAP):
+    """
+    Splits (start_time, end_time, sampling_rate) chunk rows sorted by start time into the same triples for
+    recordings, breaking wherever more than gap seconds separate a chunk from the previous one.
+    """
+    groups = []
+    gap = timedelta(seconds=gap)
+    for start_time, end_time, sampling_rate in rows:
+        if groups and start_time - groups[-1][1] <= gap:
+            groups[-1][1] = max(groups[-1][1], end_time)
+        else:
+            groups.append([start_time, end_time, sampling_rate])
+    return [tuple(group) for group in groups]
+
+
+def backfill_recordings(connection, latest_csv_file=None):
+    """
+    Assigns the chunks stored without a recording to recordings without an owner, one per stretch of
+    continuous samples (sync connection, used by the migration and init_db). Only the chunks still
+    unassigned are read, so it is safe to run on every startup. The latest of these recordings gets
+    latest_csv_file, the CSV export the dashboard analyzed before recordings were stored.
+    """
+    rows = connection.execute(
+        select(
+            SignalChunk.start_time,
+            SignalChunk.end_time,
+            SignalChunk.sampling_rate,
+        )
+        .where(SignalChunk.recording_id.is_(None))
+        .order_by(SignalChunk.start_time)
+    ).all()
+    if not rows:
+        return
+
+    groups = group_chunks(rows)
+    for index, (start_time, end_time, sampling_rate) in enumerate(groups):
+        recording_id = connection.execute(
+            insert(Recording)
+            .values(
+                device="unknown",
+                channels=[2, 3],  # A3 and A4, the channels always stored.
+                sampling_rate=sampling_rate,
+                start_time=start_time,
+                end_time=end_time,
+                status="completed",
+                csv_file=(
+                    latest_csv_file if index == len(groups) - 1 else None
+                ),
+            )
+            .returning(Recording.id)
+        ).scalar_one()
+        connection.execute(
+            update(SignalChunk)
+            .where(
+                SignalChunk.recording_id.is_(None),
+                SignalChunk.start_time >= start_time,
+                SignalChunk.start_time <= end_time,
+            )
+            .values(recording_id=recording_id)
+        )
+
+
+recording_store = RecordingStore()
@@ -0,0 +1,252 @@
+import os
+import csv
+import struct
+import argparse
+import numpy as np
+
+# Columns of the CSV export (see write_csv_rows): UTC timestamp, then one column per channel.
+CSV_TIMESTAMP_COLUMN = 0
+CSV_SIGNAL_COLUMNS = (1, 2)  # EEG Signal A3, EEG Signal A4.
+CSV_HEADER = ["UTC Timestamp", "EEG Signal A3 (uV)", "EEG Signal A4 (uV)"]
+
+# Binary recording (.eegr), all little-endian:
+#   magic          8 bytes  RECORDING_MAGIC
+#   version        uint16   RECORDING_VERSION
+#   n_channels     uint16
+#   sampling_rate  float64  sample i is at start_time + i / sampling_rate
+#   start_time     int64    UTC microseconds since the epoch
+# padded with zeros to RECORDING_HEADER_SIZE, followed by float32 frames of n_channels values each (one frame
+# per sample instant, so any time window is a contiguous byte range). The number of frames is not stored: it
+# follows from the file size, so a recording is readable while it is written and after an interrupted capture.
+RECORDING_HEADER = struct.Struct("<8sHHdq")
+RECORDING_HEADER_SIZE = 64
+RECORDING_MAGIC = b"EEGREC\x00\x00"
+RECORDING_VERSION = 1
+RECORDING_SUFFIX = ".eegr"
+SAMPLE_DTYPE = np.dtype("<f4")
+
+
+def read_csv_signals(path, columns=CSV_SIGNAL_COLUMNS, start=0, count=None):
+    """
+    Loads signal columns of a CSV recording as a (channels, n) float64 array, parsed in bulk by NumPy.
+    start and count select a row range (data rows, the header excluded) without parsing the rows outside it.
+    Timestamps are not parsed, use read_csv_timestamps when they are needed.
+    """
+    return np.loadtxt(
+        path,
+        delimiter=",",
+        skiprows=1 + start,
+        max_rows=count,
+        usecols=columns,
+        ndmin=2,
+        encoding="utf-8",
+    ).T
+
+
+def read_csv_timestamps(path, start=0, count=None):
+    """
+    Loads the timestamp column of a CSV recording (same row selection as read_csv_signals) as datetime64[us].
+    """
+    return np.loadtxt(
+        path,
+        delimiter=",",
+        skiprows=1 + start,
+        max_rows=count,
+        usecols=CSV_TIMESTAMP_COLUMN,
+        dtype="datetime64[us]",
+        ndmin=1,
+        encoding="utf-8",
+    )
+
+
+def recording_path_for(csv_file):
+    """
+    Binary recording stored next to a CSV export (same name, RECORDING_SUFFIX).
+    """
+    return os.path.splitext(csv_file)[0] + RECORDING_SUFFIX
+
+
+class RecordingWriter:
+    """
+    Writes a binary recording incrementally: append each (channels, n) block as it is acquired.
+    """
+
+    def __init__(self, path, sampling_rate, n_channels, start_time):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.path = path
+        self.n_channels = n_channels
+        self.n_samples = 0
+        self._file = open(path, "wb")
+        header = RECORDING_HEADER.pack(
+            RECORDING_MAGIC,
+            RECORDING_VERSION,
+            n_channels,
+            sampling_rate,
+            np.datetime64(start_time, "us").astype(np.int64),
+        )
+        self._file.write(header.ljust(RECORDING_HEADER_SIZE, b"\x00"))
+
+    def append(self, samples):
+        samples = np.asarray(samples)
+        if samples.shape[0] != self.n_channels:
+            raise ValueError(
+                f"Expected {self.n_channels} channels, got {samples.shape[0]}."
+            )
+        self._file.write(samples.T.astype(SAMPLE_DTYPE).tobytes())
+        self.n_samples += samples.shape[1]
+
+    def flush(self):
+        self._file.flush()
+
+    def close(self):
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class Recording:
+    """
+    Binary recording opened with numpy.memmap: slicing a window only reads that part of the file.
+    """
+
+    def __init__(self, path):
+        with open(path, "rb") as file:
+            header = file.read(RECORDING_HEADER.size)
+        if len(header) < RECORDING_HEADER.size:
+            raise ValueError(f"{path} is not a recording.")
+        magic, version, n_channels, sampling_rate, start_time = (
+            RECORDING_HEADER.unpack(header)
+        )
+        if magic != RECORDING_MAGIC or version != RECORDING_VERSION:
+            raise ValueError(
+                f"{path} is not a version {RECORDING_VERSION} recording."
+            )
+
+        frame_size = n_channels * SAMPLE_DTYPE.itemsize
+        self.path = path
+        self.n_channels = n_channels
+        self.sampling_rate = sampling_rate
+        self.start_time = np.datetime64(start_time, "us")
+        self.n_samples = (
+            os.path.getsize(path) - RECORDING_HEADER_SIZE
+        ) // frame_size  # A frame still being written is left out.
+        self.frames = (
+            np.memmap(
+                path,
+                dtype=SAMPLE_DTYPE,
+                mode="r",
+                offset=RECORDING_HEADER_SIZE,
+                shape=(self.n_samples, n_channels),
+            )
+            if self.n_samples
+            else np.empty((0, n_channels), dtype=SAMPLE_DTYPE)
+        )
+
+    def __len__(self):
+        return self.n_samples
+
+    @property
+    def duration(self):
+        return self.n_samples / self.sampling_rate
+
+    def index_at(self, time):
+        """
+        Index of the first sample at or after a datetime64 (clipped to the recording).
+        """
+        offset = (
+            np.datetime64(time, "us") - self.start_time
+        ) / np.timedelta64(1, "s")
+        return int(
+            np.clip(np.ceil(offset * self.sampling_rate), 0, self.n_samples)
+        )
+
+    def samples(self, start=0, count=None):
+        """
+        (channels, count) float32 view of the samples from index start on (to the end when count is None).
+        """
+        stop = self.n_samples if count is None else start + count
+        return self.frames[start:stop].T
+
+    def timestamps(self, start=0, count=None):
+        stop = (
+            self.n_samples
+            if count is None
+            else min(start + count, self.n_samples)
+        )
+        return self.start_time + np.round(
+            np.arange(start, stop) * 1e6 / self.sampling_rate
+        ).astype("timedelta64[us]")
+
+
+def write_csv_rows(file, timestamps, samples):
+    """
+    Appends CSV rows (UTC timestamp with microseconds, then one value per channel) to an open file.
+    """
+    csv.writer(file).writerows(
+        zip(
+            (
+                timestamp.isoformat(sep=" ", timespec="microseconds")
+                for timestamp in timestamps.astype("datetime64[us]").tolist()
+            ),  # Always with microseconds, readers parse them with %f.
+            *(channel.tolist() for channel in samples),
+        )
+    )
+
+
+def recording_to_csv(path, csv_file, block_size=100_000):
+    """
+    Exports a binary recording to CSV, a block at a time so long recordings are never fully in memory.
+    """
+    recording = Recording(path)
+    os.makedirs(os.path.dirname(csv_file) or ".", exist_ok=True)
+    with open(csv_file, "w", newline="") as file:
+        csv.writer(file).writerow(CSV_HEADER)
+        for start in range(0, len(recording), block_size):
+            write_csv_rows(
+                file,
+                recording.timestamps(start, block_size),
+                recording.samples(start, block_size).astype(np.float64),
+            )
+
+
+def csv_to_recording(csv_file, path=None):
+    """
+    Converts a CSV export to a binary recording. The sampling rate is inferred from the timestamps.
+    """
+    path = path or recording_path_for(csv_file)
+    timestamps = read_csv_timestamps(csv_file)
+    samples = read_csv_signals(csv_file)
+    if len(timestamps) < 2:
+        raise ValueError(f"{csv_file} has too few samples to convert.")
+    step = np.median(np.diff(timestamps) / np.timedelta64(1, "s"))
+    with RecordingWriter(
+        path, round(1 / step, 6), samples.shape[0], timestamps[0]
+    ) as writer:
+        writer.append(samples)
+    return path
+
+
+def recording_for(csv_file):
+    """
+    Opens the binary recording of a CSV export. It is converted from the CSV when missing or older than the CSV.
+    """
+    path = recording_path_for(csv_file)
+    if not os.path.exists(path) or os.path.getmtime(path) < os.path.getmtime(
+        csv_file
+    ):
+        csv_to_recording(csv_file, path)
+    return Recording(path)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Converts CSV exports to binary recordings (python -m app.recordings file.csv ...)."
+    )
+    parser.add_argument("csv_files", nargs="+")
+    args = parser.parse_args()
+    for csv_file in args.csv_files:
+        print(f"{csv_file} -> {csv_to_recording(csv_file)}")
@@ -0,0 +1,202 @@
+import os
+from datetime import timezone
+from typing import NamedTuple
+import numpy as np
+from sqlalchemy import func, select, text
+from sqlalchemy.dialects.postgresql import insert
+from app.models import SignalChunk, SignalRollup
+
+# Bucket lengths (seconds) of the rollups, finest first. Each one is a multiple of the previous.
+ROLLUP_RESOLUTIONS = (1, 10, 60)
+# Default number of points per channel of an overview.
+OVERVIEW_MAX_POINTS = int(os.getenv("OVERVIEW_MAX_POINTS", "2000"))
+
+CHANNEL_PREFIXES = ("first", "second")
+STATISTICS = ("min", "max", "sum", "sum_squares")
+
+
+class Overview(NamedTuple):
+    """
+    Time range at one resolution (0 = raw samples): bucket start times and (channels, n) statistics per bucket.
+    """
+
+    resolution: int
+    timestamps: np.ndarray
+    minimum: np.ndarray
+    maximum: np.ndarray
+    mean: np.ndarray
+    std: np.ndarray
+
+
+def compute_rollups(timestamps, samples, resolution, recording_id):
+    """
+    Rollup rows (dicts of SignalRollup columns) of sorted timestamps (datetime64) and (2, n) samples of the
+    recording recording_id. Samples with a missing value (NaN) are left out.
+    """
+    samples = np.asarray(samples, dtype=np.float64)
+    valid = ~np.isnan(samples).any(axis=0)
+    timestamps = np.asarray(timestamps, dtype="datetime64[us]")[valid]
+    samples = samples[:, valid]
+    if len(timestamps) == 0:
+        return []
+
+    buckets = timestamps.astype(np.int64) // (resolution * 1_000_000)
+    starts = np.flatnonzero(np.diff(buckets, prepend=buckets[0] - 1))
+    counts = np.diff(np.append(starts, len(buckets)))
+    statistics = {
+        "min": np.minimum.reduceat(samples, starts, axis=1),
+        "max": np.maximum.reduceat(samples, starts, axis=1),
+        "sum": np.add.reduceat(samples, starts, axis=1),
+        "sum_squares": np.add.reduceat(samples**2, starts, axis=1),
+    }
+    bucket_starts = (buckets[starts] * resolution * 1_000_000).astype(
+        "datetime64[us]"
+    )
+
+    rows = []
+    for index, bucket_start in enumerate(bucket_starts):
+        row = {
+            "resolution": resolution,
+            "recording_id": recording_id,
+            "bucket_start": bucket_start.tolist().replace(tzinfo=timezone.utc),
+            "n_samples": int(counts[index]),
+        }
+        for channel, prefix in enumerate(CHANNEL_PREFIXES):
+            for name, values in statistics.items():
+                row[f"{prefix}_{name}"] = float(values[channel, index])
+        rows.append(row)
+    return rows
+
+
+def upsert_rollups():
+    """
+    INSERT of rollup rows merging them into existing buckets (an ingestion batch may end inside a bucket).
+    """
+    statement = insert(SignalRollup)
+    excluded = statement.excluded
+    table = SignalRollup.__table__.c
+    merged = {"n_samples": table.n_samples + excluded.n_samples}
+    for prefix in CHANNEL_PREFIXES:
+        for name, combine in (
+            ("min", func.least),
+            ("max", func.greatest),
+            ("sum", None),
+            ("sum_squares", None),
+        ):
+            column = f"{prefix}_{name}"
+            merged[column] = (
+                combine(table[column], excluded[column])
+                if combine is not None
+                else table[column] + excluded[column]
+            )
+    return statement.on_conflict_do_update(
+        index_elements=["resolution", "recording_id", "bucket_start"],
+        set_=merged,
+    )
+
+
+async def write_rollups(conn, timestamps, samples, recording_id):
+    """
+    Adds an ingested batch of (2, n) samples of the recording recording_id to the rollups of every resolution
+    (a few rows per batch), on the connection conn. Samples without a recording have no rollups.
+    """
+    if recording_id is None:
+        return
+    rows = [
+        row
+        for resolution in ROLLUP_RESOLUTIONS
+        for row in compute_rollups(
+            timestamps, samples, resolution, recording_id
+        )
+    ]
+    if rows:
+        await conn.execute(upsert_rollups(), rows)
+
+
+def backfill_rollups(connection):
+    """
+    Builds the rollups of the samples stored before they existed, per recording (sync connection, used by
+    init_db once the chunks are assigned to recordings). Does nothing once signal_rollups holds data, so it is
+    safe to run on every startup.
+    """
+    if connection.execute(
+        select(func.count()).select_from(SignalRollup)
+    ).scalar():
+        return
+    if not connection.execute(
+        select(func.count(SignalChunk.id)).where(
+            SignalChunk.recording_id.isnot(None)
+        )
+    ).scalar():
+        return
+
+    for resolution in ROLLUP_RESOLUTIONS:
+        connection.execute(
+            text(
+                """
+                INSERT INTO signal_rollups (
+                    resolution, recording_id, bucket_start, n_samples,
+                    first_min, first_max, first_sum, first_sum_squares,
+                    second_min, second_max, second_sum, second_sum_squares
+                )
+                SELECT
+                    resolution,
+                    recording_id,
+                    to_timestamp(floor(extract(epoch FROM timestamp) / resolution) * resolution) AS bucket_start,
+                    count(*),
+                    min(first_channel), max(first_channel),
+                    sum(first_channel::float8), sum(first_channel::float8 ^ 2),
+                    min(second_channel), max(second_channel),
+                    sum(second_channel::float8), sum(second_channel::float8 ^ 2)
+                FROM (
+                    SELECT
+                        c.recording_id,
+                        c.start_time + make_interval(secs => (s.i - 1) / c.sampling_rate) AS timestamp,
+                        s.first_channel,
+                        s.second_channel
+                    FROM signal_chunks AS c
+                    -- Unnesting the rows of the array is linear, unlike subscripting it per sample.
+                    CROSS JOIN LATERAL unnest(c.samples[1:1], c.samples[2:2])
+                        WITH ORDINALITY AS s(first_channel, second_channel, i)
+                    WHERE c.recording_id IS NOT NULL
+                ) AS samples, CAST(:resolution AS integer) AS resolution
+                WHERE first_channel <> 'NaN' AND second_channel <> 'NaN'
+                GROUP BY resolution, recording_id, bucket_start
+                """
+            ),
+            {"resolution": resolution},
+        )
+
+
+def pick_resolution(n_samples, covered_seconds, max_points):
+    """
+    Finest resolution whose number of buckets fits in max_points (0: the raw samples fit). Falls back to the
+    coarsest resolution.
+    """
+    if n_samples <= max_points:
+        return 0
+    for resolution in ROLLUP_RESOLUTIONS:
+        if min(n_samples, covered_seconds / resolution) <= max_points:
+            return resolution
+    return ROLLUP_RESOLUTIONS[-1]
+
+
+def rollup_statistics(rows):
+    """
+    Per-bucket (channels, n) min, max, mean and std of SignalRollup rows.
+    """
+    counts = np.maximum([row.n_samples for row in rows], 1).astype(np.float64)
+    values = {
+        name: np.array(
+            [
+                [getattr(row, f"{prefix}_{name}") for row in rows]
+                for prefix in CHANNEL_PREFIXES
+            ],
+            dtype=np.float64,
+        ).reshape(len(CHANNEL_PREFIXES), len(rows))
+        for name in STATISTICS
+    }
+    mean = values["sum"] / counts
+    variance = values["sum_squares"] / counts - mean**2
+    # Rounding can make the variance slightly negative.
+    return values["min"], values["max"], mean, np.sqrt(np.maximum(variance, 0))
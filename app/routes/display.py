@@ -1,20 +1,42 @@
 import os
+import json
 import asyncio
+import hashlib
 import logging
-import csv
 import numpy as np
 from scipy.signal import welch
-from scipy.signal import argrelextrema
-from datetime import datetime, timedelta
-from bitalino import BITalino
+from datetime import datetime
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy.future import select
-from fastapi import APIRouter, Request, Depends, HTTPException
-from fastapi.responses import RedirectResponse, HTMLResponse
+from fastapi import APIRouter, Request, Depends, HTTPException, Query
+from fastapi.responses import RedirectResponse, HTMLResponse, Response
 from fastapi.templating import Jinja2Templates
 from app.dependencies import get_db
-from app.models import SignalAmplitude
+from app.auth import current_user
 from app.socket import manager
+from app.chunks import read_samples, unpack_chunks
+from app.jobs import jobs
+from app.devices import BITALINO_ADDRESS
+from app.decimation import decimate
+from app.cache import analysis_cache
+from app.metrics import analysis_duration
+from app.features import band_powers
+from app.recordings import read_csv_signals
+from app.recording_sessions import (
+    recording_version,
+    select_recording,
+    visible_recordings,
+)
+from app.analysis import (
+    ALPHA_FREQUENCY,
+    CLOSED_EYES_THRESHOLD,
+    detect_closed_eyes_minima,
+)
+
+# Optional: the chart data is serialized with the json module without it.
+try:
+    import orjson
+except ImportError:
+    orjson = None
 
 router = APIRouter()
 templates = Jinja2Templates(directory="app/templates")
@@ -23,142 +45,142 @@ logging.basicConfig(level=logging.DEBUG)
 
 csv_path = "csv_output/eeg_data_a3_a4_utc.csv"
 
+# Upper bound of points per channel sent to the chart, whatever the length of the recording.
+DISPLAY_MAX_POINTS = int(os.getenv("DISPLAY_MAX_POINTS", "2000"))
+CHANNEL_NAMES = ("first_channel", "second_channel")
+ANALYSIS_SAMPLING_RATE = 100
+ANALYSIS_CHANNEL_LABELS = ("A3", "A4")
 
-def simps(y, x):
+
+def chart_data(timestamps, samples, max_points, method="minmax"):
     """
-    local version of simps without need for scipy.integrate
+    Decimates every channel to at most max_points, as columns: timestamps in milliseconds since the epoch
+    (int64) and float32 values.
     """
-    if len(x) < 3 or len(x) % 2 == 0:
-        raise ValueError("Simpson's rule requires an odd number of samples.")
-
-    h = (x[-1] - x[0]) / (len(x) - 1)
-    integral = y[0] + y[-1] + 4 * np.sum(y[1:-1:2]) + 2 * np.sum(y[2:-2:2])
-    return integral * h / 3
-
-
-def read_csv_for_analysis():
-    timestamps = []
-    eeg_signal_a3 = []
-    eeg_signal_a4 = []
-
-    with open(csv_path, "r", encoding="utf-8") as file:
-        reader = csv.reader(file)
-        _ = next(reader)  # To skip the header row
-
-        for row in reader:
-            raw_timestamp = datetime.strptime(row[0], "%Y-%m-%d %H:%M:%S.%f")
-            formatted_timestamp = raw_timestamp.strftime(
-                "%m/%d/%Y %I:%M:%S %p"
-            )
-            timestamps.append(formatted_timestamp)
-            eeg_signal_a3.append(float(row[1]))
-            eeg_signal_a4.append(float(row[2]))
+    return {
+        name: {
+            "timestamps": np.ascontiguousarray(
+                channel_timestamps.astype("datetime64[ms]").astype(np.int64)
+            ),
+            "values": np.ascontiguousarray(values, dtype=np.float32),
+        }
+        for name, (channel_timestamps, values) in zip(
+            CHANNEL_NAMES,
+            decimate(timestamps, samples, max_points, method),
+        )
+    }
 
-    # Convert to numpy arrays for efficient computation
-    timestamps = np.array(timestamps)
-    eeg_signal_a3 = np.array(eeg_signal_a3)
-    eeg_signal_a4 = np.array(eeg_signal_a4)
 
-    return eeg_signal_a3, eeg_signal_a4
+def encode_chart(data):
+    """
+    JSON bytes of chart_data. orjson writes the arrays directly; the json module goes through Python lists.
+    """
+    if orjson is not None:
+        return orjson.dumps(data, option=orjson.OPT_SERIALIZE_NUMPY)
+    return json.dumps(data, default=lambda array: array.tolist()).encode()
 
 
-def find_minima_around(frequencies, psd, target_freq, search_range=2):
+def chart_etag(version, *params):
     """
-    Finds two minima around the target frequency within the specified search range.
+    Weak ETag (the response may be gzipped or not) of the chart of a recording version with the given parameters.
     """
-    range_indices = (frequencies >= target_freq - search_range) & (
-        frequencies <= target_freq + search_range
-    )
-    freqs_in_range = frequencies[range_indices]
-    psd_in_range = psd[range_indices]
+    key = repr((version, *params)).encode()
+    return f'W/"{hashlib.blake2b(key, digest_size=12).hexdigest()}"'
 
-    minima_indices = argrelextrema(psd_in_range, comparator=np.less)[0]
 
-    if len(minima_indices) >= 2:
-        minima_freqs = freqs_in_range[minima_indices]
-        sorted_indices = np.argsort(np.abs(minima_freqs - target_freq))[:2]
-        return minima_freqs[sorted_indices]
-    else:
-        return np.array(
-            [target_freq - search_range, target_freq + search_range]
-        )
+def etag_matches(if_none_match, etag):
+    if not if_none_match:
+        return False
+    tags = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+    return "*" in tags or etag.removeprefix("W/") in tags
 
 
-# Function to detect closed eyes using minima-based integration. This is used below for analysis.
-def detect_closed_eyes_minima(
-    frequencies, psd, target_freq=10, threshold=0.065
+def analyze_recording(
+    path=csv_path,
+    sampling_rate=ANALYSIS_SAMPLING_RATE,
+    target_freq=ALPHA_FREQUENCY,
+    threshold=CLOSED_EYES_THRESHOLD,
 ):
+    """
+    Closed-eyes analysis and band powers of channels A3 and A4 of a recording (one 2-D Welch shared by both).
+    Results are cached until the file changes, so refreshing the dashboard does not re-read the CSV or
+    recompute the PSD.
+    """
 
-    minima_freqs = find_minima_around(frequencies, psd, target_freq)
-
-    total_power = simps(psd, frequencies)
-
-    band_indices = (frequencies >= minima_freqs[0]) & (
-        frequencies <= minima_freqs[1]
-    )
-
-    band_power = simps(psd[band_indices], frequencies[band_indices])
-
-    relative_power = band_power / total_power
-
-    if (
-        relative_power > threshold
-    ):  # Compration with threshhold. The threshhold was concluded as result of experiments.
-        return f"Warning: Closed eyes! Relative power = {relative_power:.2%}"
-    else:
-        return f"No closed eyes!. Relative power = {relative_power:.2%}"
+    @analysis_duration.time(analysis="display")
+    def compute():
+        frequencies, psd = welch(
+            read_csv_signals(path), sampling_rate, nperseg=sampling_rate
+        )
+        return {
+            "closed_eyes": detect_closed_eyes_minima(
+                frequencies, psd, target_freq=target_freq, threshold=threshold
+            ),
+            "bands": band_powers(psd, sampling_rate),
+        }
+
+    params = {
+        "sampling_rate": sampling_rate,
+        "nperseg": sampling_rate,
+        "target_freq": target_freq,
+        "threshold": threshold,
+    }
+    return analysis_cache.get_or_compute(path, params, compute)
 
 
 @router.get("/display", response_class=HTMLResponse, status_code=200)
-async def display(request: Request, db: AsyncSession = Depends(get_db)):
+async def display(
+    request: Request,
+    recording: int | None = None,
+    db: AsyncSession = Depends(get_db),
+    user=Depends(
+        current_user
+    ),  # From the signed session cookie, the users table only on a cache miss.
+):
     try:
-        user_email = request.cookies.get(
-            "user_email_temporary_session"
-        )  # Changed user_email to user_email_temporary_session to bypass the verification.
         message = request.cookies.get(
             "flash_message", ""
         )  # Default msg value ""
 
-        if not user_email:
+        if user is None:
             response = RedirectResponse(url="/")
             message = "In order to access the dashboard you need to login."
             response.set_cookie(key="flash_message", value=message, max_age=10)
             return response
 
-        result = await db.execute(  # Query the cpatured data from database.
-            select(SignalAmplitude).order_by(SignalAmplitude.timestamp)
-        )
-        signals = result.scalars().all()
-
-        # Transform the data into a JSON-serializable format
-        signal_data = [
-            {
-                "timestamp": signal.timestamp.isoformat(),
-                "first_channel": signal.first_channel,
-                "second_channel": signal.second_channel,
-            }
-            for signal in signals
-        ]
-
-        eeg_signal_a3, eeg_signal_a4 = read_csv_for_analysis()
-        sampling_rate = 100
-
-        f_a3, psd_a3 = welch(
-            eeg_signal_a3, sampling_rate, nperseg=sampling_rate
-        )
-        # f_a4, psd_a4 = welch(eeg_signal_a4, sampling_rate, nperseg=sampling_rate)
-        percentage_eyes_a3 = detect_closed_eyes_minima(
-            f_a3, psd_a3, threshold=0.065
-        )
-        # percentage_eyes_a4 = detect_closed_eyes_minima(f_a4, psd_a4, threshold=0.065)
+        # Only the selected recording of the user (their latest by default) is analyzed. The page fetches
+        # its chart from /api/chart, so the HTML does not embed the samples.
+        selected = await select_recording(db, user.id, recording)
+
+        if (
+            selected is not None
+            and selected.csv_file
+            and os.path.exists(selected.csv_file)
+        ):
+            # Read and Welch on a miss: in a worker thread, so the event loop keeps serving meanwhile.
+            analysis = await asyncio.to_thread(
+                analyze_recording, selected.csv_file
+            )
+            analysis_results = [
+                (name, result.message)
+                for name, result in zip(
+                    ANALYSIS_CHANNEL_LABELS, analysis["closed_eyes"]
+                )
+            ]
+            bands = analysis["bands"].to_dict()
+        else:
+            analysis_results, bands = [], {}
 
         return templates.TemplateResponse(
             "display.html",
             {
                 "request": request,
                 "flash_message": message,
-                "signal_data": signal_data,
-                "analysis_result": percentage_eyes_a3,
+                "analysis_results": analysis_results,
+                "channel_labels": ANALYSIS_CHANNEL_LABELS,
+                "band_powers": bands,
+                "recordings": await visible_recordings(db, user.id),
+                "selected_recording": selected,
             },
         )
     except Exception as e:
@@ -169,73 +191,73 @@ async def display(request: Request, db: AsyncSession = Depends(get_db)):
         )
 
 
-@router.post("/start-device", response_class=RedirectResponse)
-async def start_device(request: Request, db: AsyncSession = Depends(get_db)):
-    device_address = "98:D3:11:FD:1F:3A"
-    sampling_rate = 100
-    duration = 20
-    csv_folder = "csv_output"
-
-    try:
-        os.makedirs(
-            csv_folder, exist_ok=True
-        )  # Check if the output folder exists
-
-        await manager.broadcast("Acquisition started. Capturing...")
-
-        device = await asyncio.to_thread(BITalino, device_address)
-
-        eeg_channels = [2, 3]
-        await asyncio.to_thread(device.start, sampling_rate, eeg_channels)
-
-        start_time_utc = datetime.utcnow()
-
-        eeg_data_list_a3 = []
-        eeg_data_list_a4 = []
-        time_list = []
-
-        for i in range(sampling_rate * duration):
-            data = device.read(1)
-
-            eeg_signal_a3 = data[0, -2]
-            eeg_signal_a4 = data[0, -1]
-
-            current_time_utc = start_time_utc + timedelta(
-                seconds=i / sampling_rate
-            )
+@router.get("/api/chart")
+async def chart(
+    request: Request,
+    start: datetime | None = None,
+    end: datetime | None = None,
+    points: int = Query(DISPLAY_MAX_POINTS, ge=3, le=DISPLAY_MAX_POINTS),
+    method: str = Query("minmax", pattern="^(minmax|lttb)$"),
+    recording: int | None = None,
+    db: AsyncSession = Depends(get_db),
+    user=Depends(current_user),
+):
+    """
+    Chart of the dashboard (see chart_data) for a recording of the user, their latest by default. The ETag
+    follows the recording version, so a chart that did not change is answered with a 304 without reading the
+    samples.
+    """
+    if user is None:
+        raise HTTPException(status_code=401, detail="Not logged in.")
 
-            eeg_data_list_a3.append(eeg_signal_a3)
-            eeg_data_list_a4.append(eeg_signal_a4)
-            time_list.append(current_time_utc)
+    selected = await select_recording(db, user.id, recording)
+    version = (
+        await recording_version(db, selected) if selected is not None else ""
+    )
+    etag = chart_etag(version, start, end, points, method)
+    headers = {
+        "ETag": etag,
+        "Cache-Control": "private, no-cache",  # Stored, but revalidated on every load.
+    }
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+
+    if selected is not None:
+        timestamps, samples = await read_samples(
+            db, start, end, recording_id=selected.id
+        )  # Query the cpatured data from database (chunked storage) for the requested time range.
+    else:
+        timestamps, samples = unpack_chunks([])  # No recording yet.
 
-            new_signal = SignalAmplitude(  # Here each signal value in each channel is created and added to database along with the timestamp.
-                first_channel=eeg_signal_a3,
-                second_channel=eeg_signal_a4,
-                timestamp=current_time_utc,
-            )
-            db.add(new_signal)
+    # Decimated per channel so the response size stays bounded regardless of the recording length.
+    return Response(
+        encode_chart(chart_data(timestamps, samples, points, method)),
+        media_type="application/json",
+        headers=headers,
+    )
 
-        await db.commit()
 
-        device.stop()
+@router.post("/start-device", response_class=RedirectResponse)
+async def start_device(request: Request, user=Depends(current_user)):
+    device_address = BITALINO_ADDRESS  # "simulated" runs without the hardware.
+    sampling_rate = 100
+    duration = 20
+    eeg_channels = [2, 3]
 
-        # Save data to CSV
-        csv_file = os.path.join(csv_folder, "eeg_data_a3_a4_utc.csv")
-        with open(csv_file, "w", newline="") as file:
-            writer = csv.writer(file)
-            writer.writerow(
-                ["UTC Timestamp", "EEG Signal A3 (uV)", "EEG Signal A4 (uV)"]
-            )
-            for timestamp, a3, a4 in zip(
-                time_list, eeg_data_list_a3, eeg_data_list_a4
-            ):
-                writer.writerow([timestamp, a3, a4])
+    try:
+        job = jobs.submit(  # The acquisition runs as a background job (see app/jobs.py and the /jobs routes).
+            device_address,
+            eeg_channels,
+            sampling_rate,
+            duration,
+            user_id=user.id if user is not None else None,
+        )  # Each recording gets its own CSV export, analyzed when it is selected on the dashboard.
 
         await manager.broadcast(
-            "Acquisition completed! Please refresh the page."
+            "Acquisition started. Capturing...", job.user_id
         )
 
-        flash_message = f"Data saved to {csv_file}."
+        flash_message = f"Acquisition started (job {job.id}). Data will be saved to {job.csv_file}."
         response = RedirectResponse(url="/display")
         response.set_cookie("flash_message", value=flash_message, max_age=10)
 
@@ -247,14 +269,3 @@ async def start_device(request: Request, db: AsyncSession = Depends(get_db)):
             status_code=500,
             detail=f"An error occurred while capturing data: {str(e)}",
         )
-
-    finally:
-
-        if "device" in locals():
-            try:
-                await asyncio.to_thread(device.close)
-            except Exception as cleanup_error:
-                logging.error(
-                    f"Failed to close BITalino device: {cleanup_error}",
-                    exc_info=True,
-                )
@@ -0,0 +1,70 @@
+from typing import Literal
+from fastapi import APIRouter, Depends, HTTPException
+from pydantic import BaseModel, Field, model_validator
+from app.auth import require_user
+from app.jobs import jobs
+from app.devices import BITALINO_ADDRESS
+
+router = APIRouter()
+
+
+class JobRequest(
+    BaseModel
+):  # Parameters of one acquisition. The defaults are the ones /start-device uses.
+    device: str = Field(BITALINO_ADDRESS, min_length=1, max_length=100)
+    channels: list[Literal[0, 1, 2, 3, 4, 5]] = Field(
+        [2, 3], min_length=2, max_length=2
+    )  # Analog ports stored as first_channel and second_channel.
+    # Rates supported by BITalino.
+    sampling_rate: Literal[1, 10, 100, 1000] = 100
+    duration: float = Field(20, gt=0, le=24 * 3600)  # Seconds.
+
+    @model_validator(mode="after")
+    def captures_samples(self):
+        if int(self.sampling_rate * self.duration) < 1:
+            raise ValueError(
+                "sampling_rate * duration must be at least one sample."
+            )
+        return self
+
+
+def get_job_or_404(job_id: str, user):
+    job = jobs.get(job_id)
+    # The jobs of other users are reported as missing.
+    if job is None or job.user_id != user.id:
+        raise HTTPException(status_code=404, detail="Job not found.")
+    return job
+
+
+@router.post("/jobs", status_code=202)
+async def submit_job(job_request: JobRequest, user=Depends(require_user)):
+    """
+    Queues an acquisition and returns its id right away. Poll GET /jobs/{id} for progress.
+    """
+    job = jobs.submit(
+        job_request.device,
+        job_request.channels,
+        job_request.sampling_rate,
+        job_request.duration,
+        user_id=user.id,
+    )
+    return job.to_dict()
+
+
+@router.get("/jobs")
+async def list_jobs(user=Depends(require_user)):
+    return [job.to_dict() for job in jobs.list() if job.user_id == user.id]
+
+
+@router.get("/jobs/{job_id}")
+async def get_job(job_id: str, user=Depends(require_user)):
+    return get_job_or_404(job_id, user).to_dict()
+
+
+@router.delete("/jobs/{job_id}")
+async def cancel_job(job_id: str, user=Depends(require_user)):
+    """
+    Cancels a queued or running acquisition. Samples captured before the cancellation are kept.
+    """
+    get_job_or_404(job_id, user)
+    return jobs.cancel(job_id).to_dict()
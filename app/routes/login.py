@@ -6,13 +6,20 @@ from fastapi.responses import RedirectResponse, HTMLResponse
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
 from pydantic import BaseModel, EmailStr
-from werkzeug.security import check_password_hash
 from fastapi.templating import Jinja2Templates
 
 # from sendgrid import SendGridAPIClient
 # from sendgrid.helpers.mail import Mail
 from app.dependencies import get_db
 from app.models import User
+from app.auth import (
+    SESSION_COOKIE,
+    HasherBusy,
+    password_hasher,
+    read_session_token,
+    set_session_cookie,
+    user_cache,
+)
 
 
 templates = Jinja2Templates(directory="app/templates")
@@ -85,11 +92,8 @@ async def login_user(
         == "application/x-www-form-urlencoded"
     ):
 
-        user_email_exist_in_session = request.cookies.get(
-            "user_email_temporary_session"
-        )  # Changed user_email cookie to user_email_temporary_session.
         if (
-            user_email_exist_in_session
+            read_session_token(request.cookies.get(SESSION_COOKIE)) is not None
         ):  # First check to see if user is already logged in.
             response = RedirectResponse(url="/display", status_code=303)
             message = "Already logged in."
@@ -101,9 +105,9 @@ async def login_user(
             result = await db.execute(query)
             current_user = result.scalar_one_or_none()
 
-            if not current_user or not check_password_hash(
+            if not current_user or not await password_hasher.verify(
                 current_user.password, user.password
-            ):
+            ):  # Hashed in a worker thread: the event loop keeps serving the other requests meanwhile.
                 return templates.TemplateResponse(
                     "login.html",
                     {
@@ -120,11 +124,12 @@ async def login_user(
             #    16
             # )  # Generating the one-time token.
 
-            response.set_cookie(
-                key="user_email_temporary_session",
-                value=user.email,
-                max_age=120,
-            )  # This is a temporary cookie to retreive the email at verify, and only there make the real session. OTP is functional but to make things simpler for docker it is bypassed in this version
+            set_session_cookie(
+                response, current_user.id
+            )  # Signed session token (see app/auth.py). OTP is functional but to make things simpler for docker it is bypassed in this version
+            user_cache.add(
+                current_user
+            )  # The dashboard requests that follow do not query the users table.
 
             """
             response.set_cookie(  # Storing the OTP in a secure cookie.
@@ -144,6 +149,8 @@ async def login_user(
 
             return response
 
+        except HasherBusy as e:
+            raise HTTPException(status_code=503, detail=str(e))
         except Exception as e:
             raise HTTPException(
                 status_code=500,
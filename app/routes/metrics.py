@@ -0,0 +1,13 @@
+from fastapi import APIRouter
+from fastapi.responses import Response
+from app.metrics import CONTENT_TYPE, REGISTRY
+
+router = APIRouter()
+
+
+@router.get("/metrics")
+async def metrics():
+    """
+    Metrics in the Prometheus text exposition format (see app/metrics.py).
+    """
+    return Response(REGISTRY.render(), media_type=CONTENT_TYPE)
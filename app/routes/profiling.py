@@ -0,0 +1,51 @@
+from fastapi import APIRouter, Depends, HTTPException
+from pydantic import BaseModel, Field
+from app.auth import require_user
+from app.profiling import DB_PROFILE_ENDPOINT, profiler
+
+
+def endpoint_enabled():  # Hidden unless DB_PROFILE_ENDPOINT=1.
+    if not DB_PROFILE_ENDPOINT:
+        raise HTTPException(status_code=404, detail="Not Found")
+
+
+# Then only for logged-in users.
+router = APIRouter(
+    dependencies=[Depends(endpoint_enabled), Depends(require_user)]
+)
+
+
+class ProfilerSettings(BaseModel):  # Fields left out are not changed.
+    enabled: bool | None = None
+    slow_query_ms: float | None = Field(None, ge=0)
+    reset: bool = False  # Forget the statistics collected so far.
+
+
+def profiler_state():
+    return {
+        "enabled": profiler.enabled,
+        "slow_query_ms": profiler.slow_query_ms,
+        "statements": profiler.report(),
+    }
+
+
+@router.get("/debug/db-profile")
+async def get_db_profile():
+    """
+    Database statements that took the most time since startup (or the last reset).
+    """
+    return profiler_state()
+
+
+@router.post("/debug/db-profile")
+async def update_db_profile(settings: ProfilerSettings):
+    """
+    Turns the profiler on or off, changes the slow query threshold or resets the statistics, without a restart.
+    """
+    if settings.enabled is not None:
+        profiler.enabled = settings.enabled
+    if settings.slow_query_ms is not None:
+        profiler.slow_query_ms = settings.slow_query_ms
+    if settings.reset:
+        profiler.reset()
+    return profiler_state()
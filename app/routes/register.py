@@ -3,10 +3,10 @@ from fastapi.responses import RedirectResponse, HTMLResponse
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
 from pydantic import BaseModel, EmailStr
-from werkzeug.security import generate_password_hash
 from fastapi.templating import Jinja2Templates
 from app.dependencies import get_db
 from app.models import User
+from app.auth import HasherBusy, password_hasher
 
 templates = Jinja2Templates(directory="app/templates")
 router = APIRouter()
@@ -62,15 +62,6 @@ async def register_user(
         == "application/x-www-form-urlencoded"
     ):
 
-        hashed_password = generate_password_hash(user.password)
-        new_user = User(
-            first_name=user.first_name,
-            last_name=user.last_name,
-            role=user.role,
-            email=user.email,
-            password=hashed_password,
-        )
-
         try:
             query = select(User).filter(User.email == user.email)
             result = await db.execute(query)
@@ -87,6 +78,15 @@ async def register_user(
                     },
                 )
 
+            new_user = User(
+                first_name=user.first_name,
+                last_name=user.last_name,
+                role=user.role,
+                email=user.email,
+                password=await password_hasher.hash(
+                    user.password
+                ),  # In a worker thread, and only for new users.
+            )
             db.add(new_user)
             await db.commit()
 
@@ -102,6 +102,8 @@ async def register_user(
 
             return response
 
+        except HasherBusy as e:
+            raise HTTPException(status_code=503, detail=str(e))
         except Exception as e:
             await db.rollback()
             raise HTTPException(
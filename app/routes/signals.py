@@ -0,0 +1,114 @@
+from datetime import datetime
+import numpy as np
+from sqlalchemy.ext.asyncio import AsyncSession
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import Response
+from app.auth import require_user
+from app.dependencies import get_db
+from app.chunks import read_overview, read_page
+from app.recording_sessions import select_recording
+from app.rollups import OVERVIEW_MAX_POINTS
+from app.routes.display import CHANNEL_NAMES
+
+router = APIRouter()
+
+# Largest page a client may request, in samples per channel.
+SIGNALS_MAX_PAGE = 100_000
+
+
+def encode_page(timestamps, samples):
+    """
+    Binary page: n int64 timestamps (microseconds since the epoch, UTC) followed by the (channels, n) float32
+    samples, channel after channel, all little-endian.
+    """
+    return (
+        timestamps.astype("datetime64[us]").astype("<i8").tobytes()
+        + samples.astype("<f4").tobytes()
+    )
+
+
+@router.get("/api/signals")
+async def signals(
+    start: datetime | None = None,
+    end: datetime | None = None,
+    after: datetime | None = None,
+    limit: int = Query(10_000, ge=1, le=SIGNALS_MAX_PAGE),
+    format: str = Query("json", pattern="^(json|binary)$"),
+    recording: int | None = None,
+    db: AsyncSession = Depends(get_db),
+    user=Depends(require_user),
+):
+    """
+    Samples between start and end of a recording the user may open (their latest by default), one page at a
+    time. Pass the next_after of a page as `after`, with its recording, to get the next one; it is null on the
+    last page. The cursor is a time within that recording only. With format=binary the page is returned as
+    encode_page bytes, the recording and the cursor in the X-Recording and X-Next-After headers.
+    """
+    selected = await select_recording(db, user.id, recording)
+    if selected is None:
+        raise HTTPException(status_code=404, detail="Recording not found.")
+    timestamps, samples, next_after = await read_page(
+        db, start, end, after, limit, recording_id=selected.id
+    )
+    next_after = next_after.isoformat() if next_after is not None else None
+
+    if format == "binary":
+        headers = {
+            "X-Samples": str(len(timestamps)),
+            "X-Channels": str(len(samples)),
+            "X-Recording": str(selected.id),
+        }
+        if next_after is not None:
+            headers["X-Next-After"] = next_after
+        return Response(
+            encode_page(timestamps, samples),
+            media_type="application/octet-stream",
+            headers=headers,
+        )
+
+    return {
+        "timestamps": np.datetime_as_string(
+            timestamps, timezone="UTC"
+        ).tolist(),
+        **{
+            name: channel.tolist()
+            for name, channel in zip(CHANNEL_NAMES, samples)
+        },
+        "recording": selected.id,
+        "next_after": next_after,
+    }
+
+
+@router.get("/api/signals/overview")
+async def signals_overview(
+    start: datetime | None = None,
+    end: datetime | None = None,
+    points: int = Query(OVERVIEW_MAX_POINTS, ge=10, le=SIGNALS_MAX_PAGE),
+    recording: int | None = None,
+    db: AsyncSession = Depends(get_db),
+    user=Depends(require_user),
+):
+    """
+    The time range of a recording the user may open (their latest by default) in about `points` points per
+    channel: the raw samples if they fit, else the min, max, mean and std of buckets of `resolution` seconds
+    (from the rollup tables).
+    """
+    selected = await select_recording(db, user.id, recording)
+    if selected is None:
+        raise HTTPException(status_code=404, detail="Recording not found.")
+    overview = await read_overview(db, selected.id, start, end, points)
+    return {
+        "resolution": overview.resolution,
+        "timestamps": np.datetime_as_string(
+            overview.timestamps, timezone="UTC"
+        ).tolist(),
+        **{
+            name: {
+                "min": overview.minimum[channel].tolist(),
+                "max": overview.maximum[channel].tolist(),
+                "mean": overview.mean[channel].tolist(),
+                "std": overview.std[channel].tolist(),
+            }
+            for channel, name in enumerate(CHANNEL_NAMES)
+        },
+    }
@@ -0,0 +1,83 @@
+import asyncio
+import numpy as np
+from sqlalchemy.ext.asyncio import AsyncSession
+from fastapi import APIRouter, Depends, HTTPException, Query
+from app.analysis import (
+    CLOSED_EYES_THRESHOLD,
+    TIMELINE_HOP,
+    TIMELINE_WINDOW,
+    closed_eyes_timeline,
+)
+from app.auth import require_user
+from app.cache import analysis_cache
+from app.dependencies import get_db
+from app.metrics import analysis_duration
+from app.recording_sessions import select_recording
+from app.recordings import recording_for
+from app.routes.display import CHANNEL_NAMES
+
+router = APIRouter()
+
+
+def recording_timeline(csv_file, window, hop):
+    """
+    Closed-eyes timeline of a recording (read through its memory-mapped binary file), cached until it changes.
+    """
+    recording = recording_for(csv_file)
+
+    @analysis_duration.time(analysis="timeline")
+    def compute():
+        offsets, relative_power, closed = closed_eyes_timeline(
+            recording.samples(), recording.sampling_rate, window, hop
+        )
+        times = recording.start_time + np.round(offsets * 1e6).astype(
+            "timedelta64[us]"
+        )
+        return {
+            "start_time": np.datetime_as_string(
+                recording.start_time, timezone="UTC"
+            ),
+            "sampling_rate": recording.sampling_rate,
+            "window": window,
+            "threshold": CLOSED_EYES_THRESHOLD,
+            "hop": float(offsets[1] - offsets[0]) if len(offsets) > 1 else hop,
+            "times": np.datetime_as_string(times, timezone="UTC").tolist(),
+            "channels": {
+                name: {
+                    "relative_power": power.tolist(),
+                    "closed_eyes": labels.tolist(),
+                }
+                for name, power, labels in zip(
+                    CHANNEL_NAMES, relative_power, closed
+                )
+            },
+        }
+
+    return analysis_cache.get_or_compute(
+        recording.path,
+        {"timeline": True, "window": window, "hop": hop},
+        compute,
+    )
+
+
+@router.get("/timeline")
+async def timeline(
+    window: float = Query(TIMELINE_WINDOW, ge=1, le=3600),
+    hop: float = Query(TIMELINE_HOP, ge=0.5, le=3600),
+    recording: int | None = None,
+    db: AsyncSession = Depends(get_db),
+    user=Depends(require_user),
+):
+    """
+    Relative alpha power and closed-eyes label of every window of a recording the user may open (by default
+    their latest), per channel.
+    """
+    selected = await select_recording(db, user.id, recording)
+    if selected is None or selected.csv_file is None:
+        raise HTTPException(status_code=404, detail="No such recording.")
+    try:
+        return await asyncio.to_thread(
+            recording_timeline, selected.csv_file, window, hop
+        )
+    except FileNotFoundError:
+        raise HTTPException(status_code=404, detail="No recording yet.")
@@ -1,33 +1,255 @@
-from fastapi import WebSocket, WebSocketDisconnect, APIRouter
+import os
+import json
+import time
+import asyncio
+import logging
+from fastapi import WebSocket, WebSocketDisconnect, APIRouter, status
+from app.auth import websocket_user
+from app.recording_sessions import may_open
+from app.streaming import encode_block
+from app.metrics import (
+    Gauge,
+    websocket_dropped_messages,
+    websocket_send_duration,
+)
+from app.broadcast import BLOCK, MESSAGE, InProcessBroadcast, create_backend
 
 router = APIRouter()
 
+# Messages waiting per client. A client whose queue is full is a slow consumer and is handled by WS_SLOW_CLIENT_POLICY:
+# "drop_oldest" discards its oldest pending message, "disconnect" closes its connection.
+WS_SEND_QUEUE_SIZE = int(os.getenv("WS_SEND_QUEUE_SIZE", "100"))
+WS_SLOW_CLIENT_POLICY = os.getenv("WS_SLOW_CLIENT_POLICY", "drop_oldest")
+WS_SEND_TIMEOUT = float(
+    os.getenv("WS_SEND_TIMEOUT", "10")
+)  # Seconds a single send may take before the client is considered dead.
+
+
+class ClientConnection:  # A connected websocket with its own send queue, drained by its own sender task.
+    def __init__(self, websocket: WebSocket, queue_size: int, user_id=None):
+        self.websocket = websocket
+        self.user_id = user_id  # Logged-in user, who only receives the broadcasts of recordings they may open.
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+        self.sender: asyncio.Task | None = None
+        self.sent = 0
+        self.dropped = 0
+        self.streaming = (
+            False  # Subscribed to binary sample frames (see app/streaming.py).
+        )
+        self.max_rate = None  # Per-client decimation of the streamed samples (None = full rate).
+
 
 # WebSocket manager for tracking connected clients. This is only used to dynamically display messages in display route via the broudcast method see (display.py)
 class ConnectionManager:
-    def __init__(self):
-        self.active_connections: list[WebSocket] = []
+    def __init__(
+        self,
+        queue_size=WS_SEND_QUEUE_SIZE,
+        slow_client_policy=WS_SLOW_CLIENT_POLICY,
+        send_timeout=WS_SEND_TIMEOUT,
+        backend=None,
+    ):
+        if slow_client_policy not in ("drop_oldest", "disconnect"):
+            raise ValueError(
+                f"Unknown slow client policy {slow_client_policy!r}."
+            )
 
-    async def connect(self, websocket: WebSocket):
+        self.queue_size = queue_size
+        self.slow_client_policy = slow_client_policy
+        self.send_timeout = send_timeout
+        self.backend = (
+            backend or InProcessBroadcast()
+        )  # Relays broadcasts to the clients of other workers (see app/broadcast.py).
+        self.active_connections: dict[WebSocket, ClientConnection] = {}
+        self.dropped_messages = 0
+        self.disconnected_clients = 0
+        self._closing: set[asyncio.Task] = set()
+
+    async def connect(self, websocket: WebSocket, user_id):
         await websocket.accept()
-        self.active_connections.append(websocket)
+        self.register(websocket, user_id)
+
+    def register(self, websocket: WebSocket, user_id=None):
+        client = ClientConnection(websocket, self.queue_size, user_id)
+        client.sender = asyncio.create_task(self._send_loop(client))
+        self.active_connections[websocket] = client
+        return client
 
     def disconnect(self, websocket: WebSocket):
-        self.active_connections.remove(websocket)
+        client = self.active_connections.pop(websocket, None)
+        if client is not None and client.sender is not asyncio.current_task():
+            client.sender.cancel()
+        return client
+
+    async def start(self):
+        await self.backend.start(self.deliver)
+
+    async def stop(self):
+        await self.backend.stop()
+
+    async def broadcast(self, message: str | bytes, owner_id=None):
+        """
+        Queues the message for every client (of every worker when a shared backend is configured) and returns
+        without waiting for any send, so one slow or dead client never delays the others. A message about a
+        recording of owner_id only goes to the clients allowed to open it (see may_open).
+        """
+        self.deliver(MESSAGE, message, owner_id)
+        await self.backend.publish(MESSAGE, message, owner_id)
+
+    async def broadcast_block(self, block, owner_id=None):
+        """
+        Sends an acquired SampleBlock as a binary frame to the streaming subscribers allowed to open its recording,
+        owned by owner_id.
+        """
+        self.deliver(BLOCK, block, owner_id)
+        await self.backend.publish(BLOCK, block, owner_id)
+
+    def deliver(self, kind, payload, owner_id=None):
+        """
+        Queues a broadcast for the clients connected to this process. Blocks are encoded once
+        per distinct decimation setting and shared by the clients using it.
+        """
+        clients = [
+            client
+            for client in self.active_connections.values()
+            if may_open(owner_id, client.user_id)
+        ]
+        if kind == MESSAGE:
+            for client in clients:
+                self._enqueue(client, payload)
+            return
+
+        frames = {}
+        for client in clients:
+            if not client.streaming:
+                continue
+            if client.max_rate not in frames:
+                frames[client.max_rate] = encode_block(
+                    payload, client.max_rate
+                )
+            self._enqueue(client, frames[client.max_rate])
+
+    def handle_message(self, websocket: WebSocket, message: str):
+        """
+        Handles a text message from a client. Clients opt in to sample streaming with
+        {"action": "subscribe", "max_rate": 25} (max_rate optional, in Hz) and out with {"action": "unsubscribe"}.
+        """
+        client = self.active_connections.get(websocket)
+        try:
+            request = json.loads(message)
+        except ValueError:
+            return
+        if client is None or not isinstance(request, dict):
+            return
 
-    async def broadcast(self, message: str):
-        for connection in self.active_connections:
-            await connection.send_text(message)
+        if request.get("action") == "subscribe":
+            max_rate = request.get("max_rate")
+            client.streaming = True
+            client.max_rate = (
+                float(max_rate)
+                if isinstance(max_rate, (int, float)) and max_rate > 0
+                else None
+            )
+        elif request.get("action") == "unsubscribe":
+            client.streaming = False
 
+    def stats(self):
+        depths = [
+            client.queue.qsize() for client in self.active_connections.values()
+        ]
+        return {
+            "connections": len(depths),
+            "streaming_clients": sum(
+                client.streaming for client in self.active_connections.values()
+            ),
+            "queue_depth_total": sum(depths),
+            "queue_depth_max": max(depths, default=0),
+            "dropped_messages": self.dropped_messages,
+            "disconnected_clients": self.disconnected_clients,
+        }
 
-manager = ConnectionManager()
+    def _enqueue(self, client: ClientConnection, message):
+        try:
+            client.queue.put_nowait(message)
+            return
+        except asyncio.QueueFull:
+            pass
+
+        if self.slow_client_policy == "disconnect":
+            self._drop_client(client, reason="send queue full")
+            return
+
+        client.queue.get_nowait()  # Discard the oldest message to make room for the newest one.
+        client.dropped += 1
+        self.dropped_messages += 1
+        websocket_dropped_messages.inc()
+        client.queue.put_nowait(message)
+
+    def _drop_client(self, client: ClientConnection, reason: str):
+        if self.disconnect(client.websocket) is None:
+            return
+        self.disconnected_clients += 1
+        logging.warning(f"Disconnecting websocket client: {reason}.")
+        task = asyncio.create_task(self._close(client.websocket))
+        self._closing.add(task)
+        task.add_done_callback(self._closing.discard)
+
+    async def _close(self, websocket: WebSocket):
+        try:
+            await asyncio.wait_for(websocket.close(), self.send_timeout)
+        except Exception:
+            pass  # The client is gone already.
+
+    async def _send_loop(self, client: ClientConnection):
+        while True:
+            message = await client.queue.get()
+            try:
+                started = time.perf_counter()
+                async with asyncio.timeout(self.send_timeout):
+                    if isinstance(message, bytes):
+                        await client.websocket.send_bytes(message)
+                    else:
+                        await client.websocket.send_text(message)
+                websocket_send_duration.observe(time.perf_counter() - started)
+                client.sent += 1
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self._drop_client(client, reason=f"send failed ({e!r})")
+                return
+
+
+manager = ConnectionManager(backend=create_backend())
+
+# Read when /metrics is scraped.
+Gauge(
+    "websocket_clients",
+    "Connected websocket clients.",
+    function=lambda: len(manager.active_connections),
+)
 
 
 @router.websocket("/ws")
 async def websocket_endpoint(websocket: WebSocket):
-    await manager.connect(websocket)
+    user = await websocket_user(websocket)
+    if user is None:
+        # Refused during the handshake (HTTP 403): the broadcasts are about the recordings of logged-in users.
+        await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
+        return
+    await manager.connect(websocket, user.id)
     try:
         while True:
-            await websocket.receive_text()
+            manager.handle_message(websocket, await websocket.receive_text())
     except WebSocketDisconnect:
-        manager.disconnect(websocket)
+        pass
+    finally:
+        manager.disconnect(
+            websocket
+        )  # Also reached when the manager closed a slow client itself.
+
+
+@router.get("/ws/stats")
+async def websocket_stats():
+    """
+    Connected clients and the depth of their send queues.
+    """
+    return manager.stats()
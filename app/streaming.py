@@ -0,0 +1,123 @@
+import struct
+from typing import NamedTuple
+import numpy as np
+from app.chunks import sample_offsets
+
+
+class SampleBlock(NamedTuple):
+    """
+    Consecutive samples read from the device: sequence is the index of the block within the acquisition,
+    start_time the UTC timestamp of its first sample and samples a (channels, n) array of the analog channels.
+    recording_id is the recording the samples are stored in (None when they are not stored).
+    """
+
+    sequence: int
+    start_time: np.datetime64
+    sampling_rate: float
+    samples: np.ndarray
+    recording_id: int | None = None
+
+    def timestamps(self):
+        return self.start_time + sample_offsets(
+            self.sampling_rate, self.samples.shape[1]
+        )
+
+
+# Binary sample frame pushed to /ws subscribers (all little-endian):
+#   version      uint8    FRAME_VERSION
+#   flags        uint8    FLAG_DECIMATED when the samples were averaged down for this subscriber
+#   n_channels   uint16
+#   recording    uint32   id of the recording the samples belong to (0 when they are not stored)
+#   sequence     uint32   block index within the acquisition (gaps mean dropped frames)
+#   start_time   float64  UTC epoch seconds of the first sample
+#   rate         float32  sampling rate of the samples in this frame, sample i is at start_time + i / rate
+#   n_samples    uint32
+# followed by n_channels * n_samples float32 values, channel after channel.
+FRAME_HEADER = struct.Struct("<BBHIIdfI")
+FRAME_VERSION = 2
+FLAG_DECIMATED = 1
+
+
+def decimation_factor(sampling_rate, max_rate):
+    """
+    Number of consecutive samples averaged into one so the stream stays at or below max_rate (None keeps every sample).
+    """
+    if not max_rate or max_rate >= sampling_rate:
+        return 1
+    return int(np.ceil(sampling_rate / max_rate))
+
+
+def decimate_block(samples, factor):
+    """
+    Averages every `factor` consecutive samples of a (channels, n) block. A shorter last group is averaged as well.
+    """
+    if factor <= 1:
+        return samples
+    n_groups = -(-samples.shape[1] // factor)  # Ceiling division.
+    starts = np.arange(n_groups) * factor
+    counts = np.diff(np.append(starts, samples.shape[1]))
+    return np.add.reduceat(samples, starts, axis=1) / counts
+
+
+def encode_block(block, max_rate=None):
+    """
+    Encodes an acquisition SampleBlock as a binary frame, optionally decimated to max_rate.
+    """
+    factor = decimation_factor(block.sampling_rate, max_rate)
+    samples = np.ascontiguousarray(
+        decimate_block(block.samples, factor), dtype="<f4"
+    )
+    header = FRAME_HEADER.pack(
+        FRAME_VERSION,
+        FLAG_DECIMATED if factor > 1 else 0,
+        samples.shape[0],
+        block.recording_id or 0,
+        block.sequence & 0xFFFFFFFF,
+        block.start_time.astype("datetime64[us]").astype(np.int64) / 1e6,
+        block.sampling_rate / factor,
+        samples.shape[1],
+    )
+    return header + samples.tobytes()
+
+
+def decode_frame(frame):
+    """
+    Inverse of encode_block: returns the header fields as a dict and the (channels, n) float32 samples.
+    """
+    (
+        version,
+        flags,
+        n_channels,
+        recording_id,
+        sequence,
+        start_time,
+        rate,
+        n_samples,
+    ) = FRAME_HEADER.unpack_from(frame)
+    if version != FRAME_VERSION:
+        raise ValueError(f"Unsupported frame version {version}.")
+    samples = np.frombuffer(
+        frame, dtype="<f4", offset=FRAME_HEADER.size
+    ).reshape(n_channels, n_samples)
+    header = {
+        "flags": flags,
+        "recording_id": recording_id or None,
+        "sequence": sequence,
+        "start_time": start_time,
+        "sampling_rate": rate,
+    }
+    return header, samples
+
+
+def decode_block(frame):
+    """
+    Rebuilds the SampleBlock of a frame (used to hand blocks to other workers, see app/broadcast.py).
+    """
+    header, samples = decode_frame(frame)
+    return SampleBlock(
+        header["sequence"],
+        np.datetime64(round(header["start_time"] * 1e6), "us"),
+        header["sampling_rate"],
+        samples.astype(np.float64),
+        header["recording_id"],
+    )
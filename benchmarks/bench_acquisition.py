@@ -0,0 +1,144 @@
+# Load test of the whole acquisition pipeline with the simulated BITalino (app/devices.py) read as fast as possible:
+# device thread -> COPY into signal_chunks (and the rollups) and the binary recording -> online detector -> websocket
+# broadcast to simulated clients -> CSV export. Reports the throughput relative to real time.
+# Needs the database from .env (use --no-db to discard the samples instead). Run from the repository root:
+#   python -m benchmarks.bench_acquisition --seconds 60 --clients 20
+
+import argparse
+import asyncio
+import tempfile
+import time
+from datetime import datetime, timezone
+from sqlalchemy import delete
+import app.acquisition
+from app.acquisition import AcquisitionWorker, capture
+from app.dependencies import SessionLocal, engine
+from app.devices import open_device
+from app.models import Base, Recording
+from app.socket import manager
+
+
+class SimulatedClient:  # Counts what a websocket client would receive.
+    def __init__(self):
+        self.messages = 0
+        self.bytes = 0
+
+    async def send_text(self, message):
+        self.messages += 1
+        self.bytes += len(message)
+
+    async def send_bytes(self, message):
+        await self.send_text(message)
+
+    async def close(self):
+        pass
+
+
+class DiscardingWriter:  # Stands in for ChunkWriter with --no-db.
+    def __init__(self, sampling_rate, recording_id=None):
+        pass
+
+    async def __call__(self, timestamps, first_channel, second_channel):
+        pass
+
+
+async def create_benchmark_recording(args):
+    async with SessionLocal() as db:
+        recording = Recording(
+            device="simulated",
+            channels=list(range(args.channels)),
+            sampling_rate=args.rate,
+            start_time=datetime.now(timezone.utc),
+            status="running",
+        )
+        db.add(recording)
+        await db.commit()
+        return recording.id
+
+
+async def remove_benchmark_recording(recording_id):
+    async with SessionLocal() as db:
+        # Its chunks and rollups go with it.
+        await db.execute(delete(Recording).where(Recording.id == recording_id))
+        await db.commit()
+
+
+async def main(args):
+    if args.no_db:
+        app.acquisition.ChunkWriter = DiscardingWriter
+    else:
+        engine.echo = False  # Statement logging would dominate the timings.
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+    recording_id = (
+        None if args.no_db else await create_benchmark_recording(args)
+    )
+
+    clients = [SimulatedClient() for _ in range(args.clients)]
+    for index, client in enumerate(clients):
+        manager.register(client)
+        # Half of the dashboards stream at full rate, the others decimated.
+        manager.handle_message(
+            client,
+            (
+                '{"action": "subscribe"}'
+                if index % 2 == 0
+                else '{"action": "subscribe", "max_rate": 25}'
+            ),
+        )
+
+    worker = AcquisitionWorker(
+        lambda: open_device(
+            f"simulated?realtime=0&drop_rate={args.drop_rate}"
+        ),
+        args.rate,
+        list(range(args.channels)),
+        args.seconds,
+    )
+    try:
+        with tempfile.TemporaryDirectory() as folder:
+            started = time.perf_counter()
+            worker.start()
+            await capture(worker, f"{folder}/load_test.csv", recording_id)
+            elapsed = time.perf_counter() - started
+        # Let the sender tasks drain the queues.
+        while any(
+            not connection.queue.empty()
+            for connection in manager.active_connections.values()
+        ):
+            await asyncio.sleep(0.01)
+    finally:
+        for client in clients:
+            manager.disconnect(client)
+        if not args.no_db:
+            await remove_benchmark_recording(recording_id)
+            await engine.dispose()
+
+    frames = worker.samples_captured
+    print(
+        f"{frames} frames x {args.channels} channels at {args.rate} Hz "
+        f"({args.seconds} s of signal) in {elapsed:.2f} s"
+    )
+    print(
+        f"throughput: {frames / elapsed:,.0f} frames/s, "
+        f"{frames * args.channels / elapsed:,.0f} samples/s, "
+        f"{args.seconds / elapsed:.1f}x real time"
+    )
+    print(
+        f"websocket: {sum(client.messages for client in clients)} messages, "
+        f"{sum(client.bytes for client in clients) / 1e6:.1f} MB to "
+        f"{len(clients)} clients, {manager.dropped_messages} dropped"
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Acquisition pipeline throughput with a simulated device."
+    )
+    parser.add_argument("--seconds", type=float, default=60)
+    parser.add_argument("--rate", type=int, default=1000)
+    parser.add_argument("--channels", type=int, default=6)
+    parser.add_argument("--clients", type=int, default=10)
+    parser.add_argument("--drop-rate", type=float, default=0.0)
+    parser.add_argument("--no-db", action="store_true")
+    asyncio.run(main(parser.parse_args()))
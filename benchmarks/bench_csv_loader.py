@@ -0,0 +1,89 @@
+# Compares the old row-by-row CSV parsing (strptime/strftime per row) with the NumPy loader in app/recordings.py
+# on a synthetic recording. Run from the repository root: python -m benchmarks.bench_csv_loader --hours 1
+
+import os
+import csv
+import argparse
+import tempfile
+import time
+from datetime import datetime
+import numpy as np
+from app.acquisition import write_csv
+from app.recordings import read_csv_signals, read_csv_timestamps
+
+
+def write_synthetic_recording(path, hours, sampling_rate):
+    rows = int(hours * 3600 * sampling_rate)
+    timestamps = np.datetime64("2025-01-20T10:00:00.071187", "us") + (
+        np.arange(rows) * (1_000_000 // sampling_rate)
+    ).astype("timedelta64[us]")
+    rng = np.random.default_rng(0)
+    write_csv(
+        path,
+        timestamps,
+        rng.integers(0, 1024, rows).astype(np.float64),
+        rng.integers(0, 1024, rows).astype(np.float64),
+    )
+    return rows
+
+
+def legacy_loader(path):  # read_csv_for_analysis before the NumPy loader.
+    timestamps = []
+    eeg_signal_a3 = []
+    eeg_signal_a4 = []
+    with open(path, "r", encoding="utf-8") as file:
+        reader = csv.reader(file)
+        _ = next(reader)
+        for row in reader:
+            raw_timestamp = datetime.strptime(row[0], "%Y-%m-%d %H:%M:%S.%f")
+            timestamps.append(raw_timestamp.strftime("%m/%d/%Y %I:%M:%S %p"))
+            eeg_signal_a3.append(float(row[1]))
+            eeg_signal_a4.append(float(row[2]))
+    return np.array(eeg_signal_a3), np.array(eeg_signal_a4)
+
+
+def timed(function, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main(hours, sampling_rate, repeat):
+    with tempfile.TemporaryDirectory() as folder:
+        path = os.path.join(folder, "recording.csv")
+        rows = write_synthetic_recording(path, hours, sampling_rate)
+        print(f"{rows} rows, {os.path.getsize(path) / 1e6:.1f} MB")
+
+        one_minute = 60 * sampling_rate
+        cases = (
+            ("legacy", lambda: legacy_loader(path)),
+            ("signals", lambda: read_csv_signals(path)),
+            (
+                "signals+timestamps",
+                lambda: (read_csv_signals(path), read_csv_timestamps(path)),
+            ),
+            ("one channel", lambda: read_csv_signals(path, columns=(1,))),
+            ("first minute", lambda: read_csv_signals(path, count=one_minute)),
+        )
+        results = {}
+        for name, function in cases:
+            results[name] = timed(function, repeat)
+            print(
+                f"{name:>20}: {results[name]:8.3f} s  {rows / results[name]:12.0f} rows/s"
+            )
+
+    print(f"speedup (signals): {results['legacy'] / results['signals']:.1f}x")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Row-by-row vs NumPy CSV loading."
+    )
+    parser.add_argument("--hours", type=float, default=1)
+    parser.add_argument("--sampling-rate", type=int, default=100)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+    main(args.hours, args.sampling_rate, args.repeat)
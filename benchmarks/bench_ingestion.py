@@ -0,0 +1,95 @@
+# Compares rows/sec of the old per-sample ORM inserts against the batched COPY ingestion (app/ingestion.py).
+# Needs the database from .env. Run from the repository root: python -m benchmarks.bench_ingestion --rows 20000
+
+import argparse
+import asyncio
+import time
+import numpy as np
+from sqlalchemy import delete
+from app.dependencies import engine, SessionLocal
+from app.models import Base, SignalAmplitude
+from app.ingestion import SampleIngestor
+
+# Benchmark rows are written far in the past so they can be told apart from real recordings and removed afterwards.
+BENCHMARK_START = np.datetime64("1970-01-01T00:00:00", "us")
+BENCHMARK_END = np.datetime64("1970-02-01T00:00:00", "us")
+
+
+def synthetic_samples(rows, sampling_rate=100):
+    timestamps = BENCHMARK_START + (
+        np.arange(rows) * (1_000_000 // sampling_rate)
+    ).astype("timedelta64[us]")
+    rng = np.random.default_rng(0)
+    return (
+        timestamps,
+        rng.integers(0, 1024, rows).astype(np.float64),
+        rng.integers(0, 1024, rows).astype(np.float64),
+    )
+
+
+async def orm_insert(timestamps, first_channel, second_channel):
+    async with SessionLocal() as db:
+        for timestamp, a3, a4 in zip(
+            timestamps.tolist(), first_channel, second_channel
+        ):
+            db.add(
+                SignalAmplitude(
+                    first_channel=a3, second_channel=a4, timestamp=timestamp
+                )
+            )
+        await db.commit()
+
+
+async def copy_insert(timestamps, first_channel, second_channel, batch_size):
+    async with SampleIngestor(
+        batch_size=batch_size, flush_interval=3600
+    ) as ingestor:
+        await ingestor.add(timestamps, first_channel, second_channel)
+
+
+async def remove_benchmark_rows():
+    async with SessionLocal() as db:
+        await db.execute(
+            delete(SignalAmplitude).where(
+                SignalAmplitude.timestamp >= BENCHMARK_START.tolist(),
+                SignalAmplitude.timestamp < BENCHMARK_END.tolist(),
+            )
+        )
+        await db.commit()
+
+
+async def main(rows, batch_size):
+    engine.echo = False  # Statement logging would dominate the ORM timings.
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+
+    samples = synthetic_samples(rows)
+    results = {}
+    try:
+        for name, insert in (
+            ("orm", orm_insert),
+            ("copy", lambda *s: copy_insert(*s, batch_size)),
+        ):
+            start = time.perf_counter()
+            await insert(*samples)
+            elapsed = time.perf_counter() - start
+            results[name] = rows / elapsed
+            print(
+                f"{name:>5}: {elapsed:8.3f} s  {rows / elapsed:12.0f} rows/s"
+            )
+            await remove_benchmark_rows()
+    finally:
+        await remove_benchmark_rows()
+        await engine.dispose()
+
+    print(f"speedup: {results['copy'] / results['orm']:.1f}x")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="ORM vs COPY ingestion throughput."
+    )
+    parser.add_argument("--rows", type=int, default=20_000)
+    parser.add_argument("--batch-size", type=int, default=1000)
+    args = parser.parse_args()
+    asyncio.run(main(args.rows, args.batch_size))
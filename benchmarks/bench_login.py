@@ -0,0 +1,138 @@
+# Load test of concurrent logins: POST / with the credentials of a test user from many clients at once while a
+# probe requests /health_check every few milliseconds. The probe latency shows how long the event loop is held,
+# --inline hashes on the event loop as the login did before app/auth.py for comparison.
+# Needs the database from .env. Run from the repository root:
+#   python -m benchmarks.bench_login --logins 64 --concurrency 16
+#   python -m benchmarks.bench_login --logins 64 --concurrency 16 --inline
+
+import argparse
+import asyncio
+import statistics
+import time
+from sqlalchemy import delete
+from httpx import ASGITransport, AsyncClient
+from werkzeug.security import check_password_hash, generate_password_hash
+from app.auth import SESSION_COOKIE, password_hasher
+from app.dependencies import SessionLocal, engine
+from app.models import Base, User
+
+LOGIN_USER = "login-bench@example.com"
+LOGIN_PASSWORD = "login-bench-password"
+PROBE_INTERVAL = 0.005  # Seconds.
+
+
+async def inline_verify(password_hash, password):
+    return check_password_hash(password_hash, password)
+
+
+async def remove_login_user():
+    async with SessionLocal() as db:
+        await db.execute(delete(User).where(User.email == LOGIN_USER))
+        await db.commit()
+
+
+async def create_login_user():
+    await remove_login_user()
+    async with SessionLocal() as db:
+        db.add(
+            User(
+                first_name="Login",
+                last_name="Bench",
+                role="bench",
+                email=LOGIN_USER,
+                password=generate_password_hash(LOGIN_PASSWORD),
+            )
+        )
+        await db.commit()
+
+
+def percentile(values, fraction):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(fraction * len(values)))]
+
+
+async def main(args):
+    from app.main import app
+
+    if args.inline:
+        password_hasher.verify = inline_verify
+    engine.echo = False  # Statement logging would dominate the timings.
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    await create_login_user()
+
+    transport = ASGITransport(app=app)
+    logins, probes, failures = [], [], 0
+    remaining = iter(range(args.logins))
+
+    async def login():
+        # A client per login, so no session cookie is sent back.
+        async with AsyncClient(
+            transport=transport, base_url="http://test"
+        ) as client:
+            started = time.perf_counter()
+            response = await client.post(
+                "/", data={"email": LOGIN_USER, "password": LOGIN_PASSWORD}
+            )
+            logins.append(time.perf_counter() - started)
+            return SESSION_COOKIE in response.cookies
+
+    async def login_client():
+        nonlocal failures
+        for _ in remaining:
+            if not await login():
+                failures += 1
+
+    async def probe(done):
+        async with AsyncClient(
+            transport=transport, base_url="http://test"
+        ) as client:
+            while not done.is_set():
+                started = time.perf_counter()
+                (await client.get("/health_check")).raise_for_status()
+                probes.append(time.perf_counter() - started)
+                await asyncio.sleep(PROBE_INTERVAL)
+
+    done = asyncio.Event()
+    try:
+        prober = asyncio.create_task(probe(done))
+        started = time.perf_counter()
+        await asyncio.gather(
+            *(login_client() for _ in range(args.concurrency))
+        )
+        elapsed = time.perf_counter() - started
+        done.set()
+        await prober
+    finally:
+        await remove_login_user()
+        await engine.dispose()
+
+    print(
+        f"{len(logins)} logins ({failures} failed) by {args.concurrency} "
+        f"clients in {elapsed:.2f} s: {len(logins) / elapsed:.1f} logins/s, "
+        f"hashing {'on the event loop' if args.inline else 'in the pool'}"
+    )
+    print(
+        f"login latency: median {statistics.median(logins) * 1000:.1f} ms, "
+        f"p99 {percentile(logins, 0.99) * 1000:.1f} ms"
+    )
+    print(
+        f"/health_check during the logins ({len(probes)} probes): median "
+        f"{statistics.median(probes) * 1000:.1f} ms, p99 "
+        f"{percentile(probes, 0.99) * 1000:.1f} ms, max "
+        f"{max(probes) * 1000:.1f} ms"
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Event loop responsiveness under concurrent logins."
+    )
+    parser.add_argument("--logins", type=int, default=64)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument(
+        "--inline",
+        action="store_true",
+        help="Check the passwords on the event loop instead of the pool.",
+    )
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,320 @@
+# Benchmark suite of the signal-analysis hot paths and the /display handler on synthetic EEG of several sizes.
+# Records the best and median time per call and the peak traced memory of every case to JSON, and compares them with a
+# previous run. Run from the repository root:
+#   python -m benchmarks.bench_suite --output bench.json --compare benchmarks/baseline.json
+# The /display case needs the database from .env (skip it with --no-db).
+
+import os
+import sys
+import json
+import time
+import argparse
+import asyncio
+import platform
+import statistics
+import subprocess
+import tempfile
+import tracemalloc
+from datetime import datetime, timezone
+import numpy as np
+import scipy
+from scipy.signal import welch
+from sqlalchemy import delete
+from httpx import ASGITransport, AsyncClient
+from app.auth import SESSION_COOKIE, create_session_token
+from app.analysis import (
+    closed_eyes_timeline,
+    detect_closed_eyes_minima,
+    find_minima_around,
+    simps,
+)
+from app.cache import analysis_cache
+from app.chunks import write_chunks
+from app.dependencies import SessionLocal, engine
+from app.features import band_powers
+from app.models import Base, Recording, SignalChunk, User
+from app.recordings import read_csv_signals
+from benchmarks.synthetic import (
+    BENCHMARK_START,
+    SIZES,
+    synthetic_eeg,
+    write_synthetic_csv,
+)
+
+SAMPLING_RATE = 100
+MIN_RUN_TIME = 0.02  # Seconds.
+# A case is reported as a regression when its best time is 25% slower than the baseline.
+REGRESSION_TOLERANCE = 0.25
+BENCHMARK_USER = "bench@example.com"
+
+
+def measure(function, repeat):
+    """
+    Best-of timing like timeit: short cases are looped until a run lasts MIN_RUN_TIME, then divided.
+    """
+    function()  # Warm-up: imports, caches, first-touch page faults.
+    number = 1
+    while True:
+        start = time.perf_counter()
+        for _ in range(number):
+            function()
+        if time.perf_counter() - start >= MIN_RUN_TIME or number >= 10_000:
+            break
+        number *= 10
+
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(number):
+            function()
+        times.append((time.perf_counter() - start) / number)
+    tracemalloc.start()  # Separate run: tracing slows the code down.
+    function()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return times, peak
+
+
+async def measure_async(function, repeat):
+    await function()  # Warm-up.
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        await function()
+        times.append(time.perf_counter() - start)
+    tracemalloc.start()
+    await function()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return times, peak
+
+
+def summary(times, peak):
+    return {
+        "min_s": min(times),
+        "median_s": statistics.median(times),
+        "peak_mb": peak / 1e6,
+        "runs": len(times),
+    }
+
+
+def analysis_cases(samples, folder):
+    """
+    (name, function) of every analysis hot path for one recording.
+    """
+    csv_file = os.path.join(folder, "recording.csv")
+    write_synthetic_csv(csv_file, samples, SAMPLING_RATE)
+    frequencies, psd = welch(samples, SAMPLING_RATE, nperseg=SAMPLING_RATE)
+    return [
+        ("read_csv_signals", lambda: read_csv_signals(csv_file)),
+        (
+            "welch",
+            lambda: welch(samples, SAMPLING_RATE, nperseg=SAMPLING_RATE),
+        ),
+        ("simps", lambda: simps(psd, frequencies)),
+        (
+            "find_minima_around",
+            lambda: find_minima_around(frequencies, psd, 10),
+        ),
+        (
+            "detect_closed_eyes_minima",
+            lambda: detect_closed_eyes_minima(frequencies, psd),
+        ),
+        ("band_powers", lambda: band_powers(psd, SAMPLING_RATE)),
+        (
+            "closed_eyes_timeline",
+            lambda: closed_eyes_timeline(samples, SAMPLING_RATE),
+        ),
+    ]
+
+
+async def remove_benchmark_chunks():
+    before = (BENCHMARK_START + np.timedelta64(365, "D")).tolist()
+    async with SessionLocal() as db:
+        await db.execute(
+            delete(SignalChunk).where(SignalChunk.start_time < before)
+        )
+        await db.execute(
+            delete(Recording).where(Recording.start_time < before)
+        )
+        await db.execute(delete(User).where(User.email == BENCHMARK_USER))
+        await db.commit()
+
+
+async def store_benchmark_recording(samples, csv_file):
+    """
+    Stores the samples as a recording of the benchmark user, far in the past, and returns (user id, recording id).
+    """
+    start_time = BENCHMARK_START.tolist().replace(tzinfo=timezone.utc)
+    async with SessionLocal() as db:
+        user = User(
+            first_name="Bench",
+            last_name="Bench",
+            role="bench",
+            email=BENCHMARK_USER,
+            password="-",
+        )
+        db.add(user)
+        await db.flush()
+        recording = Recording(
+            user_id=user.id,
+            device="simulated",
+            channels=[2, 3],
+            sampling_rate=SAMPLING_RATE,
+            start_time=start_time,
+            status="completed",
+            csv_file=csv_file,
+        )
+        db.add(recording)
+        await db.commit()
+        ids = user.id, recording.id
+    await write_chunks(start_time, SAMPLING_RATE, samples[:2], ids[1])
+    return ids
+
+
+async def display_case(samples, repeat, folder):
+    """
+    GET /display and /api/chart of a recording holding the synthetic samples (stored in signal_chunks far in the
+    past and removed afterwards). The analysis cache is cleared before every request, so the analysis of its CSV
+    is timed as well.
+    """
+    from app.main import app
+
+    engine.echo = False
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    await remove_benchmark_chunks()
+    csv_file = os.path.join(folder, "display.csv")
+    write_synthetic_csv(csv_file, samples, SAMPLING_RATE)
+    user_id, recording_id = await store_benchmark_recording(samples, csv_file)
+    end = BENCHMARK_START + np.timedelta64(samples.shape[1] * 10, "ms")
+    params = {
+        "start": f"{BENCHMARK_START}Z",
+        "end": f"{end}Z",
+        "recording": recording_id,
+    }
+    try:
+        async with AsyncClient(
+            transport=ASGITransport(app=app),
+            base_url="http://test",
+            cookies={SESSION_COOKIE: create_session_token(user_id)},
+        ) as client:
+
+            async def request():
+                analysis_cache.invalidate()
+                # The page, then the chart it fetches.
+                response = await client.get(
+                    "/display", params={"recording": recording_id}
+                )
+                response.raise_for_status()
+                response = await client.get("/api/chart", params=params)
+                response.raise_for_status()
+
+            return await measure_async(request, repeat)
+    finally:
+        await remove_benchmark_chunks()
+
+
+def machine():
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True,
+            text=True,
+        ).stdout.strip()
+    except OSError:
+        commit = None
+    return {
+        "date": datetime.now(timezone.utc).isoformat(),
+        "commit": commit,
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "scipy": scipy.__version__,
+        "platform": platform.platform(),
+        "processor": platform.processor(),
+    }
+
+
+def compare(results, baseline, tolerance):
+    """
+    Prints the best time ratio of every case against the baseline and returns the names of the regressions.
+    """
+    regressions = []
+    for name, result in results.items():
+        if name not in baseline:
+            continue
+        ratio = result["min_s"] / baseline[name]["min_s"]
+        memory = result["peak_mb"] - baseline[name]["peak_mb"]
+        flag = ""
+        if ratio > 1 + tolerance:
+            flag = "  REGRESSION"
+            regressions.append(name)
+        print(f"{name:<45} {ratio:6.2f}x  {memory:+9.2f} MB{flag}")
+    return regressions
+
+
+async def main(args):
+    results = {}
+    with tempfile.TemporaryDirectory() as folder:
+        for size in args.sizes:
+            for channels in args.channels:
+                samples = synthetic_eeg(SIZES[size], SAMPLING_RATE, channels)
+                repeat = (
+                    args.repeat if SIZES[size] < 3600 else 1 + args.repeat // 3
+                )
+                for case, function in analysis_cases(samples, folder):
+                    if case == "read_csv_signals" and channels != 2:
+                        continue  # The CSV export holds A3 and A4 only.
+                    name = f"{case}[{size} x{channels}]"
+                    results[name] = summary(*measure(function, repeat))
+                    print(
+                        f"{name:<45} {results[name]['min_s'] * 1000:10.3f} ms"
+                        f"  {results[name]['peak_mb']:9.2f} MB"
+                    )
+            if args.db:
+                name = f"display[{size}]"
+                results[name] = summary(
+                    *await display_case(
+                        synthetic_eeg(SIZES[size], SAMPLING_RATE),
+                        args.repeat,
+                        folder,
+                    )
+                )
+                print(
+                    f"{name:<45} {results[name]['min_s'] * 1000:10.3f} ms"
+                    f"  {results[name]['peak_mb']:9.2f} MB"
+                )
+    if args.db:
+        await engine.dispose()
+
+    if args.output:
+        with open(args.output, "w") as file:
+            json.dump(
+                {"machine": machine(), "results": results}, file, indent=2
+            )
+    if args.compare:
+        with open(args.compare) as file:
+            baseline = json.load(file)["results"]
+        print(f"\ncompared with {args.compare} (best time ratio, peak memory)")
+        if compare(results, baseline, args.tolerance):
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Timings and peak memory of the analysis hot paths."
+    )
+    parser.add_argument(
+        "--sizes", nargs="+", choices=list(SIZES), default=list(SIZES)
+    )
+    parser.add_argument("--channels", nargs="+", type=int, default=[2, 8])
+    parser.add_argument("--repeat", type=int, default=7)
+    parser.add_argument("--no-db", dest="db", action="store_false")
+    parser.add_argument(
+        "--output", help="JSON file the results are written to."
+    )
+    parser.add_argument("--compare", help="Baseline JSON to compare with.")
+    parser.add_argument(
+        "--tolerance", type=float, default=REGRESSION_TOLERANCE
+    )
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,53 @@
+# Synthetic EEG for the benchmarks: 1/f background noise with bursts of 10 Hz alpha, in BITalino ADC units.
+
+import numpy as np
+from app.acquisition import write_csv
+
+# Recording lengths (seconds) used by the benchmark suite.
+SIZES = {"20s": 20, "5min": 5 * 60, "1h": 60 * 60}
+BENCHMARK_START = np.datetime64("1970-01-01T00:00:00", "us")
+
+
+def synthetic_eeg(seconds, sampling_rate=100, channels=2, seed=0):
+    """
+    (channels, n) float64 signal around the ADC midpoint: pink noise plus alpha bursts of 2 to 10 s.
+    """
+    rng = np.random.default_rng(seed)
+    n = int(seconds * sampling_rate)
+    t = np.arange(n) / sampling_rate
+
+    spectrum = np.fft.rfft(rng.normal(size=(channels, n)), axis=-1)
+    frequencies = np.fft.rfftfreq(n, 1 / sampling_rate)
+    spectrum[:, 1:] /= np.sqrt(frequencies[1:])  # 1/f power.
+    spectrum[:, 0] = 0
+    noise = np.fft.irfft(spectrum, n, axis=-1)
+    noise *= 40 / noise.std(axis=-1, keepdims=True)
+
+    bursts = np.zeros(n)
+    position = 0
+    while position < n:
+        length = int(rng.uniform(2, 10) * sampling_rate)
+        if rng.random() < 0.5:
+            bursts[position:][:length] = 1
+        position += length
+    alpha = 30 * bursts * np.sin(2 * np.pi * 10 * t)
+
+    return 512 + noise + alpha
+
+
+def timestamps_for(n, sampling_rate=100, start=BENCHMARK_START):
+    return start + np.round(np.arange(n) * 1e6 / sampling_rate).astype(
+        "timedelta64[us]"
+    )
+
+
+def write_synthetic_csv(path, samples, sampling_rate=100):
+    """
+    Writes the first two channels in the CSV export layout.
+    """
+    write_csv(
+        path,
+        timestamps_for(samples.shape[1], sampling_rate),
+        samples[0],
+        samples[1],
+    )
@@ -1,9 +1,12 @@
 # This is the database configuration that all the test cases in test.py working with database session are going to use.
 
 import pytest
+import pytest_asyncio
 from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
 from sqlalchemy.orm import sessionmaker
-from app.main import DATABASE_URL, Base
+from app.dependencies import DATABASE_URL
+from app.dependencies import engine as app_engine
+from app.models import Base
 
 engine = create_async_engine(DATABASE_URL, echo=True)
 TestSessionLocal = sessionmaker(
@@ -11,23 +14,30 @@ TestSessionLocal = sessionmaker(
 )
 
 
-@pytest.fixture(
-    scope="module", autouse=True
-)  # Autouse ensures the database is set up before any test runs.
+@pytest_asyncio.fixture  # Only the tests using the database need it to be reachable. They are skipped otherwise.
 async def setup_database():
-    async with engine.begin() as conn:
-        await conn.run_sync(
-            Base.metadata.create_all
-        )  # Creating the tables in the database before action.
+    try:
+        async with engine.begin() as conn:
+            await conn.run_sync(
+                Base.metadata.create_all
+            )  # Creating the tables in the database before action.
+    except (OSError, ConnectionError) as e:
+        pytest.skip(f"Postgres is not reachable: {e}")
+    finally:
+        await engine.dispose()
     yield
 
-    pass  # We don't drop the tables here to preserve them for real data in production.
+    # We don't drop the tables here to preserve them for real data in production.
+    await app_engine.dispose()  # Pooled connections of the app belong to this test's event loop.
 
 
-@pytest.fixture
-async def async_session():  # Yielding the async session to be used in tests.
+@pytest_asyncio.fixture
+async def async_session(
+    setup_database,
+):  # Yielding the async session to be used in tests.
     async with TestSessionLocal() as session:
         try:
             yield session
         finally:
             await session.close()
+            await engine.dispose()
@@ -0,0 +1,101 @@
+# Stand-ins and sample data shared by the test modules.
+
+import time
+import asyncio
+import numpy as np
+import app.acquisition
+from app.acquisition import SampleBlock, write_csv
+from app.auth import (
+    SESSION_COOKIE,
+    SessionUser,
+    create_session_token,
+    user_cache,
+)
+
+
+class BlockingDevice:  # Behaves like BITalino: read(n) blocks until n frames (at the sampling rate) are available.
+    def __init__(self):
+        self.sampling_rate = None
+        self.counter = 0
+        self.closed = False
+
+    def start(self, sampling_rate, channels):
+        self.sampling_rate = sampling_rate
+        self.channels = channels
+
+    def read(self, n):
+        time.sleep(n / self.sampling_rate)
+        sequence = np.arange(self.counter, self.counter + n) % 16
+        self.counter += n
+        frames = np.zeros((n, 5 + len(self.channels)))
+        frames[:, 0] = sequence
+        frames[:, -2] = np.arange(self.counter - n, self.counter)
+        frames[:, -1] = -frames[:, -2]
+        return frames
+
+    def stop(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+
+class SimulatedClient:  # Minimal WebSocket stand-in. A hung client never finishes a send.
+    def __init__(self, hung=False):
+        self.hung = hung
+        self.received = []
+        self.closed = False
+
+    async def send_text(self, message):
+        if self.hung:
+            await asyncio.Event().wait()
+        self.received.append(message)
+
+    async def send_bytes(self, message):
+        await self.send_text(message)
+
+    async def close(self):
+        self.closed = True
+
+
+def sample_block(sequence=3, n=100, sampling_rate=1000.0, recording_id=None):
+    samples = np.vstack([np.arange(n), -np.arange(n)]).astype(np.float64)
+    return SampleBlock(
+        sequence,
+        np.datetime64("2025-01-20T10:05:28.071187", "us"),
+        sampling_rate,
+        samples,
+        recording_id,
+    )
+
+
+def write_eeg_csv(path, seconds=20, sampling_rate=100, frequency=10):
+    t = np.arange(seconds * sampling_rate) / sampling_rate
+    signal = 2 * np.sin(2 * np.pi * frequency * t) + np.random.default_rng(
+        0
+    ).normal(size=t.size)
+    timestamps = np.datetime64("2025-01-20T10:00:00", "us") + (t * 1e6).astype(
+        "timedelta64[us]"
+    )
+    write_csv(str(path), timestamps, signal, signal)
+
+
+class DiscardingWriter:  # Stands in for ChunkWriter so capture runs without a database.
+    def __init__(self, sampling_rate, recording_id=None):
+        pass
+
+    async def __call__(self, timestamps, first_channel, second_channel):
+        pass
+
+
+def discard_chunks(monkeypatch):  # capture() then runs without a database.
+    monkeypatch.setattr(app.acquisition, "ChunkWriter", DiscardingWriter)
+
+
+def log_in_client(
+    client, user_id=1
+):  # Session cookie of a cached user: /ws accepts it without a database.
+    user_cache.add(
+        SessionUser(user_id, f"{user_id}@test", "Test", "User", "user")
+    )
+    client.cookies.set(SESSION_COOKIE, create_session_token(user_id))
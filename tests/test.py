@@ -35,25 +35,28 @@ def test_health_check():
 @pytest.mark.asyncio
 async def test_db_connectivity(async_session: AsyncSession):
     test_record = SignalAmplitude(
-        amplitude=1.00, timestamp=datetime.now(timezone.utc)
-    )
+        first_channel=-1.25,
+        second_channel=-2.5,
+        timestamp=datetime.now(timezone.utc),
+    )  # Negative values never come from the device's ADC.
     async_session.add(test_record)  # Inserted a test record
 
     await async_session.commit()
 
     result = await async_session.execute(
-        text("SELECT * FROM signal_amplitudes WHERE amplitude = :amplitude"),
-        {"amplitude": 1.00},  # Quering the inserted data
+        text(
+            "SELECT first_channel, second_channel FROM signal_amplitudes WHERE id = :id"
+        ),
+        {"id": test_record.id},  # Quering the inserted data
     )
 
     record = result.fetchone()
     assert record is not None
-    amplitude = record[1]
-    assert amplitude == 1.00
+    assert tuple(record) == (-1.25, -2.5)
 
     delete_query = text(
-        "DELETE FROM signal_amplitudes WHERE amplitude = :amplitude"
+        "DELETE FROM signal_amplitudes WHERE id = :id"
     )  # The inserted data is removed afterwards (since this already the production database).
-    await async_session.execute(delete_query, {"amplitude": 1.00})
+    await async_session.execute(delete_query, {"id": test_record.id})
 
     await async_session.commit()
@@ -0,0 +1,57 @@
+import time
+import asyncio
+import pytest
+import numpy as np
+from httpx import ASGITransport, AsyncClient
+from app.main import app
+from app.acquisition import AcquisitionWorker
+from tests.helpers import BlockingDevice
+
+
+@pytest.mark.asyncio
+async def test_worker_reads_blocks_in_order():
+    device = BlockingDevice()
+    worker = AcquisitionWorker(lambda: device, 100, [2, 3], duration=0.5)
+    worker.start()
+
+    blocks = [block async for block in worker.blocks()]
+
+    assert [block.sequence for block in blocks] == list(range(5))
+    assert all(block.samples.shape == (2, 10) for block in blocks)
+    samples = np.concatenate([block.samples for block in blocks], axis=1)
+    np.testing.assert_array_equal(samples[0], np.arange(50))
+    np.testing.assert_array_equal(samples[1], -np.arange(50))
+    timestamps = np.concatenate([block.timestamps() for block in blocks])
+    assert np.all(np.diff(timestamps) == np.timedelta64(10, "ms"))
+    assert device.closed
+
+
+@pytest.mark.asyncio
+async def test_health_check_stays_responsive_during_capture():
+    worker = AcquisitionWorker(BlockingDevice, 100, [2, 3], duration=1)
+    worker.start()
+    received = []
+
+    async def consume():
+        async for block in worker.blocks():
+            received.append(block)
+
+    consumer = asyncio.create_task(consume())
+
+    latencies = []
+    async with AsyncClient(
+        transport=ASGITransport(app=app), base_url="http://test"
+    ) as client:
+        while not consumer.done():
+            start = time.perf_counter()
+            response = await client.get("/health_check")
+            latencies.append(time.perf_counter() - start)
+            assert response.status_code == 200
+            await asyncio.sleep(0.01)
+    await consumer
+
+    assert sum(block.samples.shape[1] for block in received) == 100
+    assert (
+        len(latencies) > 20
+    )  # The loop kept serving requests during the whole capture.
+    assert max(latencies) < 0.05
@@ -0,0 +1,36 @@
+import numpy as np
+from scipy.signal import welch
+from app.analysis import detect_closed_eyes_minima, find_minima_around
+
+
+def channels(sampling_rate=100, seconds=20):
+    t = np.arange(sampling_rate * seconds) / sampling_rate
+    noise = np.random.default_rng(0).normal(size=(2, t.size))
+    return noise + [
+        3 * np.sin(2 * np.pi * 10 * t),  # Alpha rhythm: eyes closed.
+        3 * np.sin(2 * np.pi * 25 * t),
+    ]
+
+
+def test_channels_are_analysed_together():
+    frequencies, psd = welch(channels(), 100, nperseg=100)
+
+    results = detect_closed_eyes_minima(frequencies, psd)
+
+    assert [result.channel for result in results] == [0, 1]
+    assert [result.closed_eyes for result in results] == [True, False]
+    for channel, result in enumerate(results):
+        (single,) = detect_closed_eyes_minima(frequencies, psd[channel])
+        assert single.relative_power == result.relative_power
+    assert results[0].message.startswith("Warning: Closed eyes! Relative")
+    assert results[1].message.startswith("No closed eyes!. Relative")
+
+
+def test_minima_fall_back_to_search_range_per_channel():
+    frequencies = np.arange(0, 51.0)
+    psd = np.ones((2, 51))
+    psd[0, [9, 11]] = 0.5  # Minima around 10 Hz for the first channel only.
+
+    minima = find_minima_around(frequencies, psd, 10)
+
+    np.testing.assert_array_equal(np.sort(minima, axis=-1), [[9, 11], [8, 12]])
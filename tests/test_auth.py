@@ -0,0 +1,166 @@
+import asyncio
+from types import SimpleNamespace
+import pytest
+from fastapi import Depends, FastAPI
+from httpx import ASGITransport, AsyncClient
+from sqlalchemy import delete
+from werkzeug.security import generate_password_hash
+from app.auth import (
+    SESSION_COOKIE,
+    HasherBusy,
+    PasswordHasher,
+    UserCache,
+    create_session_token,
+    current_user,
+    read_session_token,
+    user_cache,
+)
+from app.dependencies import SessionLocal
+from app.models import User
+from app.routes.login import router
+
+EMAIL = "auth-test@example.com"
+PASSWORD = "auth-test-password"
+
+
+def test_session_tokens_are_signed_and_expire():
+    token = create_session_token(7, ttl=60, secret="key", now=1000)
+
+    assert read_session_token(token, secret="key", now=1059) == 7
+    assert read_session_token(token, secret="key", now=1060) is None
+    assert read_session_token(token, secret="other", now=1000) is None
+    assert read_session_token("8" + token[1:], secret="key", now=0) is None
+    assert read_session_token("not a token") is None
+    assert read_session_token(None) is None
+
+
+class FakeResult:
+    def __init__(self, user):
+        self.user = user
+
+    def scalar_one_or_none(self):
+        return self.user
+
+
+class FakeDb:
+    def __init__(self, users):
+        self.users = users
+        self.queries = 0
+
+    async def execute(self, query):
+        self.queries += 1
+        user_id = query.whereclause.right.value
+        return FakeResult(self.users.get(user_id))
+
+
+def user(user_id):
+    return SimpleNamespace(
+        id=user_id,
+        email=f"{user_id}@example.com",
+        first_name="First",
+        last_name="Last",
+        role="tester",
+    )
+
+
+@pytest.mark.asyncio
+async def test_user_cache_queries_only_on_misses():
+    db = FakeDb({1: user(1), 2: user(2)})
+    cache = UserCache(ttl=60, max_size=1)
+
+    assert (await cache.get(db, 1)).email == "1@example.com"
+    assert (await cache.get(db, 1)).email == "1@example.com"
+    assert db.queries == 1 and (cache.hits, cache.misses) == (1, 1)
+
+    await cache.get(db, 2)  # Evicts user 1.
+    await cache.get(db, 1)
+    assert db.queries == 3
+    assert await cache.get(db, 3) is None
+
+    cache.invalidate(1)
+    await cache.get(db, 1)
+    assert db.queries == 5
+
+    expired = UserCache(ttl=0)
+    await expired.get(db, 1)
+    await expired.get(db, 1)
+    assert db.queries == 7
+
+
+@pytest.mark.asyncio
+async def test_hashing_leaves_the_event_loop_free():
+    hasher = PasswordHasher(workers=1, max_pending=1)
+    ticks = 0
+
+    async def ticker():
+        nonlocal ticks
+        while True:
+            ticks += 1
+            await asyncio.sleep(0.001)
+
+    task = asyncio.create_task(ticker())
+    password_hash = await hasher.hash(PASSWORD)
+    task.cancel()
+
+    assert ticks > 1
+    assert await hasher.verify(password_hash, PASSWORD)
+    assert not await hasher.verify(password_hash, "wrong password")
+
+    pending = asyncio.create_task(hasher.verify(password_hash, PASSWORD))
+    await asyncio.sleep(0)
+    with pytest.raises(HasherBusy):
+        await hasher.verify(password_hash, PASSWORD)
+    assert await pending and hasher.pending == 0
+
+
+async def remove_test_user():
+    async with SessionLocal() as db:
+        await db.execute(delete(User).where(User.email == EMAIL))
+        await db.commit()
+
+
+@pytest.mark.asyncio
+async def test_login_sets_a_session_for_the_next_requests(setup_database):
+    await remove_test_user()
+
+    api = FastAPI()
+    api.include_router(router)
+
+    @api.get("/me")
+    async def me(user=Depends(current_user)):
+        return {"email": user.email if user is not None else None}
+
+    try:
+        async with SessionLocal() as db:
+            db.add(
+                User(
+                    first_name="Auth",
+                    last_name="Test",
+                    role="tester",
+                    email=EMAIL,
+                    password=generate_password_hash(PASSWORD),
+                )
+            )
+            await db.commit()
+
+        async with AsyncClient(
+            transport=ASGITransport(app=api), base_url="http://test"
+        ) as client:
+            anonymous = (await client.get("/me")).json()
+            wrong = await client.post(
+                "/", data={"email": EMAIL, "password": "wrong password"}
+            )
+            login = await client.post(
+                "/", data={"email": EMAIL, "password": PASSWORD}
+            )
+            hits = user_cache.hits
+            logged_in = (await client.get("/me")).json()
+    finally:
+        await remove_test_user()
+
+    assert anonymous == {"email": None}
+    assert SESSION_COOKIE not in wrong.cookies
+    assert login.status_code == 303
+    assert read_session_token(login.cookies[SESSION_COOKIE]) is not None
+    assert logged_in == {"email": EMAIL}
+    assert user_cache.hits == hits + 1  # Added at login.
@@ -0,0 +1,77 @@
+import asyncio
+import pytest
+import numpy as np
+from app.broadcast import (
+    BLOCK,
+    MESSAGE,
+    PostgresBroadcast,
+    dump_event,
+    load_event,
+)
+from app.socket import ConnectionManager
+from app.streaming import decode_frame
+from tests.helpers import SimulatedClient, sample_block
+
+
+def test_events_round_trip():
+    block = sample_block(recording_id=7)
+
+    assert load_event(dump_event("a", MESSAGE, "done")) == (
+        "a",
+        MESSAGE,
+        "done",
+        None,
+    )
+    assert load_event(dump_event("a", MESSAGE, b"\x00\xff"))[2] == b"\x00\xff"
+    origin, kind, decoded, owner_id = load_event(
+        dump_event("a", BLOCK, block, owner_id=2)
+    )
+    assert kind == BLOCK and owner_id == 2
+    assert decoded.recording_id == 7
+    assert decoded.sequence == block.sequence
+    assert decoded.start_time == block.start_time
+    assert decoded.sampling_rate == block.sampling_rate
+    np.testing.assert_array_equal(decoded.samples, block.samples)
+
+
+async def start_worker(client, user_id):
+    manager = ConnectionManager(backend=PostgresBroadcast())
+    await manager.start()
+    manager.register(client, user_id)
+    return manager, client
+
+
+@pytest.mark.asyncio
+async def test_postgres_backend_reaches_clients_of_other_workers(
+    setup_database,
+):
+    (sender, sender_client), (other, other_client) = [
+        await start_worker(SimulatedClient(), user_id) for user_id in (1, 2)
+    ]
+    other.handle_message(other_client, '{"action": "subscribe"}')
+    try:
+        await sender.broadcast("Acquisition completed!")
+        # Owned by the user of the sender's client: the other worker does not pass it on.
+        await sender.broadcast_block(sample_block(), owner_id=1)
+        await sender.broadcast_block(sample_block(recording_id=5))
+        for _ in range(100):
+            # All three relayed, and the one for this client sent to it.
+            if other.backend.received == 3 and len(other_client.received) == 2:
+                break
+            await asyncio.sleep(0.01)
+
+        assert sender_client.received == ["Acquisition completed!"]
+        assert other_client.received[0] == "Acquisition completed!"
+        assert len(other_client.received) == 2
+        assert decode_frame(other_client.received[1])[0]["recording_id"] == 5
+        assert other.backend.received == 3
+        assert (
+            sender.backend.received == 0
+        )  # Its own notifications are skipped.
+    finally:
+        for manager, client in (
+            (sender, sender_client),
+            (other, other_client),
+        ):
+            manager.disconnect(client)
+            await manager.stop()
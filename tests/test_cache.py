@@ -0,0 +1,55 @@
+import os
+from app.cache import AnalysisCache, analysis_cache
+from app.routes.display import analyze_recording
+from tests.helpers import write_eeg_csv
+
+
+def test_cache_evicts_least_recently_used(tmp_path):
+    cache = AnalysisCache(max_size=2)
+    paths = []
+    for name in "abc":
+        paths.append(tmp_path / name)
+        paths[-1].write_text(name)
+
+    cache.get_or_compute(paths[0], {}, lambda: "a")
+    cache.get_or_compute(paths[1], {}, lambda: "b")
+    cache.get_or_compute(paths[0], {}, lambda: "recomputed")
+    cache.get_or_compute(paths[2], {}, lambda: "c")
+
+    assert cache.get_or_compute(paths[0], {}, lambda: "recomputed") == "a"
+    assert cache.get_or_compute(paths[1], {}, lambda: "b2") == "b2"
+    assert cache.stats() == {"entries": 2, "hits": 2, "misses": 4}
+
+
+def test_cache_keys_on_params_and_file_version(tmp_path):
+    cache = AnalysisCache()
+    path = tmp_path / "recording.csv"
+    path.write_text("1")
+
+    assert cache.get_or_compute(path, {"threshold": 1}, lambda: 1) == 1
+    assert cache.get_or_compute(path, {"threshold": 2}, lambda: 2) == 2
+    path.write_text("22")  # Different size, so a different version.
+    assert cache.get_or_compute(path, {"threshold": 1}, lambda: 3) == 3
+
+    cache.invalidate(str(path))
+    assert cache.stats()["entries"] == 0
+
+
+def test_dashboard_refresh_is_a_cache_hit(tmp_path):
+    path = tmp_path / "recording.csv"
+    write_eeg_csv(path)
+    analysis_cache.invalidate()
+    hits = analysis_cache.hits
+
+    first = analyze_recording(str(path))
+    second = analyze_recording(str(path))
+
+    assert first == second
+    assert [r.closed_eyes for r in first["closed_eyes"]] == [True, True]
+    assert analysis_cache.hits == hits + 1
+
+    write_eeg_csv(path, frequency=30)
+    os.utime(
+        path, ns=(0, 0)
+    )  # Same size is possible, the mtime still differs.
+    assert not analyze_recording(str(path))["closed_eyes"][0].closed_eyes
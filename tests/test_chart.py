@@ -0,0 +1,176 @@
+import json
+from datetime import datetime, timedelta, timezone
+import pytest
+import numpy as np
+from httpx import ASGITransport, AsyncClient
+from sqlalchemy import delete
+from app.main import app
+from app.auth import SESSION_COOKIE, create_session_token
+from app.chunks import write_chunks
+from app.dependencies import SessionLocal
+from app.models import Recording, SignalChunk, User
+from app.routes import display
+from app.routes.display import chart_data, encode_chart, etag_matches
+
+# Test recordings are stored far in the past and removed afterwards.
+START = datetime(1975, 1, 1, tzinfo=timezone.utc)
+END = datetime(1975, 1, 2, tzinfo=timezone.utc)
+OWNER = "chart-test@example.com"
+
+
+def chart_sample():
+    timestamps = np.datetime64("1975-01-01T00:00:00", "us") + np.arange(
+        10
+    ) * np.timedelta64(10, "ms")
+    samples = np.vstack([np.arange(10) / 10, -np.arange(10) / 10])
+    return chart_data(timestamps, samples, 100)
+
+
+def test_chart_data_is_columnar(monkeypatch):
+    data = chart_sample()
+
+    first = data["first_channel"]
+    assert first["timestamps"].dtype == np.int64
+    assert first["values"].dtype == np.float32
+    assert first["timestamps"][:2].tolist() == [157766400000, 157766400010]
+
+    # Without orjson, the json module encodes the arrays.
+    monkeypatch.setattr(display, "orjson", None)
+    decoded = json.loads(encode_chart(data))
+    assert decoded["first_channel"]["timestamps"][:2] == [
+        157766400000,
+        157766400010,
+    ]
+    np.testing.assert_allclose(
+        decoded["second_channel"]["values"], -np.arange(10) / 10, rtol=1e-6
+    )
+
+
+def test_orjson_and_json_encodings_agree(monkeypatch):
+    orjson = pytest.importorskip("orjson")
+    data = chart_sample()
+
+    decoded = orjson.loads(encode_chart(data))
+    monkeypatch.setattr(display, "orjson", None)
+    fallback = json.loads(encode_chart(data))
+    for name, series in decoded.items():
+        assert fallback[name]["timestamps"] == series["timestamps"]
+        np.testing.assert_allclose(
+            fallback[name]["values"], series["values"], rtol=1e-6
+        )
+    assert decoded["second_channel"]["values"][1] == -0.1
+
+
+def test_etag_matching():
+    assert etag_matches('W/"a"', 'W/"a"')
+    assert etag_matches('"b", "a"', 'W/"a"')
+    assert etag_matches("*", 'W/"a"')
+    assert not etag_matches('W/"b"', 'W/"a"')
+    assert not etag_matches(None, 'W/"a"')
+
+
+async def remove_test_rows():
+    async with SessionLocal() as db:
+        await db.execute(
+            delete(SignalChunk).where(
+                SignalChunk.start_time >= START, SignalChunk.start_time < END
+            )
+        )
+        await db.execute(
+            delete(Recording).where(
+                Recording.start_time >= START, Recording.start_time < END
+            )
+        )
+        await db.execute(delete(User).where(User.email == OWNER))
+        await db.commit()
+
+
+@pytest.mark.asyncio
+async def test_unchanged_chart_is_not_sent_again(setup_database):
+    await remove_test_rows()
+
+    try:
+        async with SessionLocal() as db:
+            owner = User(
+                first_name=OWNER,
+                last_name=OWNER,
+                role=OWNER,
+                email=OWNER,
+                password="-",
+            )
+            db.add(owner)
+            await db.flush()
+            recording = Recording(
+                user_id=owner.id,
+                device="simulated",
+                channels=[2, 3],
+                sampling_rate=100,
+                start_time=START,
+                status="running",
+            )
+            db.add(recording)
+            await db.commit()
+            owner_id, recording_id = owner.id, recording.id
+        await write_chunks(START, 100, np.ones((2, 3000)), recording_id)
+
+        async with AsyncClient(
+            transport=ASGITransport(app=app), base_url="http://test"
+        ) as client:
+            anonymous = await client.get("/api/chart")
+            client.cookies.set(SESSION_COOKIE, create_session_token(owner_id))
+            params = {"recording": recording_id}
+            first = await client.get(
+                "/api/chart",
+                params=params,
+                headers={"Accept-Encoding": "gzip"},
+            )
+            etag = first.headers["etag"]
+            unchanged = await client.get(
+                "/api/chart", params=params, headers={"If-None-Match": etag}
+            )
+            other_range = await client.get(
+                "/api/chart",
+                params={**params, "end": "1975-01-01T00:00:10Z"},
+                headers={"If-None-Match": etag},
+            )
+            # More samples: a new version of the recording.
+            await write_chunks(
+                START + timedelta(seconds=30),
+                100,
+                np.ones((2, 1000)),
+                recording_id,
+            )
+            grown = await client.get(
+                "/api/chart", params=params, headers={"If-None-Match": etag}
+            )
+            # The retention removes the oldest samples.
+            async with SessionLocal() as db:
+                await db.execute(
+                    delete(SignalChunk).where(
+                        SignalChunk.recording_id == recording_id,
+                        SignalChunk.start_time < START + timedelta(seconds=10),
+                    )
+                )
+                await db.commit()
+            shrunk = await client.get(
+                "/api/chart",
+                params=params,
+                headers={"If-None-Match": grown.headers["etag"]},
+            )
+    finally:
+        await remove_test_rows()
+
+    assert anonymous.status_code == 401
+    assert first.status_code == 200
+    assert first.headers["content-encoding"] == "gzip"
+    assert len(first.json()["first_channel"]["timestamps"]) == 2000
+    assert unchanged.status_code == 304 and unchanged.content == b""
+    assert other_range.status_code == 200
+    assert grown.status_code == 200 and grown.headers["etag"] != etag
+    assert max(grown.json()["first_channel"]["timestamps"]) > int(
+        (START + timedelta(seconds=30)).timestamp() * 1000
+    )
+    assert shrunk.status_code == 200
+    assert min(shrunk.json()["first_channel"]["timestamps"]) >= int(
+        (START + timedelta(seconds=10)).timestamp() * 1000
+    )
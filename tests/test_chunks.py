@@ -0,0 +1,42 @@
+import numpy as np
+from datetime import datetime, timezone
+from app.chunks import pack_chunks, unpack_chunks, split_regular_runs
+
+
+def test_pack_and_unpack_chunks_round_trip():
+    start_time = datetime(2025, 1, 20, 10, 5, 28, tzinfo=timezone.utc)
+    samples = np.vstack([np.arange(25), -np.arange(25)]).astype(np.float32)
+
+    records = pack_chunks(
+        start_time, 100, samples, chunk_size=10, recording_id=7
+    )
+
+    assert [record[4] for record in records] == [10, 10, 5]
+    assert {record[0] for record in records} == {7}
+    assert records[0][1] == start_time
+    assert records[-1][2] == datetime(
+        2025, 1, 20, 10, 5, 28, 240000, tzinfo=timezone.utc
+    )  # The 25th sample is 0.24 s after the start.
+
+    timestamps, unpacked = unpack_chunks(
+        [(record[1], record[3], record[5]) for record in records]
+    )
+    np.testing.assert_array_equal(unpacked, samples)
+    assert np.all(np.diff(timestamps) == np.timedelta64(10, "ms"))
+
+
+def test_split_regular_runs_breaks_at_gaps():
+    start = np.datetime64("2025-01-20T10:00:00", "us")
+    timestamps = np.concatenate(
+        [
+            start + np.arange(5) * np.timedelta64(10, "ms"),
+            start
+            + np.timedelta64(60, "s")
+            + np.arange(3) * np.timedelta64(10, "ms"),
+        ]
+    )
+
+    sampling_rate, runs = split_regular_runs(timestamps)
+
+    assert sampling_rate == 100
+    assert runs == [(0, 5), (5, 8)]
@@ -0,0 +1,66 @@
+import numpy as np
+from app.decimation import minmax_indices, lttb_indices, decimate
+
+
+def reference_lttb(
+    x, y, n_out
+):  # Textbook (loop based) LTTB used to check the NumPy version.
+    n = len(y)
+    edges = np.linspace(1, n - 1, n_out - 1).astype(int)
+    kept = [0]
+    for bucket in range(n_out - 2):
+        first, stop = edges[bucket], edges[bucket + 1]
+        if bucket == n_out - 3:
+            next_x, next_y = x[-1], y[-1]
+        else:
+            next_stop = edges[bucket + 2]
+            next_x = np.mean(x[stop:next_stop])
+            next_y = np.mean(y[stop:next_stop])
+        previous = kept[-1]
+        areas = [
+            abs(
+                (x[previous] - next_x) * (y[i] - y[previous])
+                - (x[previous] - x[i]) * (next_y - y[previous])
+            )
+            for i in range(first, stop)
+        ]
+        kept.append(first + int(np.argmax(areas)))
+    kept.append(n - 1)
+    return np.array(kept)
+
+
+def test_minmax_keeps_extremes_within_budget():
+    rng = np.random.default_rng(1)
+    samples = rng.normal(size=(2, 10_001))
+    samples[0, 1234] = 50
+    samples[1, 9876] = -50
+
+    indices = minmax_indices(samples, 100)
+
+    assert indices.shape == (2, 100)
+    assert 1234 in indices[0]
+    assert 9876 in indices[1]
+    assert np.all(np.diff(indices, axis=-1) >= 0)
+
+
+def test_lttb_matches_reference():
+    rng = np.random.default_rng(2)
+    x = np.arange(5_000, dtype=np.float64)
+    y = np.cumsum(rng.normal(size=5_000))
+
+    np.testing.assert_array_equal(
+        lttb_indices(x, y, 250), reference_lttb(x, y, 250)
+    )
+
+
+def test_decimate_short_series_is_untouched():
+    timestamps = np.datetime64("2025-01-20T10:00:00", "us") + np.arange(
+        10
+    ) * np.timedelta64(10, "ms")
+    samples = np.vstack([np.arange(10), np.arange(10) * 2])
+
+    for method in ("minmax", "lttb"):
+        series = decimate(timestamps, samples, 100, method)
+        assert len(series) == 2
+        np.testing.assert_array_equal(series[1][0], timestamps)
+        np.testing.assert_array_equal(series[1][1], samples[1])
@@ -0,0 +1,67 @@
+import pytest
+import numpy as np
+from scipy.signal import welch
+from app.detector import ClosedEyesDetector
+
+START = np.datetime64("2025-01-20T10:00:00", "us")
+
+
+def feed(detector, samples, block_size):
+    results = []
+    for start in range(0, samples.shape[1], block_size):
+        results += detector.update(samples[:, start:][:, :block_size])
+    return results
+
+
+def eeg(seconds, sampling_rate, alpha_until=None):
+    t = np.arange(int(seconds * sampling_rate)) / sampling_rate
+    rhythm = 3 * np.sin(2 * np.pi * 10 * t)
+    if alpha_until is not None:
+        beta = 3 * np.sin(2 * np.pi * 25 * t)  # Eyes open.
+        rhythm = np.where(t < alpha_until, rhythm, beta)
+    noise = np.random.default_rng(0).normal(size=(2, t.size))
+    return rhythm + noise
+
+
+@pytest.mark.parametrize("sampling_rate", [100, 1000])
+def test_incremental_psd_matches_welch(sampling_rate):
+    detector = ClosedEyesDetector(sampling_rate, 2, START, window=4)
+    samples = eeg(10.3, sampling_rate)
+
+    results = feed(detector, samples, sampling_rate // 10)
+
+    start, end = 6 * sampling_rate, 10 * sampling_rate
+    _, psd = welch(
+        samples[:, start:end],
+        sampling_rate,
+        nperseg=sampling_rate,
+    )
+    np.testing.assert_allclose(detector.psd(), psd)
+    assert [result["time"] for result in results] == [
+        f"2025-01-20T10:00:{second:02d}+00:00" for second in range(4, 11)
+    ]
+
+
+def test_detects_closed_eyes_as_they_change():
+    detector = ClosedEyesDetector(100, 2, START, window=4, hop=1)
+
+    results = feed(detector, eeg(20, 100, alpha_until=10), 10)
+
+    closed = [result["closed_eyes"] for result in results]
+    assert closed[:6] == [[True, True]] * 6  # Windows ending up to 10 s.
+    assert closed[-6:] == [[False, False]] * 6  # Windows starting after 10 s.
+
+
+def test_update_latency_is_bounded_at_full_rate():
+    detector = ClosedEyesDetector(1000, 2, START)
+
+    results = feed(detector, eeg(30, 1000), 100)
+
+    assert len(results) == 27
+    assert detector.max_latency < 0.005  # A block arrives every 100 ms.
+    assert all(result["latency_ms"] < 5 for result in results)
+
+
+def test_rejects_rates_below_the_alpha_band():
+    with pytest.raises(ValueError):
+        ClosedEyesDetector(10, 2, START)
@@ -0,0 +1,85 @@
+import time
+import pytest
+import numpy as np
+from app.acquisition import AcquisitionWorker, capture
+from app.devices import SimulatedBITalino, open_device
+from app.recordings import Recording, recording_path_for
+from tests.helpers import discard_chunks
+
+
+def test_frames_have_the_bitalino_layout():
+    device = SimulatedBITalino(realtime=False, seed=0)
+    device.start(1000, [0, 1, 2, 3, 4, 5])
+
+    frames = device.read(40)
+
+    assert frames.shape == (40, 11)
+    np.testing.assert_array_equal(frames[:, 0], np.arange(40) % 16)
+    np.testing.assert_array_equal(frames[:, 1:5], [[1, 1, 0, 0]] * 40)
+    assert frames[:, 5:9].min() >= 0 and frames[:, 5:9].max() <= 1023
+    assert frames[:, 9:].max() <= 63  # A5 and A6 are 6-bit.
+    # Sequence numbers continue across reads.
+    assert device.read(1)[0, 0] == 40 % 16
+
+    device.stop()
+    device.start(1000, [0, 5])  # A6 right after A1.
+    frames = device.read(400)
+    assert frames[:, 5].max() > 63 and frames[:, 6].max() <= 63
+
+
+def test_invalid_configuration_is_rejected_like_the_device():
+    device = SimulatedBITalino(realtime=False)
+    with pytest.raises(Exception):
+        device.start(500, [2, 3])
+    with pytest.raises(Exception):
+        device.start(100, [2, 2])
+    with pytest.raises(Exception):
+        device.start(100, [6])
+    with pytest.raises(Exception):
+        device.read(10)
+
+
+def test_dropped_frames_leave_gaps_in_the_sequence():
+    device = SimulatedBITalino(drop_rate=0.1, realtime=False, seed=1)
+    device.start(1000, [2, 3])
+
+    frames = device.read(1000)
+
+    assert len(frames) == 1000
+    gaps = (np.diff(frames[:, 0]) % 16) - 1
+    assert gaps.sum() == device.frames_dropped > 0
+
+
+def test_realtime_reads_are_paced_by_the_sampling_rate():
+    device = SimulatedBITalino(seed=0)
+    device.start(1000, [2, 3])
+    started = time.monotonic()
+    for _ in range(3):
+        device.read(50)
+    assert time.monotonic() - started >= 0.14
+
+
+def test_open_device_parses_simulator_options():
+    device = open_device("simulated?realtime=0&drop_rate=0.5&alpha=0&seed=3")
+
+    assert isinstance(device, SimulatedBITalino)
+    assert not device.realtime and not device.alpha
+    assert device.drop_rate == 0.5
+
+
+@pytest.mark.asyncio
+async def test_capture_from_the_simulator(tmp_path, monkeypatch):
+    discard_chunks(monkeypatch)
+    csv_file = str(tmp_path / "simulated.csv")
+    worker = AcquisitionWorker(
+        lambda: open_device("simulated?realtime=0&seed=0"),
+        1000,
+        [0, 1, 2, 3, 4, 5],
+        duration=2,
+    )
+    worker.start()
+
+    await capture(worker, csv_file)
+
+    recording = Recording(recording_path_for(csv_file))
+    assert recording.samples().shape == (2, 2000)
@@ -0,0 +1,56 @@
+import numpy as np
+import pytest
+from scipy.integrate import trapezoid
+from scipy.signal import welch
+from app.features import EEG_BANDS, band_bins, band_powers
+
+
+def reference(frequencies, psd, low, high):
+    in_band = (frequencies >= low) & (frequencies <= high)
+    return trapezoid(psd[..., in_band], frequencies[in_band], axis=-1)
+
+
+@pytest.mark.parametrize(
+    "shape", [(2000,), (2, 2000), (2, 7, 2000)]
+)  # Single window, channels and channels x windows.
+def test_band_powers_match_direct_integration(shape):
+    samples = np.random.default_rng(0).normal(size=shape)
+    frequencies, psd = welch(samples, 100, nperseg=100)
+
+    powers = band_powers(psd, 100)
+
+    assert powers.bands == ("delta", "theta", "alpha", "beta", "gamma")
+    assert powers.absolute.shape == shape[:-1] + (5,)
+    total = trapezoid(psd, frequencies, axis=-1)
+    for index, (_, low, high) in enumerate(EEG_BANDS):
+        expected = reference(frequencies, psd, low, high)
+        np.testing.assert_allclose(powers.absolute[..., index], expected)
+        np.testing.assert_allclose(
+            powers.relative[..., index], expected / total
+        )
+
+
+def test_custom_bands_and_resolution():
+    frequencies, psd = welch(
+        np.random.default_rng(1).normal(size=4000), 1000, nperseg=250
+    )
+    bands = [("low", 0, 10), ("mu", 8, 12), ("none", 1, 2)]
+
+    powers = band_powers(psd, 1000, nperseg=250, bands=bands)
+
+    np.testing.assert_allclose(
+        powers.absolute[:2],
+        [
+            reference(frequencies, psd, 0, 10),
+            reference(frequencies, psd, 8, 12),
+        ],
+    )
+    assert (
+        powers.absolute[2] == 0
+    )  # No bin between 1 and 2 Hz at 4 Hz resolution.
+    assert band_bins.cache_info().currsize >= 1
+
+
+def test_rejects_psd_of_another_segment_length():
+    with pytest.raises(ValueError):
+        band_powers(np.ones(51), 100, nperseg=200)
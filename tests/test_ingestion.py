@@ -0,0 +1,95 @@
+import time
+from datetime import datetime, timezone
+import pytest
+import numpy as np
+from sqlalchemy import delete, select
+from app.dependencies import SessionLocal
+from app.ingestion import SampleIngestor, copy_signal_amplitudes
+from app.models import SignalAmplitude
+
+# Test samples are stored far in the past and removed afterwards.
+TEST_END = datetime(1970, 1, 3, tzinfo=timezone.utc)
+
+
+class BatchCollector:  # Stands in for the COPY writer and keeps every batch it receives.
+    def __init__(self):
+        self.batches = []
+
+    async def __call__(self, timestamps, first_channel, second_channel):
+        self.batches.append((timestamps, first_channel, second_channel))
+
+
+def sample_rows(start, count):
+    timestamps = np.datetime64("2025-01-20T10:00:00", "us") + np.arange(
+        start, start + count
+    ) * np.timedelta64(10, "ms")
+    values = np.arange(start, start + count, dtype=np.float64)
+    return timestamps, values, -values
+
+
+@pytest.mark.asyncio
+async def test_ingestor_flushes_full_batches_and_remainder():
+    writer = BatchCollector()
+
+    async with SampleIngestor(
+        writer=writer, batch_size=4, flush_interval=3600
+    ) as ingestor:
+        await ingestor.add(
+            *sample_rows(0, 6)
+        )  # One full batch and two buffered rows.
+        await ingestor.add(
+            *sample_rows(6, 3)
+        )  # Fills the second batch and starts a third.
+
+    assert [len(batch[0]) for batch in writer.batches] == [4, 4, 1]
+    assert ingestor.rows_written == 9
+
+    first_channel = np.concatenate([batch[1] for batch in writer.batches])
+    second_channel = np.concatenate([batch[2] for batch in writer.batches])
+    np.testing.assert_array_equal(first_channel, np.arange(9))
+    np.testing.assert_array_equal(second_channel, -np.arange(9))
+
+
+@pytest.mark.asyncio
+async def test_ingestor_flushes_on_interval():
+    writer = BatchCollector()
+    ingestor = SampleIngestor(writer=writer, batch_size=1000, flush_interval=0)
+
+    timestamp, first_channel, second_channel = sample_rows(0, 1)
+    await ingestor.add(timestamp[0], first_channel[0], second_channel[0])
+
+    assert len(writer.batches) == 1
+    assert ingestor.rows_written == 1
+
+
+async def remove_test_samples():
+    async with SessionLocal() as db:
+        await db.execute(
+            delete(SignalAmplitude).where(SignalAmplitude.timestamp < TEST_END)
+        )
+        await db.commit()
+
+
+@pytest.mark.asyncio
+async def test_copied_samples_are_utc_whatever_the_local_timezone(
+    monkeypatch, setup_database
+):
+    await remove_test_samples()
+
+    timestamps = np.array(["1970-01-02T00:00:00"], dtype="datetime64[us]")
+    monkeypatch.setenv("TZ", "America/New_York")
+    time.tzset()
+    try:
+        await copy_signal_amplitudes(timestamps, np.ones(1), np.ones(1))
+        async with SessionLocal() as db:
+            stored = await db.scalar(
+                select(SignalAmplitude.timestamp).where(
+                    SignalAmplitude.timestamp < TEST_END
+                )
+            )
+    finally:
+        monkeypatch.undo()
+        time.tzset()
+        await remove_test_samples()
+
+    assert stored == datetime(1970, 1, 2, tzinfo=timezone.utc)
@@ -0,0 +1,111 @@
+import asyncio
+import pytest
+from httpx import ASGITransport, AsyncClient
+import app.jobs
+import app.routes.jobs
+from app.main import app as fastapi_app
+from app.auth import SessionUser, current_user
+from app.jobs import JobManager
+from tests.helpers import BlockingDevice
+
+
+async def drain(
+    worker, csv_file, recording_id=None, user_id=None
+):  # Replaces capture() so the jobs run without a database.
+    async for _ in worker.blocks():
+        pass
+
+
+@pytest.fixture
+def job_manager(monkeypatch):
+    manager = JobManager(
+        max_jobs=1,
+        device_factory=lambda _: BlockingDevice(),
+        recording_store=None,
+    )
+    monkeypatch.setattr(app.jobs, "capture", drain)
+    monkeypatch.setattr(app.routes.jobs, "jobs", manager)
+    return manager
+
+
+@pytest.fixture
+def log_in():
+    def log_in(user_id):  # Replaces the session cookie.
+        fastapi_app.dependency_overrides[current_user] = lambda: SessionUser(
+            user_id, f"{user_id}@example.com", "Job", "Test", "tester"
+        )
+
+    yield log_in
+    fastapi_app.dependency_overrides.pop(current_user, None)
+
+
+async def wait_for(job, *statuses):
+    while job.status not in statuses:
+        await asyncio.sleep(0.01)
+
+
+@pytest.mark.asyncio
+async def test_jobs_respect_worker_limit(job_manager):
+    first = job_manager.submit("simulated", [2, 3], 100, 0.3)
+    second = job_manager.submit("simulated", [2, 3], 100, 0.3)
+
+    await wait_for(first, "running")
+    assert second.status == "queued"
+
+    await asyncio.wait_for(asyncio.gather(first.task, second.task), 5)
+    assert first.status == second.status == "completed"
+    assert second.started_at >= first.finished_at
+    assert first.samples_captured == first.samples_total == 30
+
+
+@pytest.mark.asyncio
+async def test_job_routes_submit_poll_and_cancel(job_manager, log_in):
+    async with AsyncClient(
+        transport=ASGITransport(app=fastapi_app), base_url="http://test"
+    ) as client:
+        assert (await client.get("/jobs")).status_code == 401
+        assert (
+            await client.post("/jobs", json={"device": "simulated"})
+        ).status_code == 401
+
+        log_in(1)
+        response = await client.post(
+            "/jobs", json={"device": "simulated", "duration": 60}
+        )
+        assert response.status_code == 202
+        job_id = response.json()["id"]
+
+        job = job_manager.get(job_id)
+        assert job.user_id == 1
+        await wait_for(job, "running")
+        while job.samples_captured == 0:
+            await asyncio.sleep(0.01)
+
+        status = (await client.get(f"/jobs/{job_id}")).json()
+        assert status["status"] == "running"
+        assert 0 < status["progress"] < 1
+
+        log_in(2)  # Another user neither sees nor cancels the job.
+        assert (await client.get("/jobs")).json() == []
+        assert (await client.get(f"/jobs/{job_id}")).status_code == 404
+        assert (await client.delete(f"/jobs/{job_id}")).status_code == 404
+
+        log_in(1)
+        assert [job["id"] for job in (await client.get("/jobs")).json()] == [
+            job_id
+        ]
+        await client.delete(f"/jobs/{job_id}")
+        await asyncio.wait_for(job.task, 5)
+        assert (await client.get(f"/jobs/{job_id}")).json()[
+            "status"
+        ] == "cancelled"
+
+        assert (await client.get("/jobs/unknown")).status_code == 404
+        assert (
+            await client.post("/jobs", json={"sampling_rate": 50})
+        ).status_code == 422
+        assert (
+            await client.post(
+                "/jobs", json={"sampling_rate": 1, "duration": 0.5}
+            )
+        ).status_code == 422  # Not a single sample.
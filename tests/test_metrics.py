@@ -0,0 +1,61 @@
+import pytest
+from httpx import ASGITransport, AsyncClient
+from app.main import app
+from app.metrics import Counter, Gauge, Histogram, Registry
+
+
+def test_histogram_renders_cumulative_buckets():
+    registry = Registry()
+    histogram = Histogram(
+        "latency_seconds",
+        "Latency.",
+        buckets=(0.1, 1),
+        labels=("route",),
+        registry=registry,
+    )
+    for value in (0.05, 0.1, 0.5, 3):
+        histogram.observe(value, route="/a")
+
+    lines = registry.render().splitlines()
+
+    assert "# TYPE latency_seconds histogram" in lines
+    assert 'latency_seconds_bucket{route="/a",le="0.1"} 2' in lines
+    assert 'latency_seconds_bucket{route="/a",le="1"} 3' in lines
+    assert 'latency_seconds_bucket{route="/a",le="+Inf"} 4' in lines
+    assert 'latency_seconds_sum{route="/a"} 3.65' in lines
+    assert 'latency_seconds_count{route="/a"} 4' in lines
+
+
+def test_counter_and_gauges():
+    registry = Registry()
+    counter = Counter("samples_total", "Samples.", registry=registry)
+    counter.inc(100)
+    counter.inc(50)
+    Gauge("clients", "Clients.", function=lambda: 3, registry=registry)
+
+    lines = registry.render().splitlines()
+
+    assert "samples_total 150" in lines
+    assert "clients 3" in lines
+    with pytest.raises(ValueError):
+        counter.inc(route="/a")  # Unknown label.
+
+
+@pytest.mark.asyncio
+async def test_metrics_endpoint_reports_request_latency_by_route():
+    async with AsyncClient(
+        transport=ASGITransport(app=app), base_url="http://test"
+    ) as client:
+        await client.get("/health_check")
+        await client.get("/jobs/unknown")
+        response = await client.get("/metrics")
+
+    assert response.headers["content-type"].startswith("text/plain")
+    text = response.text
+    assert (
+        'http_request_duration_seconds_count{method="GET",'
+        'route="/health_check",status="200"}'
+    ) in text
+    # Labelled by route template, not by path.
+    assert 'route="/jobs/{job_id}",status="401"' in text
+    assert "websocket_clients 0" in text
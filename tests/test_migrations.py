@@ -0,0 +1,70 @@
+import importlib.util
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from sqlalchemy import create_engine, text
+from app.dependencies import DATABASE_URL
+
+VERSIONS = Path(__file__).resolve().parent.parent / "alembic" / "versions"
+
+
+def load_migration(name):
+    spec = importlib.util.spec_from_file_location(
+        name, VERSIONS / f"{name}.py"
+    )
+    migration = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(migration)
+    return migration
+
+
+def test_legacy_backfill_keeps_the_partial_last_chunk(setup_database):
+    migration = load_migration("46fb168b8a0f_create_signal_chunks_table")
+    start = datetime(1970, 1, 2, tzinfo=timezone.utc)
+    # Migrations run through psycopg2, as alembic/env.py does.
+    engine = create_engine(DATABASE_URL.replace("+asyncpg", ""))
+    try:
+        with engine.connect() as connection:
+            # The tables as they were at this revision, in a schema rolled back with the transaction.
+            connection.execute(text("CREATE SCHEMA migration_test"))
+            connection.execute(text("SET LOCAL search_path TO migration_test"))
+            connection.execute(
+                text(
+                    """
+                    CREATE TABLE signal_amplitudes (
+                        id serial PRIMARY KEY, timestamp timestamptz, first_channel float8, second_channel float8
+                    );
+                    CREATE TABLE signal_chunks (
+                        id serial PRIMARY KEY, start_time timestamptz NOT NULL, end_time timestamptz NOT NULL,
+                        sampling_rate float8 NOT NULL, n_samples integer NOT NULL, samples real[][] NOT NULL
+                    )
+                    """
+                )
+            )
+            connection.execute(
+                text(
+                    "INSERT INTO signal_amplitudes (timestamp, first_channel, second_channel) "
+                    "VALUES (:timestamp, :value, -:value)"
+                ),
+                [
+                    {
+                        "timestamp": start + timedelta(milliseconds=10 * i),
+                        "value": i,
+                    }
+                    for i in range(2500)  # Not a multiple of CHUNK_SIZE.
+                ],
+            )
+
+            migration.backfill_legacy_samples(connection)
+            chunks = connection.execute(
+                text(
+                    "SELECT start_time, end_time, n_samples, samples[1:1][1:1] AS first, "
+                    "samples[2][n_samples] AS last FROM signal_chunks ORDER BY start_time"
+                )
+            ).all()
+            connection.rollback()
+    finally:
+        engine.dispose()
+
+    assert [chunk.n_samples for chunk in chunks] == [1000, 1000, 500]
+    assert chunks[2].start_time == start + timedelta(seconds=20)
+    assert chunks[2].end_time == start + timedelta(milliseconds=24990)
+    assert chunks[2].first == [[2000]] and chunks[2].last == -2499
@@ -0,0 +1,130 @@
+import time
+import asyncio
+from datetime import datetime, timezone
+import pytest
+import numpy as np
+from sqlalchemy import insert, text
+from app.chunks import CHUNK_COLUMNS, pack_chunks
+from app.dependencies import engine
+from app.models import SignalChunk
+import app.partitions
+from app.partitions import (
+    DEFAULT_PARTITION,
+    PartitionMaintenance,
+    apply_retention,
+    chunks_by_recording,
+    ensure_partitions,
+    list_partitions,
+    partition_bounds,
+    partition_name,
+    partition_start,
+)
+from app.recordings import Recording
+
+# A week of 1974 without a partition: its rows wait in the default partition.
+START = datetime(1974, 1, 2, 12, tzinfo=timezone.utc)
+NAME = "signal_chunks_p19731231_19740107"
+
+
+def test_weekly_partitions_start_on_mondays():
+    start = partition_start(START, 7)
+    assert start == datetime(1973, 12, 31, tzinfo=timezone.utc)
+    assert partition_start(START, 1) == datetime(
+        1974, 1, 2, tzinfo=timezone.utc
+    )
+
+    end = partition_start(datetime(1974, 1, 7, tzinfo=timezone.utc), 7)
+    assert partition_name(start, end) == NAME
+    assert partition_bounds(NAME) == (start, end)
+    assert partition_bounds(DEFAULT_PARTITION) is None
+
+
+def partition_rows(connection):
+    return connection.execute(
+        text(
+            "SELECT tableoid::regclass::text, count(*) FROM signal_chunks "
+            "WHERE start_time >= :start AND start_time < :end GROUP BY 1"
+        ),
+        {"start": START, "end": datetime(1974, 1, 3, tzinfo=timezone.utc)},
+    ).all()
+
+
+def maintain(connection, folder):
+    samples = np.vstack([np.arange(2500), -np.arange(2500)])
+    connection.execute(
+        insert(SignalChunk),
+        [
+            dict(zip(CHUNK_COLUMNS, record))
+            for record in pack_chunks(START, 100, samples)
+        ],
+    )
+    waiting = partition_rows(connection)
+
+    created = ensure_partitions(connection, now=START, ahead=1)
+    moved = partition_rows(connection)
+    partitions = [name for name, _, _ in list_partitions(connection)]
+    paged = list(chunks_by_recording(connection, NAME, page=2))
+
+    # Four weeks later, with a two week retention.
+    dropped = apply_retention(
+        connection,
+        now=datetime(1974, 1, 30, tzinfo=timezone.utc),
+        retention_days=14,
+        archive_folder=folder,
+        rollup_retention_days=0,
+    )
+    return waiting, created, moved, partitions, paged, dropped, samples
+
+
+@pytest.mark.asyncio
+async def test_partitions_are_created_filled_and_archived(
+    tmp_path, setup_database
+):
+    # DDL is transactional in Postgres: everything is rolled back.
+    async with engine.connect() as conn:
+        waiting, created, moved, partitions, paged, dropped, samples = (
+            await conn.run_sync(maintain, str(tmp_path))
+        )
+        remaining = await conn.run_sync(partition_rows)
+        await conn.rollback()
+
+    assert waiting == [(DEFAULT_PARTITION, 3)]
+    assert created[:2] == [NAME, "signal_chunks_p19740107_19740114"]
+    assert moved == [(NAME, 3)]
+    assert NAME in partitions
+    assert [chunk[1] for chunk in paged] == sorted(chunk[1] for chunk in paged)
+    assert len(paged) == 3
+    assert NAME in dropped and "signal_chunks_p19740107_19740114" in dropped
+    assert remaining == []
+
+    archive = Recording(
+        str(tmp_path / NAME / "recording_None_19740102T120000.eegr")
+    )
+    assert archive.sampling_rate == 100
+    np.testing.assert_array_equal(archive.samples(), samples)
+
+
+@pytest.mark.asyncio
+async def test_maintenance_runs_off_the_event_loop(
+    monkeypatch, setup_database
+):
+    def slow_maintenance(connection, now):
+        time.sleep(0.2)  # Archiving a large partition.
+        return {"dropped": [], "created": [], "now": now}
+
+    async def ticks():
+        count = 0
+        while True:
+            await asyncio.sleep(0.01)
+            count += 1
+            if task.done():
+                return count
+
+    monkeypatch.setattr(
+        app.partitions, "maintain_partitions", slow_maintenance
+    )
+    task = asyncio.create_task(PartitionMaintenance().run_once(START))
+    count = await ticks()
+
+    assert (await task)["now"] == START
+    assert count > 5  # The loop kept running during the maintenance.
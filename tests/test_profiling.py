@@ -0,0 +1,94 @@
+import logging
+import pytest
+from httpx import ASGITransport, AsyncClient
+from sqlalchemy import text
+import app.routes.profiling
+from app.auth import SessionUser, require_user
+from app.main import app as fastapi_app
+from app.dependencies import engine
+from app.profiling import QueryProfiler, parameters_shape, profiler
+
+
+def test_parameters_shape_hides_the_values():
+    assert parameters_shape({"a": "secret", "b": 3}) == "(str, int)"
+    assert parameters_shape([(1, 2.0), (3, 4.0)], many=True) == (
+        "2 x (int, float)"
+    )
+
+
+def test_statements_are_aggregated_per_request_and_statement():
+    query_profiler = QueryProfiler(enabled=True, slow_query_ms=1e9)
+    insert = "INSERT INTO users VALUES ($1, $2)"
+    rows = [("a", "x"), ("b", "y")]
+
+    token, profile = query_profiler.start_request("POST", "/register")
+    query_profiler.record(insert, rows, True, 0.002, -1)
+    for _ in range(3):
+        query_profiler.record("SELECT * FROM users", (), False, 0.001, 2)
+    query_profiler.end_request(token)
+    query_profiler.record("SELECT * FROM users", (), False, 0.001, 2)
+
+    assert profile.queries == 4 and profile.rows == 8
+    assert profile.server_timing().endswith('desc="4 queries"')
+    report = {row["statement"]: row for row in query_profiler.report()}
+    assert report["SELECT * FROM users"]["calls"] == 4
+    assert report[insert]["rows"] == 2  # executemany: one per parameter set.
+
+
+def test_only_slow_statements_are_logged_without_values(caplog):
+    query_profiler = QueryProfiler(enabled=True, slow_query_ms=5)
+    statement = "SELECT * FROM users WHERE password = $1"
+
+    with caplog.at_level(logging.WARNING, logger="app.profiling"):
+        query_profiler.record(statement, ("hunter2",), False, 0.001, 1)
+        assert caplog.text == ""
+        query_profiler.record(statement, ("hunter2",), False, 0.01, 1)
+
+    assert "parameters (str)" in caplog.text
+    assert "hunter2" not in caplog.text
+
+    query_profiler.enabled = False
+    query_profiler.reset()
+    query_profiler.record("SELECT * FROM users", (), False, 0.001, 0)
+    assert query_profiler.report() == []
+
+
+@pytest.mark.asyncio
+async def test_engine_queries_feed_the_profiler(setup_database, monkeypatch):
+    assert not QueryProfiler().enabled  # Off unless DB_PROFILING=1.
+    monkeypatch.setattr(profiler, "enabled", True)
+    profiler.reset()
+    async with engine.connect() as conn:
+        await conn.execute(text("SELECT 1"))
+
+    report = {row["statement"]: row for row in profiler.report()}
+    assert report["SELECT 1"]["calls"] == 1
+
+
+@pytest.mark.asyncio
+async def test_profiler_is_toggled_at_runtime(monkeypatch):
+    enabled, slow_query_ms = profiler.enabled, profiler.slow_query_ms
+    try:
+        async with AsyncClient(
+            transport=ASGITransport(app=fastapi_app), base_url="http://test"
+        ) as client:
+            assert (await client.get("/debug/db-profile")).status_code == 404
+            monkeypatch.setattr(
+                app.routes.profiling, "DB_PROFILE_ENDPOINT", True
+            )
+            assert (await client.get("/debug/db-profile")).status_code == 401
+            monkeypatch.setitem(
+                fastapi_app.dependency_overrides,
+                require_user,
+                lambda: SessionUser(1, "a@b.c", "A", "B", "user"),
+            )
+            response = await client.post(
+                "/debug/db-profile",
+                json={"enabled": False, "slow_query_ms": 5},
+            )
+            assert response.json()["enabled"] is False
+            assert profiler.slow_query_ms == 5
+            response = await client.get("/debug/db-profile")
+            assert response.json()["slow_query_ms"] == 5
+    finally:
+        profiler.enabled, profiler.slow_query_ms = enabled, slow_query_ms
@@ -0,0 +1,155 @@
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+import pytest
+import numpy as np
+from sqlalchemy import delete, select
+from app.chunks import ChunkWriter, read_samples, write_chunks
+from app.dependencies import SessionLocal, engine
+from app.models import Recording, SignalChunk, SignalRollup, User
+from app.recording_sessions import (
+    backfill_recordings,
+    group_chunks,
+    recording_store,
+    select_recording,
+    visible_recordings,
+)
+
+START = datetime(1973, 1, 1, tzinfo=timezone.utc)
+END = datetime(1973, 1, 2, tzinfo=timezone.utc)
+OWNER = "recordings-test@example.com"
+
+
+def test_group_chunks_breaks_at_gaps():
+    second = timedelta(seconds=1)
+    rows = [
+        (START, START + 10 * second, 100.0),
+        (START + 10 * second, START + 20 * second, 100.0),
+        (START + 200 * second, START + 210 * second, 10.0),
+    ]
+
+    assert group_chunks(rows, gap=60) == [
+        (START, START + 20 * second, 100.0),
+        (START + 200 * second, START + 210 * second, 10.0),
+    ]
+
+
+def job_at(start_time, user_id=None):
+    return SimpleNamespace(
+        user_id=user_id,
+        device="simulated",
+        channels=[2, 3],
+        sampling_rate=100,
+        started_at=start_time,
+        finished_at=start_time + timedelta(seconds=10),
+        status="running",
+        csv_file=None,
+    )
+
+
+async def remove_test_rows():
+    async with SessionLocal() as db:
+        for table, column in (
+            (SignalChunk, SignalChunk.start_time),
+            (SignalRollup, SignalRollup.bucket_start),
+            (Recording, Recording.start_time),
+        ):
+            await db.execute(
+                delete(table).where(column >= START, column < END)
+            )
+        await db.execute(delete(User).where(User.email == OWNER))
+        await db.commit()
+
+
+@pytest.mark.asyncio
+async def test_samples_are_read_per_recording(setup_database):
+    await remove_test_rows()
+
+    samples = np.ones((2, 1000))
+    timestamps = np.datetime64("1973-01-01T00:00:00", "us") + np.arange(
+        1000
+    ) * np.timedelta64(10, "ms")
+    try:
+        recordings = []
+        # Two recordings overlapping in time, as concurrent jobs do.
+        for index in range(2):
+            job = job_at(START + timedelta(seconds=index))
+            job.recording_id = await recording_store.create(job)
+            await ChunkWriter(100, job.recording_id)(
+                timestamps + np.timedelta64(index, "s"), *(samples * index)
+            )
+            job.status = "completed"
+            await recording_store.finish(job)
+            recordings.append(job.recording_id)
+
+        async with SessionLocal() as db:
+            _, first = await read_samples(db, recording_id=recordings[0])
+            _, second = await read_samples(
+                db, START, END, recording_id=recordings[1]
+            )
+            latest = await select_recording(db, None)
+            listed = await visible_recordings(db, None)
+            # Only the recordings of the user, and those without an owner.
+            owner = User(
+                first_name=OWNER,
+                last_name=OWNER,
+                role=OWNER,
+                email=OWNER,
+                password="-",
+            )
+            db.add(owner)
+            await db.commit()
+            private = job_at(START + timedelta(hours=1), user_id=owner.id)
+            private_id = await recording_store.create(private)
+            hidden = await select_recording(db, None, private_id)
+            own = await select_recording(db, owner.id)
+            finished = await db.get(Recording, recordings[0])
+    finally:
+        await remove_test_rows()
+
+    assert first.shape == second.shape == (2, 1000)
+    assert np.all(first == 0) and np.all(second == 1)
+    assert finished.status == "completed" and finished.end_time is not None
+    assert hidden is None and own.id == private_id
+    assert latest.start_time >= START + timedelta(seconds=1)
+    assert recordings[1] in [recording.id for recording in listed]
+
+
+@pytest.mark.asyncio
+async def test_backfill_groups_unassigned_chunks_into_recordings(
+    setup_database,
+):
+    await remove_test_rows()
+
+    try:
+        # Two captures an hour apart, stored before recordings existed.
+        for hour in range(2):
+            await write_chunks(
+                START + timedelta(hours=hour), 100, np.zeros((2, 2500))
+            )
+
+        async with engine.connect() as conn:
+            await conn.run_sync(backfill_recordings, latest_csv_file="x.csv")
+            chunks = (
+                await conn.execute(
+                    select(SignalChunk.recording_id)
+                    .where(SignalChunk.start_time >= START)
+                    .where(SignalChunk.start_time < END)
+                    .order_by(SignalChunk.start_time)
+                )
+            ).scalars()
+            chunks = list(chunks)
+            created = (
+                await conn.execute(
+                    select(Recording)
+                    .where(Recording.id.in_(set(chunks)))
+                    .order_by(Recording.start_time)
+                )
+            ).all()
+            await conn.rollback()
+    finally:
+        await remove_test_rows()
+
+    assert len(chunks) == 6 and None not in chunks
+    assert len(set(chunks[:3])) == len(set(chunks[3:])) == 1
+    assert [recording.csv_file for recording in created] == [None, "x.csv"]
+    assert created[0].end_time == START + timedelta(seconds=24.99)
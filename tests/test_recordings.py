@@ -0,0 +1,121 @@
+import pytest
+import numpy as np
+from app.acquisition import AcquisitionWorker, capture, write_csv
+from app.recordings import (
+    Recording,
+    RecordingWriter,
+    csv_to_recording,
+    read_csv_signals,
+    read_csv_timestamps,
+    recording_path_for,
+    recording_to_csv,
+)
+from tests.helpers import BlockingDevice, discard_chunks
+
+
+def write_recording(path, rows=50):
+    timestamps = np.datetime64("2025-01-20T10:00:00", "us") + (
+        np.arange(rows) * 10_000
+    ).astype("timedelta64[us]")
+    a3 = np.arange(rows) * 0.5
+    write_csv(str(path), timestamps, a3, -a3)
+    return timestamps, a3
+
+
+def test_csv_signals_and_row_range(tmp_path):
+    path = tmp_path / "recording.csv"
+    timestamps, a3 = write_recording(path)
+
+    np.testing.assert_array_equal(read_csv_signals(path), [a3, -a3])
+    np.testing.assert_array_equal(
+        read_csv_signals(path, columns=(2,), start=10, count=5),
+        [-a3[10:15]],
+    )
+    np.testing.assert_array_equal(
+        read_csv_timestamps(path, start=48), timestamps[48:]
+    )
+
+
+def test_csv_timestamps_without_fraction(tmp_path):
+    path = tmp_path / "recording.csv"
+    path.write_text(
+        "UTC Timestamp,EEG Signal A3 (uV),EEG Signal A4 (uV)\n"
+        "2025-01-20 10:00:00,1.0,2.0\n"
+        "2025-01-20 10:00:00.500000,3.0,4.0\n"
+    )  # Exports written before timestamps always had microseconds.
+
+    assert read_csv_timestamps(path).tolist() == [
+        np.datetime64("2025-01-20T10:00:00.000000").tolist(),
+        np.datetime64("2025-01-20T10:00:00.500000").tolist(),
+    ]
+    assert read_csv_signals(path).shape == (2, 2)
+
+
+def test_binary_recording_is_written_incrementally(tmp_path):
+    path = str(tmp_path / "recording.eegr")
+    start_time = np.datetime64("2025-01-20T10:00:00.071187", "us")
+    samples = np.vstack([np.arange(250), -np.arange(250)]).astype(float)
+
+    with RecordingWriter(path, 100, 2, start_time) as writer:
+        for block in np.array_split(samples, [100, 200], axis=1):
+            writer.append(block)
+            writer.flush()
+            assert len(Recording(path)) == writer.n_samples
+        with open(path, "ab") as file:
+            file.write(
+                b"\x00\x00"
+            )  # Half a frame, as if a write was in progress.
+
+    recording = Recording(path)
+    assert len(recording) == 250
+    assert recording.duration == 2.5
+    assert isinstance(recording.frames, np.memmap)
+    np.testing.assert_array_equal(recording.samples(), samples)
+    np.testing.assert_array_equal(
+        recording.samples(120, 10), samples[:, 120:130]
+    )
+    index = recording.index_at(np.datetime64("2025-01-20T10:00:01.5", "us"))
+    assert index == 143
+    assert recording.timestamps(index, 1)[0] >= np.datetime64(
+        "2025-01-20T10:00:01.5", "us"
+    )
+    assert recording.timestamps(249)[0] == start_time + np.timedelta64(
+        2_490_000, "us"
+    )
+
+
+def test_csv_and_binary_conversions_agree(tmp_path):
+    csv_file = str(tmp_path / "recording.csv")
+    timestamps, a3 = write_recording(csv_file)
+
+    path = csv_to_recording(csv_file)
+    recording = Recording(path)
+    assert path == str(tmp_path / "recording.eegr")
+    assert recording.sampling_rate == 100
+    np.testing.assert_array_equal(recording.samples(), [a3, -a3])
+    np.testing.assert_array_equal(recording.timestamps(), timestamps)
+
+    exported = str(tmp_path / "exported.csv")
+    recording_to_csv(path, exported, block_size=7)
+    assert open(exported).read() == open(csv_file).read()
+
+
+@pytest.mark.asyncio
+async def test_capture_writes_binary_recording_and_csv(tmp_path, monkeypatch):
+    discard_chunks(monkeypatch)
+    csv_file = str(tmp_path / "capture.csv")
+    worker = AcquisitionWorker(BlockingDevice, 100, [2, 3], duration=0.3)
+    worker.start()
+
+    await capture(worker, csv_file)
+
+    recording = Recording(recording_path_for(csv_file))
+    np.testing.assert_array_equal(
+        recording.samples(), [np.arange(30), -np.arange(30)]
+    )
+    np.testing.assert_array_equal(
+        read_csv_signals(csv_file), recording.samples()
+    )
+    np.testing.assert_array_equal(
+        read_csv_timestamps(csv_file), recording.timestamps()
+    )
@@ -0,0 +1,175 @@
+from datetime import datetime, timezone
+import pytest
+import numpy as np
+from sqlalchemy import delete, func, select
+import app.chunks
+from app.chunks import ChunkWriter, read_overview
+from app.dependencies import SessionLocal, engine
+from app.models import Recording, SignalChunk, SignalRollup
+from app.rollups import backfill_rollups, compute_rollups, pick_resolution
+
+START = np.datetime64("1972-01-01T00:00:00", "us")
+END = datetime(1972, 1, 2, tzinfo=timezone.utc)
+
+
+def timestamps_for(n, sampling_rate=100):
+    return START + np.arange(n) * np.timedelta64(
+        1_000_000 // sampling_rate, "us"
+    )
+
+
+def test_compute_rollups_aggregates_each_bucket():
+    samples = np.vstack([np.arange(250.0), np.full(250, 2.0)])
+    samples[0, 120] = np.nan  # Left out.
+
+    rows = compute_rollups(timestamps_for(250), samples, 1, 7)
+
+    assert [row["n_samples"] for row in rows] == [100, 99, 50]
+    assert all(row["recording_id"] == 7 for row in rows)
+    assert rows[1]["bucket_start"] == datetime(
+        1972, 1, 1, 0, 0, 1, tzinfo=timezone.utc
+    )
+    assert rows[0]["first_min"] == 0 and rows[0]["first_max"] == 99
+    assert rows[0]["first_sum"] == sum(range(100))
+    assert rows[2]["second_sum_squares"] == 50 * 4
+
+
+def test_pick_resolution_fits_the_point_budget():
+    assert pick_resolution(1500, 15, 2000) == 0  # Raw samples fit.
+    assert pick_resolution(360_000, 3600, 2000) == 10
+    assert pick_resolution(8_640_000, 86_400, 2000) == 60
+    # Only the minutes holding data count.
+    assert pick_resolution(100_000, 1_200, 2000) == 1
+
+
+async def remove_test_rows():
+    async with SessionLocal() as db:
+        # Their chunks and rollups go with them.
+        await db.execute(
+            delete(Recording).where(
+                Recording.start_time >= START.tolist(),
+                Recording.start_time < END,
+            )
+        )
+        await db.commit()
+
+
+async def create_recordings(count):
+    async with SessionLocal() as db:
+        recordings = [
+            Recording(
+                device="simulated",
+                channels=[2, 3],
+                sampling_rate=100,
+                start_time=START.tolist().replace(tzinfo=timezone.utc),
+                status="running",
+            )
+            for _ in range(count)
+        ]
+        db.add_all(recordings)
+        await db.commit()
+        return [recording.id for recording in recordings]
+
+
+def rollup_rows(connection, recording_id):
+    return connection.execute(
+        select(SignalRollup)
+        .where(SignalRollup.recording_id == recording_id)
+        .order_by(SignalRollup.resolution, SignalRollup.bucket_start)
+    ).all()
+
+
+@pytest.mark.asyncio
+async def test_rollups_are_maintained_at_ingest_and_used_for_overviews(
+    setup_database,
+):
+    rng = np.random.default_rng(0)
+    samples = rng.normal(512, 40, size=(2, 100 * 600))  # Ten minutes.
+    timestamps = timestamps_for(samples.shape[1])
+    await remove_test_rows()
+
+    try:
+        recording_id, other_id = await create_recordings(2)
+        writer = ChunkWriter(100, recording_id)
+        # Batches ending in the middle of buckets.
+        for first in range(0, samples.shape[1], 1050):
+            batch = slice(first, first + 1050)
+            await writer(timestamps[batch], *samples[:, batch])
+        # Another recording over the same minutes.
+        await ChunkWriter(100, other_id)(timestamps[:500], *samples[:, :500])
+
+        async with SessionLocal() as db:
+            overview = await read_overview(
+                db, recording_id, START.tolist(), END, 100
+            )
+            raw = await read_overview(
+                db, recording_id, START.tolist(), END, 100_000
+            )
+            other = await read_overview(db, other_id, START.tolist(), END)
+
+        async with engine.connect() as conn:
+            incremental = await conn.run_sync(rollup_rows, recording_id)
+            # Rebuilt from the stored samples, as init_db does, in a transaction rolled back afterwards.
+            await conn.execute(delete(SignalRollup))
+            await conn.run_sync(backfill_rollups)
+            backfilled = await conn.run_sync(rollup_rows, recording_id)
+            await conn.rollback()
+    finally:
+        await remove_test_rows()
+
+    assert overview.resolution == 10
+    assert overview.timestamps.size == 60
+    np.testing.assert_allclose(
+        overview.mean[:, 0], samples[:, :1000].mean(axis=1), rtol=1e-6
+    )
+    np.testing.assert_allclose(
+        overview.std[:, 0], samples[:, :1000].std(axis=1), rtol=1e-4
+    )
+    np.testing.assert_allclose(
+        overview.maximum[:, -1],
+        samples[:, -1000:].max(axis=1),
+        rtol=1e-6,
+    )
+    assert raw.resolution == 0 and raw.timestamps.size == samples.shape[1]
+    assert other.resolution == 0 and other.timestamps.size == 500
+
+    assert len(incremental) == 600 + 60 + 10
+    assert [row.n_samples for row in incremental] == [
+        row.n_samples for row in backfilled
+    ]
+    np.testing.assert_allclose(
+        [row.first_sum for row in incremental],
+        [row.first_sum for row in backfilled],
+        rtol=1e-6,
+    )
+
+
+@pytest.mark.asyncio
+async def test_failed_chunk_copy_rolls_back_the_rollups(
+    monkeypatch, setup_database
+):
+    await remove_test_rows()
+
+    async def copy_then_fail(conn, records):
+        await copy_chunks(conn, records)
+        raise ConnectionError("Lost after the COPY.")
+
+    copy_chunks = app.chunks.copy_chunks
+    monkeypatch.setattr(app.chunks, "copy_chunks", copy_then_fail)
+    try:
+        (recording_id,) = await create_recordings(1)
+        with pytest.raises(ConnectionError):
+            await ChunkWriter(100, recording_id)(
+                timestamps_for(300), *np.ones((2, 300))
+            )
+        async with engine.connect() as conn:
+            rollups = await conn.run_sync(rollup_rows, recording_id)
+            chunks = await conn.scalar(
+                select(func.count()).where(
+                    SignalChunk.recording_id == recording_id
+                )
+            )
+    finally:
+        await remove_test_rows()
+
+    assert rollups == [] and chunks == 0
@@ -0,0 +1,176 @@
+from datetime import datetime, timezone
+import pytest
+import numpy as np
+from httpx import ASGITransport, AsyncClient
+from sqlalchemy import delete
+from app.main import app
+from app.auth import SESSION_COOKIE, create_session_token
+from app.chunks import write_chunks
+from app.dependencies import SessionLocal
+from app.models import Recording, User
+
+# Test recordings are stored far in the past and removed afterwards.
+START = datetime(1971, 1, 1, tzinfo=timezone.utc)
+END = datetime(1971, 1, 3, tzinfo=timezone.utc)
+OWNERS = ("signals-test@example.com", "signals-other@example.com")
+
+
+async def remove_test_rows():
+    async with SessionLocal() as db:
+        # Their chunks go with them.
+        await db.execute(
+            delete(Recording).where(
+                Recording.start_time >= START, Recording.start_time < END
+            )
+        )
+        await db.execute(delete(User).where(User.email.in_(OWNERS)))
+        await db.commit()
+
+
+async def create_owned_recordings():
+    """
+    A recording for each of the test users. Returns their (user id, recording id) pairs.
+    """
+    async with SessionLocal() as db:
+        users = [
+            User(
+                first_name=email,
+                last_name=email,
+                role=email,
+                email=email,
+                password="-",
+            )
+            for email in OWNERS
+        ]
+        db.add_all(users)
+        await db.flush()
+        recordings = [
+            Recording(
+                user_id=user.id,
+                device="simulated",
+                channels=[2, 3],
+                sampling_rate=100,
+                start_time=START,
+                status="completed",
+            )
+            for user in users
+        ]
+        db.add_all(recordings)
+        await db.commit()
+        return [
+            (user.id, recording.id)
+            for user, recording in zip(users, recordings)
+        ]
+
+
+@pytest.mark.asyncio
+async def test_pages_cover_the_range_once(setup_database):
+    first = np.vstack([np.arange(2500), -np.arange(2500)])
+    second = np.vstack([np.arange(300), np.arange(300)]) + 10_000
+    await remove_test_rows()
+
+    try:
+        (user_id, recording_id), (_, other_id) = (
+            await create_owned_recordings()
+        )
+        await write_chunks(START, 100, first, recording_id)
+        await write_chunks(
+            datetime(1971, 1, 2, tzinfo=timezone.utc),
+            100,
+            second,
+            recording_id,
+        )
+        # Another user's samples in the same range.
+        await write_chunks(START, 100, np.zeros((2, 700)), other_id)
+        # A later recording of the same user overlapping the first one, so their latest.
+        async with SessionLocal() as db:
+            overlapping = Recording(
+                user_id=user_id,
+                device="simulated",
+                channels=[2, 3],
+                sampling_rate=100,
+                start_time=START,
+                status="completed",
+            )
+            db.add(overlapping)
+            await db.commit()
+        await write_chunks(
+            datetime(1971, 1, 1, 0, 0, 2, tzinfo=timezone.utc),
+            100,
+            np.full((2, 700), 5_000),
+            overlapping.id,
+        )
+
+        pages = []
+        params = {"start": START.isoformat(), "end": END.isoformat()}
+        walk = {**params, "recording": recording_id, "limit": 1000}
+        async with AsyncClient(
+            transport=ASGITransport(app=app), base_url="http://test"
+        ) as client:
+            anonymous = await client.get("/api/signals", params=params)
+            client.cookies.set(SESSION_COOKIE, create_session_token(user_id))
+            others = [
+                (
+                    await client.get(
+                        path, params={**params, "recording": other_id}
+                    )
+                ).status_code
+                for path in ("/api/signals", "/api/signals/overview")
+            ]
+            overview = (
+                await client.get(
+                    "/api/signals/overview",
+                    params={**params, "recording": recording_id},
+                )
+            ).json()
+            while True:
+                page = (await client.get("/api/signals", params=walk)).json()
+                pages.append(page)
+                if page["next_after"] is None:
+                    break
+                walk["after"] = page["next_after"]
+
+            binary = await client.get(
+                "/api/signals",
+                params={
+                    "start": START.isoformat(),
+                    "limit": 5,
+                    "format": "binary",
+                    "recording": recording_id,
+                },
+            )
+            latest = (
+                await client.get("/api/signals", params={"limit": 5000})
+            ).json()
+    finally:
+        await remove_test_rows()
+
+    assert anonymous.status_code == 401
+    assert others == [404, 404]
+    assert overview["resolution"] == 0
+    assert len(overview["timestamps"]) == 2800
+    assert latest["recording"] == overlapping.id
+    assert latest["first_channel"] == [5_000] * 700
+    assert [len(page["timestamps"]) for page in pages] == [1000, 1000, 800]
+    assert {page["recording"] for page in pages} == {recording_id}
+    np.testing.assert_array_equal(
+        np.concatenate([page["first_channel"] for page in pages]),
+        np.concatenate([first[0], second[0]]),
+    )
+    timestamps = np.concatenate(
+        [
+            np.array(page["timestamps"], dtype="datetime64[us]")
+            for page in pages
+        ]
+    )
+    assert np.all(np.diff(timestamps) > np.timedelta64(0))
+
+    assert binary.headers["X-Samples"] == "5"
+    assert binary.headers["X-Recording"] == str(recording_id)
+    assert binary.headers["X-Next-After"].startswith("1971-01-01T00:00:00.04")
+    body = binary.content
+    micros = np.frombuffer(body[:40], "<i8")
+    assert micros[1] - micros[0] == 10_000
+    np.testing.assert_array_equal(
+        np.frombuffer(body[40:], "<f4").reshape(2, 5), first[:, :5]
+    )
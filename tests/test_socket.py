@@ -0,0 +1,78 @@
+import time
+import asyncio
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from app.metrics import websocket_dropped_messages
+from app.socket import ConnectionManager, manager, router
+from tests.helpers import SimulatedClient, log_in_client
+
+
+async def broadcast_latency(manager, messages):
+    latencies = []
+    for i in range(messages):
+        start = time.perf_counter()
+        await manager.broadcast(f"message {i}")
+        latencies.append(time.perf_counter() - start)
+        await asyncio.sleep(0.001)
+    return max(latencies)
+
+
+@pytest.mark.asyncio
+async def test_broadcast_latency_stays_flat_with_slow_clients():
+    manager = ConnectionManager(queue_size=10, send_timeout=60)
+    fast = [SimulatedClient() for _ in range(450)]
+    hung = [SimulatedClient(hung=True) for _ in range(50)]
+    dropped = websocket_dropped_messages.value()
+    for client in fast + hung:
+        manager.register(client)
+
+    latency = await broadcast_latency(manager, 50)
+    await asyncio.sleep(0.05)
+
+    assert (
+        latency < 0.05
+    )  # Queuing never waits for a send, hung clients included.
+    assert all(len(client.received) == 50 for client in fast)
+    stats = manager.stats()
+    assert stats["connections"] == 500
+    assert (
+        stats["queue_depth_max"] == 10
+    )  # Hung clients are capped at the queue size.
+    assert stats["dropped_messages"] == 50 * (50 - 11)
+    assert (
+        websocket_dropped_messages.value() - dropped
+        == stats["dropped_messages"]
+    )
+
+    for client in fast + hung:
+        manager.disconnect(client)
+
+
+@pytest.mark.asyncio
+async def test_disconnect_policy_closes_slow_clients():
+    manager = ConnectionManager(
+        queue_size=2, slow_client_policy="disconnect", send_timeout=60
+    )
+    fast, hung = SimulatedClient(), SimulatedClient(hung=True)
+    manager.register(fast)
+    manager.register(hung)
+
+    await broadcast_latency(manager, 5)
+    await asyncio.sleep(0.01)
+
+    assert hung.closed
+    assert hung not in manager.active_connections
+    assert len(fast.received) == 5
+    assert manager.stats()["disconnected_clients"] == 1
+    manager.disconnect(fast)
+
+
+def test_websocket_receives_broadcast():
+    app = FastAPI()  # Only the websocket routes, so no database is needed.
+    app.include_router(router)
+    with TestClient(app) as client:
+        log_in_client(client)
+        with client.websocket_connect("/ws") as websocket:
+            client.portal.call(manager.broadcast, "Acquisition started.")
+            assert websocket.receive_text() == "Acquisition started."
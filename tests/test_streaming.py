@@ -0,0 +1,108 @@
+import asyncio
+import json
+import pytest
+import numpy as np
+from fastapi import FastAPI, WebSocketDisconnect
+from fastapi.testclient import TestClient
+from app.socket import ConnectionManager, manager, router
+from app.streaming import FRAME_HEADER, decode_frame, encode_block
+from tests.helpers import SimulatedClient, log_in_client, sample_block
+
+
+def test_frame_round_trip():
+    block = sample_block(recording_id=12)
+
+    frame = encode_block(block)
+    header, samples = decode_frame(frame)
+
+    assert len(frame) == FRAME_HEADER.size + 2 * 100 * 4
+    assert header["recording_id"] == 12
+    assert header["sequence"] == 3
+    assert header["sampling_rate"] == 1000.0
+    assert header["flags"] == 0
+    assert header["start_time"] == pytest.approx(1737367528.071187)
+    np.testing.assert_array_equal(samples, block.samples)
+
+
+def test_frame_decimation_averages_groups():
+    header, samples = decode_frame(
+        encode_block(sample_block(n=25), max_rate=100)
+    )
+
+    assert header["sampling_rate"] == 100.0
+    assert header["flags"] == 1
+    np.testing.assert_allclose(samples[0], [4.5, 14.5, 22.0])
+    np.testing.assert_allclose(samples[1], [-4.5, -14.5, -22.0])
+
+
+@pytest.mark.asyncio
+async def test_only_subscribers_receive_frames_at_their_rate():
+    manager = ConnectionManager()
+    status_only, full_rate, decimated = (SimulatedClient() for _ in range(3))
+    for client in (status_only, full_rate, decimated):
+        manager.register(client)
+    manager.handle_message(full_rate, json.dumps({"action": "subscribe"}))
+    manager.handle_message(
+        decimated, json.dumps({"action": "subscribe", "max_rate": 10})
+    )
+    manager.handle_message(status_only, "not json")
+
+    await manager.broadcast_block(sample_block())
+    await manager.broadcast("Acquisition completed!")
+    await asyncio.sleep(0.01)
+
+    assert status_only.received == ["Acquisition completed!"]
+    assert decode_frame(full_rate.received[0])[1].shape == (2, 100)
+    assert decode_frame(decimated.received[0])[1].shape == (2, 1)
+    assert manager.stats()["streaming_clients"] == 2
+
+    for client in (status_only, full_rate, decimated):
+        manager.disconnect(client)
+
+
+@pytest.mark.asyncio
+async def test_broadcasts_only_reach_users_who_may_open_the_recording():
+    manager = ConnectionManager()
+    owner, other = SimulatedClient(), SimulatedClient()
+    manager.register(owner, user_id=1)
+    manager.register(other, user_id=2)
+    for client in (owner, other):
+        manager.handle_message(client, json.dumps({"action": "subscribe"}))
+
+    await manager.broadcast_block(sample_block(recording_id=5), owner_id=1)
+    await manager.broadcast("Acquisition completed!", owner_id=1)
+    await manager.broadcast_block(sample_block(recording_id=6))  # No owner.
+    await asyncio.sleep(0.01)
+
+    assert [
+        decode_frame(frame)[0]["recording_id"] for frame in owner.received[::2]
+    ] == [5, 6]
+    assert owner.received[1] == "Acquisition completed!"
+    assert len(other.received) == 1
+    assert decode_frame(other.received[0])[0]["recording_id"] == 6
+
+    for client in (owner, other):
+        manager.disconnect(client)
+
+
+def test_websocket_streams_binary_frames_to_logged_in_users():
+    app = FastAPI()
+    app.include_router(router)
+    with TestClient(app) as client:
+        with pytest.raises(WebSocketDisconnect):  # Refused without a session.
+            with client.websocket_connect("/ws"):
+                pass
+
+        log_in_client(client)
+        with client.websocket_connect("/ws") as websocket:
+            websocket.send_text(
+                json.dumps({"action": "subscribe", "max_rate": 500})
+            )
+            websocket.send_text(
+                ""
+            )  # Round trip so the subscription is registered before broadcasting.
+            client.portal.call(manager.broadcast_block, sample_block())
+
+            header, samples = decode_frame(websocket.receive_bytes())
+            assert header["sampling_rate"] == 500.0
+            assert samples.shape == (2, 50)
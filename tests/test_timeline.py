@@ -0,0 +1,88 @@
+import time
+from types import SimpleNamespace
+import pytest
+import numpy as np
+from fastapi import FastAPI
+from httpx import ASGITransport, AsyncClient
+from scipy.signal import welch
+import app.routes.timeline
+from app.auth import require_user
+from app.analysis import closed_eyes_timeline, relative_alpha_power
+from app.routes.timeline import router
+from tests.helpers import write_eeg_csv
+
+
+def test_timeline_matches_welch_per_window():
+    samples = np.random.default_rng(0).normal(size=(2, 100 * 60))
+
+    offsets, relative_power, closed = closed_eyes_timeline(
+        samples, 100, window=20, hop=5
+    )
+
+    assert offsets.tolist() == list(range(0, 41, 5))
+    for index, offset in enumerate(offsets.astype(int)):
+        window = samples[:, offset * 100 + np.arange(20 * 100)]
+        frequencies, psd = welch(window, 100, nperseg=100)
+        expected = relative_alpha_power(frequencies, psd)
+        np.testing.assert_allclose(relative_power[:, index], expected)
+        np.testing.assert_array_equal(closed[:, index], expected > 0.065)
+
+
+def test_hour_long_timeline_is_fast():
+    samples = np.random.default_rng(0).normal(size=(2, 100 * 3600))
+
+    start = time.perf_counter()
+    offsets, relative_power, _ = closed_eyes_timeline(samples, 100)
+    elapsed = time.perf_counter() - start
+
+    assert relative_power.shape == (2, 3600 - 20 + 1)
+    assert elapsed < 0.5
+
+
+@pytest.mark.asyncio
+async def test_timeline_endpoint(tmp_path, monkeypatch):
+    csv_file = str(tmp_path / "recording.csv")
+    recordings = {  # Stands in for the recordings each user may open.
+        (1, None): SimpleNamespace(csv_file=csv_file),
+        (1, 5): SimpleNamespace(csv_file=csv_file),
+    }
+
+    async def select_recording(db, user_id, recording_id=None):
+        return recordings.get((user_id, recording_id))
+
+    monkeypatch.setattr(
+        app.routes.timeline, "select_recording", select_recording
+    )
+    api = FastAPI()
+    api.include_router(router)
+
+    async with AsyncClient(
+        transport=ASGITransport(app=api), base_url="http://test"
+    ) as client:
+        assert (await client.get("/timeline")).status_code == 401
+
+        api.dependency_overrides[require_user] = lambda: SimpleNamespace(id=1)
+        assert (
+            await client.get("/timeline")
+        ).status_code == 404  # No file yet.
+        assert (
+            await client.get("/timeline", params={"recording": 6})
+        ).status_code == 404
+
+        write_eeg_csv(csv_file, seconds=30)
+        response = await client.get("/timeline", params={"hop": 2})
+        by_id = await client.get(
+            "/timeline", params={"recording": 5, "hop": 2}
+        )
+
+    assert by_id.json() == response.json()
+    timeline = response.json()
+    assert response.status_code == 200
+    assert timeline["hop"] == 2
+    assert timeline["times"][:2] == [
+        "2025-01-20T10:00:00.000000Z",
+        "2025-01-20T10:00:02.000000Z",
+    ]
+    assert len(timeline["times"]) == 6
+    assert timeline["channels"]["first_channel"]["closed_eyes"] == [True] * 6
+    assert (tmp_path / "recording.eegr").exists()